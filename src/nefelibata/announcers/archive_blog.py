@@ -22,7 +22,7 @@ class ArchiveBlogAnnouncer(Announcer):
 
     async def announce_post(self, post: Post) -> Optional[Announcement]:
         urls = [builder.absolute_url(post) for builder in self.builders]
-        saved_urls = await archive_urls(urls)
+        saved_urls = await archive_urls(self.governor.get_session(), urls)
         if saved_urls:
             return Announcement(
                 url="https://web.archive.org/save/",
@@ -32,7 +32,7 @@ class ArchiveBlogAnnouncer(Announcer):
 
     async def announce_site(self) -> Optional[Announcement]:
         urls = [builder.home for builder in self.builders]
-        saved_urls = await archive_urls(urls)
+        saved_urls = await archive_urls(self.governor.get_session(), urls)
         if saved_urls:
             return Announcement(
                 url="https://web.archive.org/save/",
@@ -14,7 +14,9 @@ from pydantic import BaseModel
 
 from nefelibata.builders.base import Builder, get_builders
 from nefelibata.config import Config
+from nefelibata.governor import Governor
 from nefelibata.post import Post
+from nefelibata.repository import PostRepository
 
 _logger = logging.getLogger(__name__)
 
@@ -85,11 +87,19 @@ class Announcer:
     scopes: List[Scope] = []
 
     def __init__(
-        self, root: Path, config: Config, builders: List[Builder], **kwargs: Any
+        self,
+        root: Path,
+        config: Config,
+        builders: List[Builder],
+        repository: Optional[PostRepository] = None,
+        governor: Optional[Governor] = None,
+        **kwargs: Any,
     ):
         self.root = root
         self.config = config
         self.builders = builders
+        self.repository = repository or PostRepository(root, config, lazy=True)
+        self.governor = governor or Governor(config.concurrency)
         self.kwargs = kwargs
 
     async def announce_post(self, post: Post) -> Optional[Announcement]:
@@ -116,15 +126,23 @@ class Announcer:
         return {}
 
 
-def get_announcers(
+def get_announcers(  # pylint: disable=too-many-arguments
     root: Path,
     config: Config,
     scope: Optional[Scope] = None,
+    repository: Optional[PostRepository] = None,
+    governor: Optional[Governor] = None,
+    builders: Optional[Dict[str, Builder]] = None,
 ) -> Dict[str, Announcer]:
     """
     Return configured announcers.
+
+    If a governor is passed it's shared by all the announcers, limiting their
+    concurrent work. Similarly, if builders are passed they're used instead of
+    building new ones.
     """
-    builders = get_builders(root, config)
+    if builders is None:
+        builders = get_builders(root, config, repository)
 
     classes = {
         announcer.name: announcer.load()
@@ -144,7 +162,12 @@ def get_announcers(
 
         if scope is None or scope in class_.scopes:
             announcers[announcer_name] = class_(
-                root, config, announcer_builders, **announcer_config.dict()
+                root,
+                config,
+                announcer_builders,
+                repository=repository,
+                governor=governor,
+                **announcer_config.dict(),
             )
 
     return announcers
@@ -49,7 +49,8 @@ class GeminispaceAnnouncer(Announcer):
             url = f"gemini://geminispace.info/add-seed?{capsule_url}"
 
             _logger.info("Announcing capsule %s to Geminispace", capsule_url)
-            await self.client.get(URL(url))
+            async with self.governor.host(url):
+                await self.client.get(URL(url))
 
         return Announcement(
             url="gemini://geminispace.info/",
@@ -72,8 +73,9 @@ class GeminispaceAnnouncer(Announcer):
             post_url = urllib.parse.quote_plus(str(builder.absolute_url(post)))
             url = f"gemini://geminispace.info/backlinks?{post_url}"
 
-            response = await self.client.get(URL(url))
-            payload = await response.read()
+            async with self.governor.host(url):
+                response = await self.client.get(URL(url))
+                payload = await response.read()
             content = payload.decode("utf-8")
 
             state = 0
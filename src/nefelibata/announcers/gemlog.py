@@ -17,7 +17,6 @@ from yarl import URL
 from nefelibata.announcers.base import Announcement, Announcer, Interaction, Scope
 from nefelibata.builders.base import Builder
 from nefelibata.config import Config
-from nefelibata.post import get_posts
 
 _logger = logging.getLogger(__name__)
 
@@ -69,7 +68,8 @@ class GemlogAnnouncer(Announcer):
             url = self.submit_url + feed_url
 
             self.logger.info("Announcing feed %s to %s", feed_url, self.name)
-            await self.client.get(URL(url))
+            async with self.governor.host(url):
+                await self.client.get(URL(url))
 
         return Announcement(
             url=self.url,
@@ -83,11 +83,12 @@ class GemlogAnnouncer(Announcer):
 
         This is done by scraping the capsule and searching for "Re: " posts.
         """
-        response = await self.client.get(URL(self.url))
-        payload = await response.read()
+        async with self.governor.host(self.url):
+            response = await self.client.get(URL(self.url))
+            payload = await response.read()
         content = payload.decode("utf-8")
 
-        posts = get_posts(self.root, self.config)
+        posts = self.repository.get_posts()
 
         interactions: Dict[Path, Dict[str, Interaction]] = defaultdict(dict)
         for line in content.split("\n"):
@@ -112,12 +113,13 @@ class GemlogAnnouncer(Announcer):
         """
         Check that a given URL actually links to the post URL.
         """
-        try:
-            response = await self.client.get(URL(url))
-        except ssl.SSLCertVerificationError:
-            return True
+        async with self.governor.host(url):
+            try:
+                response = await self.client.get(URL(url))
+            except ssl.SSLCertVerificationError:
+                return True
 
-        payload = await response.read()
+            payload = await response.read()
         content = payload.decode("utf-8")
 
         for line in content.split("\n"):
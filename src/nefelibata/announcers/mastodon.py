@@ -70,11 +70,13 @@ class MastodonAnnouncer(Announcer):
         for enclosure in valid_enclosures[:MAX_NUMBER_OF_ENCLOSURES]:
             _logger.info("Uploading post enclosure %s", enclosure.path)
 
-            media_dict = self.client.media_post(
-                str(enclosure.path),
-                enclosure.type,
-                enclosure.description,
-            )
+            async with self.governor.host(self.base_url):
+                media_dict = await self.governor.run_in_executor(
+                    self.client.media_post,
+                    str(enclosure.path),
+                    enclosure.type,
+                    enclosure.description,
+                )
             media_ids.append(media_dict)
 
         language = post.metadata.get("language") or self.config.language
@@ -86,13 +88,15 @@ class MastodonAnnouncer(Announcer):
         status = f"{summary}\n\n{urls}\n\n{tags}".strip()
 
         _logger.info("Announcing post %s on Mastodon", post.path)
-        toot_dict = self.client.status_post(
-            status=status,
-            visibility="public",
-            media_ids=media_ids,
-            language=language,
-            idempotency_key=str(post.path),
-        )
+        async with self.governor.host(self.base_url):
+            toot_dict = await self.governor.run_in_executor(
+                self.client.status_post,
+                status=status,
+                visibility="public",
+                media_ids=media_ids,
+                language=language,
+                idempotency_key=str(post.path),
+            )
 
         return Announcement(
             url=toot_dict.url,
@@ -110,7 +114,11 @@ class MastodonAnnouncer(Announcer):
             url = announcement["url"]
             id_ = int(url.rstrip("/").rsplit("/", 1)[1])
             try:
-                context = self.client.status_context(id_)
+                async with self.governor.host(self.base_url):
+                    context = await self.governor.run_in_executor(
+                        self.client.status_context,
+                        id_,
+                    )
             except MastodonNotFoundError:
                 _logger.warning("Toot %s not found", url)
                 continue
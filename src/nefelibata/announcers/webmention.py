@@ -180,17 +180,17 @@ class WebmentionAnnouncer(Announcer):
         path = post.path.parent / "webmentions.yaml"
 
         tasks = []
+        session = self.governor.get_session()
         with update_yaml(path) as webmentions:
-            async with ClientSession() as session:
-                for target in extract_links(post):
-                    for builder in self.builders:
-                        source = builder.absolute_url(post)
-                        task = asyncio.create_task(
-                            collect_webmentions(session, source, target, webmentions),
-                        )
-                        tasks.append(task)
+            for target in extract_links(post):
+                for builder in self.builders:
+                    source = builder.absolute_url(post)
+                    task = asyncio.create_task(
+                        collect_webmentions(session, source, target, webmentions),
+                    )
+                    tasks.append(task)
 
-                await asyncio.gather(*tasks)
+            await asyncio.gather(*tasks)
 
         if any(webmention["status"] == "queue" for webmention in webmentions.values()):
             # return nothing so we can check queued webmentions on next publish
@@ -204,43 +204,43 @@ class WebmentionAnnouncer(Announcer):
     async def collect_post(self, post: Post) -> Dict[str, Interaction]:
         interactions: Dict[str, Interaction] = {}
 
-        async with ClientSession() as session:
-            for builder in self.builders:
-                target = builder.absolute_url(post)
-                payload = {"target": target}
-
-                async with session.get(
-                    "https://webmention.io/api/mentions.jf2",
-                    data=payload,
-                ) as response:
-                    try:
-                        response.raise_for_status()
-                    except ClientResponseError:
-                        _logger.error("Error fetching webmentions")
-                        continue
-
-                    payload = await response.json()
-
-                for entry in payload["children"]:
-                    if entry["type"] != "entry":
-                        continue
-
-                    interactions[entry["wm-id"]] = Interaction(
-                        id=entry["wm-id"],
-                        name=entry.get("name", entry["wm-source"]),
-                        summary=entry.get("summary", {}).get("value"),
-                        content=entry.get("content", {}).get("text"),
-                        published=dateutil.parser.parse(entry["published"]),
-                        updated=None,
-                        author=Author(
-                            name=entry["author"]["name"],
-                            url=entry["author"]["url"],
-                            avatar=entry["author"]["photo"],
-                            note=entry["author"].get("note", ""),
-                        ),
-                        url=entry["wm-source"],
-                        in_reply_to_id=None,
-                        type=INTERACTION_TYPES[entry["wm-property"]],
-                    )
+        session = self.governor.get_session()
+        for builder in self.builders:
+            target = builder.absolute_url(post)
+            payload = {"target": target}
+
+            async with session.get(
+                "https://webmention.io/api/mentions.jf2",
+                data=payload,
+            ) as response:
+                try:
+                    response.raise_for_status()
+                except ClientResponseError:
+                    _logger.error("Error fetching webmentions")
+                    continue
+
+                payload = await response.json()
+
+            for entry in payload["children"]:
+                if entry["type"] != "entry":
+                    continue
+
+                interactions[entry["wm-id"]] = Interaction(
+                    id=entry["wm-id"],
+                    name=entry.get("name", entry["wm-source"]),
+                    summary=entry.get("summary", {}).get("value"),
+                    content=entry.get("content", {}).get("text"),
+                    published=dateutil.parser.parse(entry["published"]),
+                    updated=None,
+                    author=Author(
+                        name=entry["author"]["name"],
+                        url=entry["author"]["url"],
+                        avatar=entry["author"]["photo"],
+                        note=entry["author"].get("note", ""),
+                    ),
+                    url=entry["wm-source"],
+                    in_reply_to_id=None,
+                    type=INTERACTION_TYPES[entry["wm-property"]],
+                )
 
         return interactions
@@ -23,5 +23,8 @@ class ArchiveLinksAssistant(Assistant):
     scopes = [Scope.POST]
 
     async def get_post_metadata(self, post: Post) -> Dict[str, str]:
-        saved_urls = await archive_urls(extract_links(post))
+        saved_urls = await archive_urls(
+            self.governor.get_session(),
+            extract_links(post),
+        )
         return {str(k): str(v) for k, v in saved_urls.items()}
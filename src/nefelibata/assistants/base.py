@@ -12,7 +12,9 @@ from pkg_resources import iter_entry_points
 
 from nefelibata.announcers.base import Scope
 from nefelibata.config import Config
+from nefelibata.governor import Governor
 from nefelibata.post import Post
+from nefelibata.repository import PostRepository
 
 _logger = logging.getLogger(__name__)
 
@@ -29,9 +31,18 @@ class Assistant:
     name = ""
     scopes: List[Scope] = []
 
-    def __init__(self, root: Path, config: Config, **kwargs: Any):
+    def __init__(
+        self,
+        root: Path,
+        config: Config,
+        repository: Optional[PostRepository] = None,
+        governor: Optional[Governor] = None,
+        **kwargs: Any,
+    ):
         self.root = root
         self.config = config
+        self.repository = repository or PostRepository(root, config, lazy=True)
+        self.governor = governor or Governor(config.concurrency)
         self.kwargs = kwargs
 
     async def process_post(self, post: Post, force: bool = False) -> None:
@@ -48,6 +59,7 @@ class Assistant:
 
         with open(path, "w", encoding="utf-8") as output:
             output.write(yaml.dump(metadata))
+        self.repository.invalidate(post.path)
 
     async def get_post_metadata(self, post: Post) -> Dict[str, Any]:
         """
@@ -81,9 +93,14 @@ def get_assistants(
     root: Path,
     config: Config,
     scope: Optional[Scope] = None,
+    repository: Optional[PostRepository] = None,
+    governor: Optional[Governor] = None,
 ) -> Dict[str, Assistant]:
     """
     Return configured assistants.
+
+    If a governor is passed it's shared by all the assistants, limiting their
+    concurrent work.
     """
     classes = {
         assistant.name: assistant.load()
@@ -95,6 +112,12 @@ def get_assistants(
         class_ = classes[assistant_config.plugin]
 
         if scope is None or scope in class_.scopes:
-            assistants[assistant_name] = class_(root, config, **assistant_config.dict())
+            assistants[assistant_name] = class_(
+                root,
+                config,
+                repository=repository,
+                governor=governor,
+                **assistant_config.dict(),
+            )
 
     return assistants
@@ -7,8 +7,6 @@ from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any, Dict, cast
 
-from aiohttp import ClientSession
-
 from nefelibata.announcers.base import Scope
 from nefelibata.assistants.base import Assistant
 from nefelibata.config import Config
@@ -43,8 +41,8 @@ class CurrentWeatherAssistant(Assistant):
         if datetime.now(tz=timezone.utc) - post.timestamp > self.max_age:
             return {}
 
-        async with ClientSession() as session:
-            _logger.info("Fetching current weather information")
-            async with session.get("https://wttr.in/?format=j1&m") as response:
-                payload = await response.json()
-                return cast(Dict[str, Any], payload)
+        session = self.governor.get_session()
+        _logger.info("Fetching current weather information")
+        async with session.get("https://wttr.in/?format=j1&m") as response:
+            payload = await response.json()
+            return cast(Dict[str, Any], payload)
@@ -46,8 +46,8 @@ def get_image_description(post: Post, path: Path) -> Optional[str]:
 
             return None
 
-    gemini = marko.Markdown(renderer=DescriptionExtractor)
-    gemini.convert(post.content)
+    extractor = marko.Markdown(renderer=DescriptionExtractor)
+    extractor.render(post.document)
 
     return descriptions.get(path)
 
@@ -87,3 +87,6 @@ class ExifDescriptionAssistant(Assistant):
             _logger.info("adding EXIF description to %s", enclosure.path)
             exif["0th"][piexif.ImageIFD.ImageDescription] = description.encode("utf-8")
             piexif.insert(piexif.dump(exif), str(enclosure.path))
+
+            # the enclosure description is read from the EXIF data
+            self.repository.invalidate(post.path)
@@ -19,7 +19,7 @@ from PIL import Image
 
 from nefelibata.announcers.base import Scope
 from nefelibata.assistants.base import Assistant
-from nefelibata.post import Post
+from nefelibata.post import Post, parse_markdown
 
 _logger = logging.getLogger(__name__)
 
@@ -30,8 +30,7 @@ def extract_images(content: str) -> Iterator[Tuple[str, str]]:
     """
     Extract all images from a Markdown document.
     """
-    tree = marko.parse(content)
-    queue = [tree]
+    queue = [parse_markdown(content)]
     while queue:
         element = queue.pop()
 
@@ -143,17 +142,17 @@ class MirrorImagesAssistant(Assistant):
 
         replacements: Dict[str, str] = {}
         tasks = []
-        async with ClientSession() as session:
-            for url, title in extract_images(post.content):
-                if is_local(url):
-                    continue
+        session = self.governor.get_session()
+        for url, title in extract_images(post.content):
+            if is_local(url):
+                continue
 
-                task = asyncio.create_task(
-                    download_image(session, url, title, post, mirror, replacements),
-                )
-                tasks.append(task)
+            task = asyncio.create_task(
+                download_image(session, url, title, post, mirror, replacements),
+            )
+            tasks.append(task)
 
-            await asyncio.gather(*tasks)
+        await asyncio.gather(*tasks)
 
         if not replacements:
             return
@@ -168,3 +167,5 @@ class MirrorImagesAssistant(Assistant):
 
             with open(post.path, "w", encoding="utf-8") as output:
                 output.write(content)
+
+        self.repository.invalidate(post.path)
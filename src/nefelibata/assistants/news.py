@@ -8,8 +8,6 @@ from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any, Dict
 
-from aiohttp import ClientSession
-
 from nefelibata.announcers.base import Scope
 from nefelibata.assistants.base import Assistant
 from nefelibata.config import Config
@@ -53,12 +51,12 @@ class NewsAssistant(Assistant):
             "apiKey": self.api_key,
         }
 
-        async with ClientSession() as session:
-            _logger.info("Fetching a random news headline")
-            async with session.get(
-                "https://newsapi.org/v2/top-headlines",
-                params=params,
-            ) as response:
-                payload = await response.json()
-                articles = payload["articles"]
-                return random.choice(articles)
+        session = self.governor.get_session()
+        _logger.info("Fetching a random news headline")
+        async with session.get(
+            "https://newsapi.org/v2/top-headlines",
+            params=params,
+        ) as response:
+            payload = await response.json()
+            articles = payload["articles"]
+            return random.choice(articles)
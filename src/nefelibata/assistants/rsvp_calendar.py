@@ -23,45 +23,44 @@ from nefelibata.post import Post
 _logger = logging.getLogger(__name__)
 
 
-async def fetch_event(url: URL) -> Optional[Event]:
+async def fetch_event(session: ClientSession, url: URL) -> Optional[Event]:
     """
     Extract a event from a page.
 
     We assume the event is represented as an h-event in the URL.
     """
-    async with ClientSession() as session:
-        async with session.get(url) as response:
-            content = await response.text()
+    async with session.get(url) as response:
+        content = await response.text()
 
-        parser = mf2py.Parser(content)
-        hevents = parser.to_dict(filter_by_type="h-event")
+    parser = mf2py.Parser(content)
+    hevents = parser.to_dict(filter_by_type="h-event")
 
-        if not hevents:
-            _logger.warning("No events found on %s", url)
-            return None
-        if len(hevents) > 1:
-            _logger.warning("Multiple events found on %s", url)
-            return None
-        hevent = hevents[0]
+    if not hevents:
+        _logger.warning("No events found on %s", url)
+        return None
+    if len(hevents) > 1:
+        _logger.warning("Multiple events found on %s", url)
+        return None
+    hevent = hevents[0]
 
-        event = Event()
-        event.add("summary", hevent["properties"]["name"][0])
-        event.add("dtstart", dateutil.parser.parse(hevent["properties"]["start"][0]))
-        event.add("dtend", dateutil.parser.parse(hevent["properties"]["end"][0]))
-        event.add("dtstamp", datetime.now(timezone.utc))
+    event = Event()
+    event.add("summary", hevent["properties"]["name"][0])
+    event.add("dtstart", dateutil.parser.parse(hevent["properties"]["start"][0]))
+    event.add("dtend", dateutil.parser.parse(hevent["properties"]["end"][0]))
+    event.add("dtstamp", datetime.now(timezone.utc))
 
-        if "url" in hevent["properties"]:
-            event.add("url", hevent["properties"]["url"][0])
+    if "url" in hevent["properties"]:
+        event.add("url", hevent["properties"]["url"][0])
 
-        if "content" in hevent["properties"]:
-            event.add("description", hevent["properties"]["content"][0]["value"])
+    if "content" in hevent["properties"]:
+        event.add("description", hevent["properties"]["content"][0]["value"])
 
-        if "category" in hevent["properties"]:
-            event.add("categories", hevent["properties"]["category"])
+    if "category" in hevent["properties"]:
+        event.add("categories", hevent["properties"]["category"])
 
-        if "featured" in hevent["properties"]:
-            attachment_url = url.join(URL(hevent["properties"]["featured"][0]))
-            event.add("attach", attachment_url)
+    if "featured" in hevent["properties"]:
+        attachment_url = url.join(URL(hevent["properties"]["featured"][0]))
+        event.add("attach", attachment_url)
 
     return event
 
@@ -129,8 +128,13 @@ class RSVPCalendarAssistant(Assistant):
             return {}
 
         url = post.metadata["rsvp-url"]
-        event = await fetch_event(URL(url))
+        event = await fetch_event(self.governor.get_session(), URL(url))
         if event:
-            update_calendar(self.client, self.calendar, event)
+            await self.governor.run_in_executor(
+                update_calendar,
+                self.client,
+                self.calendar,
+                event,
+            )
 
         return {"event": url}
@@ -1,24 +1,153 @@
 """
 Base class for builders.
 """
+import asyncio
 import logging
+import multiprocessing
 import shutil
 from collections import defaultdict
-from pathlib import Path
-from typing import Any, Dict, List
-
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from pathlib import Path, PurePosixPath
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar, cast
+
+from jinja2 import (
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    meta,
+    select_autoescape,
+)
 from pkg_resources import iter_entry_points, resource_filename, resource_listdir
 from yarl import URL
 
 from nefelibata import __version__
+from nefelibata.cache import ContentCache
 from nefelibata.config import Config
-from nefelibata.post import Post, get_posts
+from nefelibata.constants import (
+    CACHE_DIRECTORY,
+    RENDER_CACHE_DIRECTORY,
+    TEMPLATE_CACHE_DIRECTORY,
+)
+from nefelibata.dependencies import DependencyGraph
+from nefelibata.post import Post, document_cache
+from nefelibata.repository import PostRepository
+from nefelibata.utils import (
+    materialize_file,
+    write_if_changed,
+    write_stream_if_changed,
+)
 
 _logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Jinja2 environments, shared by builders using the same templates
+_environments: Dict[Tuple[Path, Optional[Path]], Environment] = {}
+
+# builders in a worker process, sent once when the worker starts
+_worker_builders: Dict[str, "Builder"] = {}
+
+
+def load_environment(
+    directory: Path,
+    cache_directory: Optional[Path] = None,
+) -> Environment:
+    """
+    Return a Jinja2 environment for a directory with templates.
+
+    Environments are shared, so that templates are compiled only once per run even
+    if the builders are instantiated multiple times. If ``cache_directory`` is set
+    the compiled templates are also stored on disk, and reused as long as their
+    source doesn't change.
+    """
+    key = (directory, cache_directory)
+    if key not in _environments:
+        bytecode_cache = None
+        if cache_directory is not None:
+            cache_directory.mkdir(parents=True, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(str(cache_directory))
+
+        _environments[key] = Environment(
+            loader=FileSystemLoader(str(directory)),
+            lstrip_blocks=True,
+            trim_blocks=True,
+            autoescape=select_autoescape(["html", "xml"]),
+            bytecode_cache=bytecode_cache,
+        )
+
+    return _environments[key]
+
+
+class Page:  # pylint: disable=too-few-public-methods
+
+    """
+    A page of an index or feed.
+
+    Names are relative to the build directory of the builder, so templates can
+    link to pages with ``home / page.name``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        posts: List[Post],
+        previous: Optional[str] = None,
+        current: Optional[str] = None,
+    ):
+        self.name = name
+        self.posts = posts
+
+        # the page with older posts, if any
+        self.previous = previous
+
+        # the current page, if this is an archived page
+        self.current = current
+
+
+def get_page_name(name: str, number: int) -> str:
+    """
+    Return the name of an archived page, eg, ``tags/python.1.html``.
+    """
+    path = PurePosixPath(name)
+    return str(path.with_name(f"{path.stem}.{number}{path.suffix}"))
 
-class Builder:
+
+def paginate(name: str, posts: List[Post], page_size: int = 0) -> List[Page]:
+    """
+    Split posts, sorted from newest to oldest, into pages.
+
+    The current page (``name``) has the most recent posts. The remaining posts are
+    archived in pages with a fixed set of posts, numbered from the oldest, so that
+    publishing new posts doesn't modify existing archived pages. This follows the
+    archived feeds from RFC 5005.
+
+    If ``page_size`` is zero all posts are kept in a single page.
+    """
+    if page_size <= 0 or len(posts) <= page_size:
+        return [Page(name, posts)]
+
+    # archive full pages of the oldest posts, so that at least the newest post is
+    # only in the current page
+    oldest_first = posts[::-1]
+    archived = (len(posts) - 1) // page_size
+    pages = [
+        Page(
+            get_page_name(name, number),
+            oldest_first[(number - 1) * page_size : number * page_size][::-1],
+            previous=get_page_name(name, number - 1) if number > 1 else None,
+            current=name,
+        )
+        for number in range(1, archived + 1)
+    ]
+
+    # the current page always shows the most recent posts
+    pages.insert(0, Page(name, posts[:page_size], get_page_name(name, archived)))
+
+    return pages
+
+
+class Builder:  # pylint: disable=too-many-instance-attributes
 
     """
     A post builder.
@@ -40,15 +169,79 @@ class Builder:
     # A list of templates that should be processed when building the site.
     site_templates: List[str] = []
 
-    def __init__(
-        self, root: Path, config: Config, home: str, path: str = "", **kwargs: Any
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        root: Path,
+        config: Config,
+        home: str,
+        path: str = "",
+        repository: Optional[PostRepository] = None,
+        graph: Optional[DependencyGraph] = None,
+        executor: Optional[Executor] = None,
+        page_size: int = 0,
+        enclosure_strategy: str = "copy",
+        **kwargs: Any,
     ):
         self.root = root
         self.config = config
         self.path = path or self.name
         self.home = URL(home)
+        self.graph = graph or DependencyGraph(root, config, enabled=False)
+        self.repository = repository or PostRepository(
+            root,
+            config,
+            lazy=True,
+            stats=self.graph.stats,
+        )
+        self.executor = executor
+        self.page_size = page_size
+
+        # the name of the builder in worker processes (see ``create_executor``)
+        self.worker_name: Optional[str] = None
+
+        self.enclosure_strategy = enclosure_strategy
         self.kwargs = kwargs
 
+        self._template_paths: Dict[str, List[Path]] = {}
+
+        # rendered content, persisted if the repository uses the cache
+        self.render_cache = ContentCache(
+            namespace=self.get_render_key(),
+            size=256,
+            directory=root / CACHE_DIRECTORY / RENDER_CACHE_DIRECTORY / self.name
+            if self.repository.use_cache
+            else None,
+        )
+
+        self.env = self.get_environment()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """
+        Return the state of the builder, when sending it to a worker process.
+
+        Workers only render templates, so run-scoped objects are replaced with
+        empty ones, and the environment is loaded again in the worker.
+        """
+        state = self.__dict__.copy()
+        del state["env"]
+        state["repository"] = PostRepository(
+            self.root,
+            self.config,
+            self.repository.use_cache,
+            lazy=True,
+        )
+        state["graph"] = DependencyGraph(self.root, self.config, enabled=False)
+        state["executor"] = None
+        state["worker_name"] = None
+        state["render_cache"] = ContentCache(
+            namespace=self.render_cache.namespace,
+            size=self.render_cache.size,
+            directory=self.render_cache.directory,
+        )
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
         self.env = self.get_environment()
 
     def setup(self) -> None:
@@ -98,24 +291,160 @@ class Builder:
         """
         return self.home / f"{post.url}{self.extension}"
 
-    @staticmethod
-    def render(content: str) -> str:
+    def get_render_key(self) -> str:
         """
-        Render the post content.
+        Return a key identifying how content is rendered.
+
+        Rendered content is cached under this key, so it should change whenever
+        the output of ``convert`` changes for the same content, eg, when
+        extensions are added or dependencies are upgraded.
+        """
+        return f"{self.name}:{__version__}"
+
+    def convert(self, content: str) -> str:  # pylint: disable=no-self-use
+        """
+        Convert the post content to the output format.
         """
         return content
 
+    def render(self, content: str) -> str:
+        """
+        Render the post content.
+
+        Posts are rendered multiple times per build (post page, feeds, tag and
+        category pages), so the output is cached by content.
+        """
+        key = self.render_cache.get_key(content)
+        rendered = self.render_cache.get(key)
+        if rendered is None:
+            rendered = self.convert(content)
+            self.render_cache.set(key, rendered)
+
+        return cast(str, rendered)
+
     def get_environment(self) -> Environment:
         """
         Load a Jinja2 environment pointing to the templats.
         """
-        return Environment(
-            loader=FileSystemLoader(str(self.root / "templates/builders" / self.name)),
-            lstrip_blocks=True,
-            trim_blocks=True,
-            autoescape=select_autoescape(["html", "xml"]),
+        return load_environment(
+            self.root / "templates/builders" / self.name,
+            self.root / CACHE_DIRECTORY / TEMPLATE_CACHE_DIRECTORY
+            if self.repository.use_cache
+            else None,
         )
 
+    def get_context(self) -> Dict[str, Any]:
+        """
+        Return the context common to all templates.
+        """
+        return {
+            "config": self.config,
+            "home": self.home,
+            "render": self.render,
+            "__version__": __version__,
+            "sorted": sorted,
+        }
+
+    def render_template(self, template_name: str, **kwargs: Any) -> str:
+        """
+        Render a template.
+        """
+        template = self.env.get_template(template_name)
+        return template.render(**self.get_context(), **kwargs)
+
+    def write_template(self, path: Path, template_name: str, **kwargs: Any) -> bool:
+        """
+        Render a template straight to a file, returning true if the file changed.
+
+        The output is written as it's generated, so memory usage doesn't grow with
+        the size of the output (eg, a feed with the content of every post).
+        """
+        template = self.env.get_template(template_name)
+        chunks = template.generate(**self.get_context(), **kwargs)
+        return write_stream_if_changed(path, chunks)
+
+    async def run_in_executor(
+        self,
+        function: Callable[..., T],
+        *args: Any,
+        **kwargs: Any,
+    ) -> T:
+        """
+        Run a function, in the executor if the builder has one.
+
+        With a process pool posts and indexes are rendered in parallel; the caller
+        still records dependencies and logs in the main process. If the pool was
+        created with ``create_executor`` methods of the builder are called on the
+        copy already in the worker, instead of sending the builder with each task.
+        """
+        if self.executor is None:
+            return function(*args, **kwargs)
+
+        if self.worker_name is not None and getattr(function, "__self__", None) is self:
+            task = partial(
+                call_worker_builder,
+                self.worker_name,
+                function.__name__,
+                *args,
+                **kwargs,
+            )
+        else:
+            task = partial(function, *args, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, task)
+
+    def get_template_paths(self, name: str) -> List[Path]:
+        """
+        Return the paths of a template and of all the templates it references.
+
+        This includes templates that are extended, included or imported.
+        """
+        if name not in self._template_paths:
+            paths = []
+            seen = set()
+            queue = [name]
+            while queue:
+                current = queue.pop()
+                if current in seen:
+                    continue
+                seen.add(current)
+
+                source, filename, _ = self.env.loader.get_source(  # type: ignore
+                    self.env,
+                    current,
+                )
+                paths.append(Path(filename))
+                queue.extend(
+                    reference
+                    for reference in meta.find_referenced_templates(
+                        self.env.parse(source),
+                    )
+                    if reference is not None
+                )
+
+            self._template_paths[name] = paths
+
+        return self._template_paths[name]
+
+    def clear_template_paths(self) -> None:
+        """
+        Forget the templates referenced by each template.
+
+        This should be called when templates are modified.
+        """
+        self._template_paths.clear()
+
+    def get_post_inputs(self, post: Post) -> List[Path]:
+        """
+        Return the files used to build a post.
+
+        This includes the post, its YAML files and its enclosures. The post
+        directory is scanned only once per run, storing the stats of its files.
+        """
+        directory = self.graph.stats.scan(post.path.parent)
+        return [path for path, _ in directory.files]
+
     async def process_post(self, post: Post, force: bool = False) -> None:
         """
         Process a single post.
@@ -126,68 +455,110 @@ class Builder:
             / self.path
             / post.path.relative_to(self.root / "posts").with_suffix(self.extension)
         )
-        last_update = post_path.stat().st_mtime if post_path.exists() else None
 
         # create directories if needed
         post_directory = post_path.parent
         if not post_directory.exists():
             post_directory.mkdir(parents=True, exist_ok=True)
 
-        if last_update and post.path.stat().st_mtime < last_update and not force:
+        template_name = f"{self.template_base}{post.type}{self.extension}"
+        signatures = self.graph.get_signatures(
+            self.get_post_inputs(post) + self.get_template_paths(template_name),
+        )
+        last_modified = self.graph.stats.get_last_modified([post.path])
+        if not force and self.graph.is_up_to_date(post_path, signatures, last_modified):
             _logger.debug("Post %s is up-to-date, nothing to do", post_path)
+            self.graph.record(post_path, signatures)
             return
 
-        template = self.env.get_template(
-            f"{self.template_base}{post.type}{self.extension}",
-        )
-        content = template.render(
-            config=self.config,
+        content = await self.run_in_executor(
+            self.render_template,
+            template_name,
             post=post,
-            home=self.home,
-            render=self.render,
-            __version__=__version__,
-            sorted=sorted,
         )
 
-        _logger.info("Creating %s post", self.label)
-        with open(post_path, "w", encoding="utf-8") as output:
-            output.write(content)
+        if write_if_changed(post_path, content):
+            _logger.info("Creating %s post", self.label)
+        else:
+            _logger.debug("Post %s is unchanged", post_path)
 
         for enclosure in post.enclosures:
-            _logger.info("Copying enclosure %s", enclosure.path)
             target = post_directory / enclosure.path.relative_to(post.path.parent)
             target.parent.mkdir(parents=True, exist_ok=True)
-            shutil.copy(enclosure.path, target)
+            if materialize_file(enclosure.path, target, self.enclosure_strategy):
+                _logger.info("Creating enclosure %s", target)
+                self.graph.record_materialized(target)
+            else:
+                _logger.debug("Enclosure %s is unchanged", target)
 
-    async def process_site(self, force: bool = False) -> None:
+        self.graph.record(post_path, signatures)
+
+    async def process_site(  # pylint: disable=too-many-locals
+        self,
+        force: bool = False,
+    ) -> None:
         """
         Process the entire site.
         """
-        posts = get_posts(self.root, self.config)
+        posts = self.repository.get_posts()
+        inputs = {post.path: self.get_post_inputs(post) for post in posts}
+        last_modified = {
+            post.path: self.graph.stats.get_last_modified([post.path]) for post in posts
+        }
+        tasks = []
 
         # build index and feed
         for asset in self.site_templates:
             path = self.root / "build" / self.path / asset
             template_name = f"{self.template_base}{asset}"
-            self._build_index(path, template_name, posts, force)
+            tasks.append(
+                self._build_index(
+                    path,
+                    template_name,
+                    posts,
+                    inputs,
+                    max(last_modified.values(), default=0.0),
+                    force,
+                ),
+            )
 
         # template for groups (tags and categories)
         template_name = f"{self.template_base}group{self.extension}"
 
-        # group posts by tag
+        # group posts by tag, keeping track of the newest modification in each group
         tags = defaultdict(list)
+        tags_last_modified: Dict[str, float] = defaultdict(float)
         for post in posts:
             for tag in sorted(post.tags):
                 tags[tag].append(post)
+                tags_last_modified[tag] = max(
+                    tags_last_modified[tag],
+                    last_modified[post.path],
+                )
         for tag, tag_posts in tags.items():
             path = self.root / "build" / self.path / "tags" / (tag + self.extension)
-            self._build_index(path, template_name, tag_posts, force, title=tag)
+            tasks.append(
+                self._build_index(
+                    path,
+                    template_name,
+                    tag_posts,
+                    inputs,
+                    tags_last_modified[tag],
+                    force,
+                    title=tag,
+                ),
+            )
 
         # group tags by categories
         categories = defaultdict(list)
+        categories_last_modified: Dict[str, float] = defaultdict(float)
         for post in posts:
             for category in sorted(post.categories):
                 categories[category].append(post)
+                categories_last_modified[category] = max(
+                    categories_last_modified[category],
+                    last_modified[post.path],
+                )
         for category, category_posts in categories.items():
             path = (
                 self.root
@@ -198,58 +569,139 @@ class Builder:
             )
             title = self.config.categories[category].label
             subtitle = self.config.categories[category].description
-            self._build_index(
-                path,
-                template_name,
-                category_posts,
-                force,
-                title=title,
-                subtitle=subtitle,
+            tasks.append(
+                self._build_index(
+                    path,
+                    template_name,
+                    category_posts,
+                    inputs,
+                    categories_last_modified[category],
+                    force,
+                    title=title,
+                    subtitle=subtitle,
+                ),
             )
 
-    def _build_index(
+        await asyncio.gather(*tasks)
+
+    async def _build_index(  # pylint: disable=too-many-arguments
         self,
         path: Path,
         template_name: str,
         posts: List[Post],
+        inputs: Dict[Path, List[Path]],
+        last_modified: float,
         force: bool = False,
         **kwargs: Any,
     ) -> None:
         """
-        Build an index file from a list of posts.
+        Build an index file from a list of posts, split in pages if needed.
+
+        ``inputs`` has the files used to build each post, and ``last_modified`` is
+        the modification time of the most recently modified post.
         """
-        last_update = path.stat().st_mtime if path.exists() else None
+        name = path.relative_to(self.root / "build" / self.path).as_posix()
+        await asyncio.gather(
+            *[
+                self._build_page(
+                    page,
+                    template_name,
+                    inputs,
+                    last_modified,
+                    force,
+                    **kwargs,
+                )
+                for page in paginate(name, posts, self.page_size)
+            ]
+        )
 
-        if (
-            last_update
-            and all(post.path.stat().st_mtime < last_update for post in posts)
-            and not force
-        ):
+    async def _build_page(  # pylint: disable=too-many-arguments
+        self,
+        page: Page,
+        template_name: str,
+        inputs: Dict[Path, List[Path]],
+        last_modified: float,
+        force: bool = False,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Build a single page of an index.
+        """
+        path = self.root / "build" / self.path / page.name
+        paths = [path for post in page.posts for path in inputs[post.path]]
+        signatures = self.graph.get_signatures(
+            paths + self.get_template_paths(template_name),
+        )
+        if not force and self.graph.is_up_to_date(path, signatures, last_modified):
             _logger.debug("File %s is up-to-date, nothing to do", path)
+            self.graph.record(path, signatures)
             return
 
-        template = self.env.get_template(template_name)
-        content = template.render(
-            config=self.config,
-            posts=posts,
-            home=self.home,
-            __version__=__version__,
-            render=self.render,
-            sorted=sorted,
+        if await self.run_in_executor(
+            self.write_template,
+            path,
+            template_name,
+            posts=page.posts,
+            page=page,
             **kwargs,
-        )
+        ):
+            _logger.info("Creating %s", path)
+        else:
+            _logger.debug("File %s is unchanged", path)
+
+        self.graph.record(path, signatures)
+
 
-        _logger.info("Creating %s", path)
-        with open(path, "w", encoding="utf-8") as output:
-            output.write(content)
+def init_worker(builders: Dict[str, Builder], directory: Optional[Path]) -> None:
+    """
+    Store the builders in a worker process, when the worker starts.
+    """
+    _worker_builders.update(builders)
+    document_cache.directory = directory
+
+
+def call_worker_builder(name: str, method: str, *args: Any, **kwargs: Any) -> Any:
+    """
+    Call a method of a builder in a worker process.
+    """
+    return getattr(_worker_builders[name], method)(*args, **kwargs)
+
+
+def create_executor(builders: Dict[str, Builder], workers: int) -> ProcessPoolExecutor:
+    """
+    Create a process pool where the builders render templates.
+
+    The builders are sent to each worker once, when it starts, so that workers
+    keep their render caches between tasks. Workers are spawned instead of forked,
+    since the main process might already be running threads and network sessions.
+    """
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(builders, document_cache.directory),
+    )
+    for name, builder in builders.items():
+        builder.executor = executor
+        builder.worker_name = name
+
+    return executor
 
 
 def get_builders(
     root: Path,
     config: Config,
+    repository: Optional[PostRepository] = None,
+    graph: Optional[DependencyGraph] = None,
+    executor: Optional[Executor] = None,
 ) -> Dict[str, Builder]:
     """
     Return all the builders.
+
+    If a repository is passed it's shared by all the builders; otherwise each
+    builder loads posts on its own. Similarly, if a dependency graph is passed
+    the inputs of each output are recorded in it, and if an executor is passed
+    templates are rendered in it.
     """
     classes = {
         entry_point.name: entry_point.load()
@@ -260,6 +712,13 @@ def get_builders(
     for builder_name, builder_config in config.builders.items():
         class_ = classes[builder_config.plugin]
 
-        builders[builder_name] = class_(root, config, **builder_config.dict())
+        builders[builder_name] = class_(
+            root,
+            config,
+            repository=repository,
+            graph=graph,
+            executor=executor,
+            **builder_config.dict(),
+        )
 
     return builders
@@ -14,6 +14,7 @@ from marko.renderer import Renderer
 
 from nefelibata.builders.base import Builder
 from nefelibata.config import Config
+from nefelibata.post import parse_markdown
 
 _logger = logging.getLogger(__name__)
 
@@ -268,6 +269,9 @@ class GeminiBuilder(Builder):
 
         self.setup()
 
-    def render(self, content: str) -> str:
+    def get_render_key(self) -> str:
+        return f"{super().get_render_key()}:marko-{marko.__version__}"
+
+    def convert(self, content: str) -> str:
         gemini = marko.Markdown(renderer=GemtextRenderer)
-        return str(gemini.convert(content).strip())
+        return str(gemini.render(parse_markdown(content)).strip())
@@ -9,6 +9,7 @@ import marko
 
 from nefelibata.builders.base import Builder
 from nefelibata.config import Config
+from nefelibata.post import parse_markdown
 
 _logger = logging.getLogger(__name__)
 
@@ -24,6 +25,9 @@ class HTMLBuilder(Builder):
     extension = ".html"
     site_templates = ["index.html", "atom.xml"]
 
+    # Marko extensions used when rendering posts
+    extensions = ["codehilite"]
+
     def __init__(  # pylint: disable=too-many-arguments
         self,
         root: Path,
@@ -46,7 +50,10 @@ class HTMLBuilder(Builder):
         if css_directory.exists() and not target.exists():
             target.symlink_to(css_directory, target_is_directory=True)
 
-    @staticmethod
-    def render(content: str) -> str:
-        markdown = marko.Markdown(extensions=["codehilite"])
-        return str(markdown.convert(content))
+    def get_render_key(self) -> str:
+        extensions = ",".join(self.extensions)
+        return f"{super().get_render_key()}:marko-{marko.__version__}:{extensions}"
+
+    def convert(self, content: str) -> str:
+        markdown = marko.Markdown(extensions=self.extensions)
+        return str(markdown.render(parse_markdown(content)))
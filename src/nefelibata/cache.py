@@ -0,0 +1,251 @@
+"""
+Persistent caches.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import time
+from collections import OrderedDict
+from contextlib import suppress
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional, Tuple
+
+from nefelibata import __version__
+from nefelibata.config import Config
+from nefelibata.constants import (
+    CACHE_DIRECTORY,
+    CACHE_MAX_AGE,
+    POST_CACHE_FILENAME,
+)
+from nefelibata.inventory import Fingerprint
+
+if TYPE_CHECKING:  # pragma: no cover
+    from nefelibata.post import Post
+
+_logger = logging.getLogger(__name__)
+
+
+def write_pickle(path: Path, value: Any) -> None:
+    """
+    Store a value in a file atomically.
+
+    Each call writes to its own temporary file, since other processes might be
+    storing the same file at the same time.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temporary_path = tempfile.mkstemp(
+        dir=path.parent,
+        prefix=f".{path.name}.",
+        suffix=".tmp",
+    )
+    try:
+        with os.fdopen(descriptor, "wb") as output:
+            pickle.dump(value, output)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def get_config_key(config: Config) -> str:
+    """
+    Return a key identifying the parts of the configuration used to build posts.
+
+    Posts depend on the categories (computed from tags) and on the announcers
+    (the default value for ``announce-on``). The version is also included, so that
+    the cache is discarded when Nefelibata is upgraded.
+    """
+    payload = config.json(include={"categories", "announcers"}, sort_keys=True)
+    digest = hashlib.sha256(f"{__version__}:{payload}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class PostCache:
+
+    """
+    A persistent index of parsed posts.
+
+    Posts are stored with the fingerprint of their files, and are reused for as
+    long as none of the files have changed.
+    """
+
+    def __init__(self, root: Path, config: Config, enabled: bool = True):
+        self.path = root / CACHE_DIRECTORY / POST_CACHE_FILENAME
+        self.key = get_config_key(config)
+        self.enabled = enabled
+
+        self.entries: Dict[Path, Tuple[Fingerprint, "Post"]] = {}
+        self.modified = False
+
+        self.hits = 0
+        self.misses = 0
+
+        if self.enabled:
+            self.load()
+
+    def load(self) -> None:
+        """
+        Load the index from disk.
+        """
+        if not self.path.exists():
+            return
+
+        try:
+            with open(self.path, "rb") as input_:
+                key, entries = pickle.load(input_)
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            _logger.warning("Invalid post cache: %s", self.path)
+            return
+
+        if key == self.key:
+            self.entries = entries
+
+    def get(self, path: Path, fingerprint: Fingerprint) -> Optional["Post"]:
+        """
+        Return a cached post, if it's still fresh.
+        """
+        if self.enabled and path in self.entries:
+            cached_fingerprint, post = self.entries[path]
+            if cached_fingerprint == fingerprint:
+                self.hits += 1
+                return post
+
+        self.misses += 1
+        return None
+
+    def set(self, path: Path, fingerprint: Fingerprint, post: "Post") -> None:
+        """
+        Store a post in the index.
+        """
+        self.entries[path] = (fingerprint, post)
+        self.modified = True
+
+    def prune(self, paths: Iterable[Path]) -> None:
+        """
+        Remove entries of posts that no longer exist.
+        """
+        paths = set(paths)
+        for path in list(self.entries):
+            if path not in paths:
+                del self.entries[path]
+                self.modified = True
+
+    def save(self) -> None:
+        """
+        Persist the index to disk, if it was modified.
+        """
+        if not self.enabled or not self.modified:
+            return
+
+        write_pickle(self.path, (self.key, self.entries))
+        self.modified = False
+
+
+class ContentCache:
+
+    """
+    A cache for values computed from content, eg, parsed Markdown.
+
+    Values are keyed by a hash of the content, and the most recently used ones are
+    kept in memory. If ``directory`` is set values are also stored on disk, so they
+    can be reused across runs. The modification time of the files on disk is
+    updated whenever they're used, so that ``prune`` can remove stale entries.
+    """
+
+    def __init__(
+        self,
+        namespace: str = "",
+        size: int = 128,
+        directory: Optional[Path] = None,
+    ):
+        self.namespace = namespace
+        self.size = size
+        self.directory = directory
+
+        self.entries: "OrderedDict[str, Any]" = OrderedDict()
+
+    def get_key(self, content: str) -> str:
+        """
+        Return the key for a given content.
+        """
+        payload = f"{self.namespace}:{content}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def _remember(self, key: str, value: Any) -> None:
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries or (
+            self.directory is not None and (self.directory / f"{key}.pickle").exists()
+        )
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Return a cached value, or ``None`` if it's not in the cache.
+        """
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        if self.directory is None:
+            return None
+
+        path = self.directory / f"{key}.pickle"
+        if not path.exists():
+            return None
+
+        try:
+            with open(path, "rb") as input_:
+                value = pickle.load(input_)
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            _logger.warning("Invalid cache entry: %s", path)
+            return None
+
+        # mark the entry as used; it might have been pruned by another process
+        with suppress(FileNotFoundError):
+            os.utime(path)
+
+        self._remember(key, value)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Store a value in the cache.
+        """
+        self._remember(key, value)
+
+        if self.directory is None:
+            return
+
+        write_pickle(self.directory / f"{key}.pickle", value)
+
+    def clear(self) -> None:
+        """
+        Remove all values from memory.
+        """
+        self.entries.clear()
+
+    def prune(self, max_age: float = CACHE_MAX_AGE) -> None:
+        """
+        Remove values that haven't been used recently from disk.
+
+        Values are stored by content, so every edit leaves an old entry behind.
+        """
+        if self.directory is None or not self.directory.exists():
+            return
+
+        threshold = time.time() - max_age
+        count = 0
+        for path in self.directory.iterdir():
+            with suppress(FileNotFoundError):
+                if path.stat().st_mtime < threshold:
+                    path.unlink()
+                    count += 1
+
+        _logger.debug("Removed %d stale entries from %s", count, self.directory)
@@ -4,17 +4,27 @@ Build the blog.
 import asyncio
 import logging
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict
+from typing import Any, Awaitable, Dict, Mapping, Optional
 
 import yaml
 
-from nefelibata.announcers.base import Announcer, Interaction, Scope, get_announcers
-from nefelibata.assistants.base import get_assistants
-from nefelibata.builders.base import get_builders
-from nefelibata.constants import INTERACTIONS_FILENAME
-from nefelibata.post import Post, get_posts
-from nefelibata.utils import dict_merge, get_config, load_yaml
+from nefelibata.announcers.base import Announcer, Interaction, Scope
+from nefelibata.assistants.base import Assistant
+from nefelibata.builders.base import Builder, create_executor
+from nefelibata.constants import (
+    CACHE_DIRECTORY,
+    DOCUMENT_CACHE_DIRECTORY,
+    INTERACTIONS_FILENAME,
+)
+from nefelibata.dependencies import DependencyGraph
+from nefelibata.governor import Governor
+from nefelibata.inventory import get_inventory
+from nefelibata.post import Post, document_cache, normalize_post
+from nefelibata.registry import PluginRegistry
+from nefelibata.repository import PostRepository
+from nefelibata.utils import dict_merge, get_config, load_yaml, write_if_changed
 
 _logger = logging.getLogger(__name__)
 
@@ -45,30 +55,147 @@ async def collect_site(
 async def save_interactions(
     post_directory: Path,
     interactions: Dict[str, Interaction],
-) -> None:
+) -> bool:
     """
     Save new post interactions.
+
+    Returns true if the file was modified.
     """
     path = post_directory / INTERACTIONS_FILENAME
     current_interactions = load_yaml(path, Interaction)
     # recursive update
     dict_merge(current_interactions, interactions)
-    with open(path, "w", encoding="utf-8") as output:
-        return yaml.dump(
-            {
-                name: interaction.dict()
-                for name, interaction in current_interactions.items()
-            },
-            output,
+    content = yaml.dump(
+        {
+            name: interaction.dict()
+            for name, interaction in current_interactions.items()
+        },
+    )
+
+    # don't touch the file if there are no new interactions, since that would
+    # cause the post to be built again
+    return write_if_changed(path, content)
+
+
+async def store_site_interactions(  # pylint: disable=too-many-arguments
+    path: Path,
+    interactions: Dict[str, Interaction],
+    pipeline: Optional[Awaitable[Any]],
+    builders: Dict[str, Builder],
+    repository: PostRepository,
+    force: bool = False,
+) -> None:
+    """
+    Store site interactions for a given path.
+
+    If the path is a post being built its pipeline is waited for, and the post is
+    built again if the interactions are new.
+    """
+    if pipeline is not None:
+        await pipeline
+
+    if await save_interactions(path.parent, interactions) and pipeline is not None:
+        repository.invalidate(path)
+        post = repository.get_post(path)
+        await asyncio.gather(
+            *[builder.process_post(post, force) for builder in builders.values()]
         )
 
 
+async def collect_site_interactions(  # pylint: disable=too-many-arguments
+    announcers: Dict[str, Announcer],
+    pipelines: Mapping[Path, Awaitable[Any]],
+    builders: Dict[str, Builder],
+    repository: PostRepository,
+    governor: Governor,
+    force: bool = False,
+) -> None:
+    """
+    Collect site interactions from all announcers.
+
+    Site interactions can belong to any post, so posts are not held up by them.
+    Instead, each post that received new interactions is built again once its
+    pipeline is done.
+    """
+    site_interactions: Dict[Path, Dict[str, Interaction]] = defaultdict(dict)
+    await asyncio.gather(
+        *[
+            governor.run(name, collect_site(announcer, site_interactions))
+            for name, announcer in announcers.items()
+        ]
+    )
+    await asyncio.gather(
+        *[
+            store_site_interactions(
+                path,
+                interactions,
+                pipelines.get(path),
+                builders,
+                repository,
+                force,
+            )
+            for path, interactions in site_interactions.items()
+        ]
+    )
+
+
+async def run_post_pipeline(  # pylint: disable=too-many-arguments
+    post: Post,
+    announcers: Dict[str, Announcer],
+    assistants: Dict[str, Assistant],
+    builders: Dict[str, Builder],
+    repository: PostRepository,
+    post_interactions: Dict[Path, Dict[str, Interaction]],
+    site_assistance: Awaitable[Any],
+    governor: Governor,
+    force: bool = False,
+) -> None:
+    """
+    Collect interactions, run assistants and build a single post.
+
+    Each post moves through the pipeline on its own, so a slow announcer only
+    delays the posts it's collecting interactions from. As before, the post is
+    built only after the site assistants are done.
+    """
+    await asyncio.gather(
+        *[
+            governor.run(name, collect_post(post, announcer, post_interactions))
+            for name, announcer in announcers.items()
+            if name in post.announcers
+        ]
+    )
+
+    if post.path in post_interactions:
+        await save_interactions(post.path.parent, post_interactions[post.path])
+        repository.invalidate(post.path)
+
+    await asyncio.gather(
+        *[
+            governor.run(name, assistant.process_post(post, force))
+            for name, assistant in assistants.items()
+        ]
+    )
+    await site_assistance
+
+    # reload the post if it was modified by the interactions or the assistants
+    post = repository.get_post(post.path)
+    await asyncio.gather(
+        *[builder.process_post(post, force) for builder in builders.values()]
+    )
+
+
 async def run(  # pylint: disable=too-many-locals
     root: Path,
     force: bool = False,
+    use_cache: bool = True,
+    workers: int = 1,
 ) -> None:
     """
     Build blog from Markdown files and online interactions.
+
+    Each post goes through its own pipeline (collecting interactions, running
+    assistants and building), while interactions are collected from the site in
+    parallel. The site is built once all posts are done.
     """
     _logger.info("Building blog")
 
@@ -80,69 +207,92 @@ async def run(  # pylint: disable=too-many-locals
         _logger.info("Creating `build/` directory")
         build.mkdir()
 
-    posts = get_posts(root, config)
+    # store default values for missing headers, preserving modification times
+    _logger.info("Normalizing posts")
+    for directory in get_inventory(root / "posts").values():
+        for path in directory.posts:
+            normalize_post(root, config, path)
+
+    # persist parsed Markdown, so unchanged posts are not parsed again
+    document_cache.directory = (
+        root / CACHE_DIRECTORY / DOCUMENT_CACHE_DIRECTORY if use_cache else None
+    )
 
-    # collect interactions from posts/site
-    tasks = []
+    # posts are loaded once and shared by all the plugins; the graph records the
+    # inputs of each output, so it's notified when posts are modified
+    graph = DependencyGraph(root, config)
+    repository = PostRepository(root, config, use_cache, workers, stats=graph.stats)
+    posts = repository.get_posts()
     post_interactions: Dict[Path, Dict[str, Interaction]] = defaultdict(dict)
 
-    _logger.info("Collecting interactions from posts")
-    announcers = get_announcers(root, config, Scope.POST)
-    for post in posts:
-        for name, announcer in announcers.items():
-            if name in post.announcers:
-                task = asyncio.create_task(
-                    collect_post(post, announcer, post_interactions),
-                )
-                tasks.append(task)
-
-    _logger.info("Collecting interactions from site")
-    announcers = get_announcers(root, config, Scope.SITE)
-    for announcer in announcers.values():
-        task = asyncio.create_task(collect_site(announcer, post_interactions))
-        tasks.append(task)
-
-    await asyncio.gather(*tasks)
-
-    # store new interactions
-    tasks = []
-    for path, interactions in post_interactions.items():
-        task = asyncio.create_task(save_interactions(path.parent, interactions))
-        tasks.append(task)
-
-    await asyncio.gather(*tasks)
-
-    # run assistants
-    tasks = []
-
-    _logger.info("Running post assistants")
-    assistants = get_assistants(root, config, Scope.POST)
-    for post in posts:
-        for assistant in assistants.values():
-            task = asyncio.create_task(assistant.process_post(post, force))
-            tasks.append(task)
-
-    _logger.info("Running site assistants")
-    assistants = get_assistants(root, config, Scope.SITE)
-    for assistant in assistants.values():
-        task = asyncio.create_task(assistant.process_site(force))
-        tasks.append(task)
-
-    await asyncio.gather(*tasks)
-
-    # build posts/site
-    tasks = []
-    builders = get_builders(root, config)
-
-    _logger.info("Processing posts")
-    for post in posts:
-        for builder in builders.values():
-            task = asyncio.create_task(builder.process_post(post, force))
-            tasks.append(task)
-
-    _logger.info("Processing site")
-    for builder in builders.values():
-        task = asyncio.create_task(builder.process_site(force))
-        tasks.append(task)
+    # limits on the concurrent work done by announcers and assistants
+    governor = Governor(config.concurrency)
+
+    # plugins are built once and shared by all the phases of the build
+    registry = PluginRegistry(root, config, repository, graph, governor=governor)
+    builders = registry.builders
 
-    await asyncio.gather(*tasks)
+    # build posts/site, rendering templates in parallel if requested
+    executor: Optional[ProcessPoolExecutor] = None
+    if workers > 1:
+        executor = create_executor(builders, workers)
+
+    try:
+        _logger.info("Running site assistants")
+        assistants = registry.get_assistants(Scope.SITE)
+        site_assistance = asyncio.gather(
+            *[
+                governor.run(name, assistant.process_site(force))
+                for name, assistant in assistants.items()
+            ]
+        )
+
+        _logger.info("Processing posts")
+        announcers = registry.get_announcers(Scope.POST)
+        assistants = registry.get_assistants(Scope.POST)
+        pipelines = {
+            post.path: asyncio.create_task(
+                run_post_pipeline(
+                    post,
+                    announcers,
+                    assistants,
+                    builders,
+                    repository,
+                    post_interactions,
+                    site_assistance,
+                    governor,
+                    force,
+                ),
+            )
+            for post in posts
+        }
+
+        _logger.info("Collecting interactions from site")
+        site_collection = collect_site_interactions(
+            registry.get_announcers(Scope.SITE),
+            pipelines,
+            builders,
+            repository,
+            governor,
+            force,
+        )
+
+        await asyncio.gather(site_assistance, site_collection, *pipelines.values())
+
+        # the site is built from all the posts, so it waits for their pipelines
+        _logger.info("Processing site")
+        await asyncio.gather(
+            *[builder.process_site(force) for builder in builders.values()]
+        )
+    finally:
+        await governor.close()
+        if executor is not None:
+            executor.shutdown()
+
+    # store the inputs of each output, for the next build
+    graph.save()
+
+    # every edit to a post leaves cached content behind, so old entries are removed
+    document_cache.prune()
+    for builder in builders.values():
+        builder.render_cache.prune()
@@ -9,10 +9,13 @@ from typing import Dict, Optional
 
 import yaml
 
-from nefelibata.announcers.base import Announcement, Announcer, Scope, get_announcers
+from nefelibata.announcers.base import Announcement, Announcer, Scope
 from nefelibata.constants import ANNOUNCEMENTS_FILENAME, PUBLISHINGS_FILENAME
-from nefelibata.post import Post, get_posts
-from nefelibata.publishers.base import Publisher, Publishing, get_publishers
+from nefelibata.governor import Governor
+from nefelibata.post import Post
+from nefelibata.publishers.base import Publisher, Publishing
+from nefelibata.registry import PluginRegistry
+from nefelibata.repository import PostRepository
 from nefelibata.utils import get_config, load_yaml
 
 _logger = logging.getLogger(__name__)
@@ -78,6 +81,8 @@ async def save_announcements(
 async def run(  # pylint: disable=too-many-locals
     root: Path,
     force: bool = False,
+    use_cache: bool = True,
+    workers: int = 1,
 ) -> None:
     """
     Publish blog.
@@ -87,70 +92,93 @@ async def run(  # pylint: disable=too-many-locals
     config = get_config(root)
     _logger.debug(config)
 
-    # publish site
-    publishings = load_yaml(root / PUBLISHINGS_FILENAME, Publishing)
-    tasks = []
-    for name, publisher in get_publishers(root, config).items():
-        since = publishings[name].timestamp if name in publishings else None
-        task = asyncio.create_task(
-            publish_site(name, publisher, publishings, since, force),
-        )
-        tasks.append(task)
+    # posts are loaded once and shared by all the announcers; most announcers only
+    # need the headers of a post, so posts that are not cached are loaded lazily
+    repository = PostRepository(root, config, use_cache, workers, lazy=True)
 
-    await asyncio.gather(*tasks)
+    # limits on the concurrent work done by publishers and announcers
+    governor = Governor(config.concurrency)
 
-    # persist publishings
-    with open(root / PUBLISHINGS_FILENAME, "w", encoding="utf-8") as output:
-        yaml.dump(
-            {name: publishing.dict() for name, publishing in publishings.items()},
-            output,
-        )
+    # plugins are built once and shared by publishing and announcing
+    registry = PluginRegistry(root, config, repository, governor=governor)
 
-    # announcements
-    tasks = []
+    try:
+        # publish site
+        publishings = load_yaml(root / PUBLISHINGS_FILENAME, Publishing)
+        tasks = []
+        for name, publisher in registry.publishers.items():
+            since = publishings[name].timestamp if name in publishings else None
+            task = asyncio.create_task(
+                governor.run(
+                    name,
+                    publish_site(name, publisher, publishings, since, force),
+                ),
+            )
+            tasks.append(task)
 
-    # announce site
-    site_announcements = load_yaml(root / ANNOUNCEMENTS_FILENAME, Announcement)
-    last_published = max(publishing.timestamp for publishing in publishings.values())
-    announcers = get_announcers(root, config, Scope.SITE)
-    for name, announcer in announcers.items():
-        if (
-            name in site_announcements
-            and (
-                site_announcements[name].timestamp
-                + timedelta(seconds=site_announcements[name].grace_seconds)
+        await asyncio.gather(*tasks)
+
+        # persist publishings
+        with open(root / PUBLISHINGS_FILENAME, "w", encoding="utf-8") as output:
+            yaml.dump(
+                {name: publishing.dict() for name, publishing in publishings.items()},
+                output,
             )
-            >= last_published
-        ):
-            # already announced after last published
-            _logger.info("Announcer %s is up-to-date", name)
-            continue
 
-        task = asyncio.create_task(announce_site(name, announcer, site_announcements))
-        tasks.append(task)
+        # announcements
+        tasks = []
+
+        # announce site
+        site_announcements = load_yaml(root / ANNOUNCEMENTS_FILENAME, Announcement)
+        last_published = max(
+            publishing.timestamp for publishing in publishings.values()
+        )
+        announcers = registry.get_announcers(Scope.SITE)
+        for name, announcer in announcers.items():
+            if (
+                name in site_announcements
+                and (
+                    site_announcements[name].timestamp
+                    + timedelta(seconds=site_announcements[name].grace_seconds)
+                )
+                >= last_published
+            ):
+                # already announced after last published
+                _logger.info("Announcer %s is up-to-date", name)
+                continue
 
-    # announce posts
-    modified_post_announcements: Dict[Path, Dict[str, Announcement]] = {}
-    announcers = get_announcers(root, config, Scope.POST)
-    for post in get_posts(root, config):
-        path = post.path.parent / ANNOUNCEMENTS_FILENAME
-        post_announcements = load_yaml(path, Announcement)
-        post_announcers = {
-            name: announcers[name]
-            for name in post.announcers
-            if name in announcers and name not in post_announcements
-        }
-        for name, announcer in post_announcers.items():
             task = asyncio.create_task(
-                announce_post(name, announcer, post, post_announcements),
+                governor.run(name, announce_site(name, announcer, site_announcements)),
             )
             tasks.append(task)
 
-        # store new announcements to persist later
-        if post_announcers:
-            modified_post_announcements[post.path] = post_announcements
-
-    await asyncio.gather(*tasks)
+        # announce posts
+        modified_post_announcements: Dict[Path, Dict[str, Announcement]] = {}
+        announcers = registry.get_announcers(Scope.POST)
+        for post in repository.get_posts():
+            path = post.path.parent / ANNOUNCEMENTS_FILENAME
+            post_announcements = load_yaml(path, Announcement)
+            post_announcers = {
+                name: announcers[name]
+                for name in post.announcers
+                if name in announcers and name not in post_announcements
+            }
+            for name, announcer in post_announcers.items():
+                task = asyncio.create_task(
+                    governor.run(
+                        name,
+                        announce_post(name, announcer, post, post_announcements),
+                    ),
+                )
+                tasks.append(task)
+
+            # store new announcements to persist later
+            if post_announcers:
+                modified_post_announcements[post.path] = post_announcements
+
+        await asyncio.gather(*tasks)
+    finally:
+        await governor.close()
 
     # persist new announcements
     tasks = []
@@ -0,0 +1,193 @@
+"""
+Rebuild the blog when files change.
+"""
+import asyncio
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from nefelibata.builders.base import Builder, get_builders
+from nefelibata.config import Config
+from nefelibata.constants import (
+    CACHE_DIRECTORY,
+    CONFIG_FILENAME,
+    DOCUMENT_CACHE_DIRECTORY,
+)
+from nefelibata.dependencies import DependencyGraph
+from nefelibata.inventory import get_inventory
+from nefelibata.post import Post, document_cache, normalize_post
+from nefelibata.repository import PostRepository
+from nefelibata.utils import get_config
+from nefelibata.watcher import get_watcher
+
+_logger = logging.getLogger(__name__)
+
+# everything that is kept in memory between rebuilds
+State = Tuple[Config, PostRepository, DependencyGraph, Dict[str, Builder]]
+
+
+def load(root: Path, use_cache: bool = True, workers: int = 1) -> State:
+    """
+    Load the configuration, the posts and the builders.
+
+    These are kept in memory between rebuilds, and only reloaded when the
+    configuration changes.
+    """
+    config = get_config(root)
+    _logger.debug(config)
+
+    graph = DependencyGraph(root, config)
+    repository = PostRepository(root, config, use_cache, workers, stats=graph.stats)
+    builders = get_builders(root, config, repository, graph)
+
+    return config, repository, graph, builders
+
+
+def get_affected_posts(root: Path, changes: Iterable[Path]) -> Set[Path]:
+    """
+    Return the posts affected by a set of modified files.
+
+    Files other than posts (sidecar YAML files and enclosures) affect the posts in
+    their nearest directory with posts.
+    """
+    posts_directory = root / "posts"
+    affected = set()
+    for path in changes:
+        if not path.is_relative_to(posts_directory):
+            continue
+
+        if path.suffix == ".mkd":
+            affected.add(path)
+            continue
+
+        directory = path.parent
+        while directory != posts_directory:
+            posts = set(directory.glob("*.mkd"))
+            if posts:
+                affected.update(posts)
+                break
+            directory = directory.parent
+
+    return affected
+
+
+async def rebuild(
+    builders: Dict[str, Builder],
+    posts: List[Post],
+    graph: DependencyGraph,
+) -> None:
+    """
+    Build the given posts, and the site pages.
+
+    Outputs that are up-to-date are skipped by the builders, so only the site pages
+    where the posts appear are rendered again.
+    """
+    # files were modified since the last build
+    graph.stats.clear()
+
+    tasks = []
+    for post in posts:
+        for builder in builders.values():
+            task = asyncio.create_task(builder.process_post(post))
+            tasks.append(task)
+
+    for builder in builders.values():
+        task = asyncio.create_task(builder.process_site())
+        tasks.append(task)
+
+    await asyncio.gather(*tasks)
+
+    graph.save()
+
+
+async def handle_changes(
+    root: Path,
+    changes: Set[Path],
+    state: State,
+    use_cache: bool = True,
+    workers: int = 1,
+) -> State:
+    """
+    Rebuild the blog after files were modified.
+
+    Returns the new state, which is reloaded when the configuration changes.
+    """
+    config, repository, graph, builders = state
+
+    affected = get_affected_posts(root, changes)
+    for path in affected:
+        if path.exists():
+            normalize_post(root, config, path)
+        repository.invalidate(path)
+
+    if root / CONFIG_FILENAME in changes:
+        _logger.info("Configuration modified, reloading")
+        config, repository, graph, builders = load(root, use_cache, workers)
+        posts = repository.get_posts()
+    elif any(path.is_relative_to(root / "templates") for path in changes):
+        _logger.info("Templates modified, rebuilding posts")
+        for builder in builders.values():
+            builder.clear_template_paths()
+        posts = repository.get_posts()
+    else:
+        posts = [post for post in repository.get_posts() if post.path in affected]
+
+    _logger.info("Rebuilding blog")
+    await rebuild(builders, posts, graph)
+
+    return config, repository, graph, builders
+
+
+async def run(
+    root: Path,
+    use_cache: bool = True,
+    workers: int = 1,
+    interval: Optional[float] = None,
+) -> None:
+    """
+    Build the blog, and rebuild it whenever posts, templates or the configuration
+    change.
+
+    Unlike ``nb build`` interactions are not collected and assistants are not run,
+    so that rebuilds are fast.
+    """
+    _logger.info("Building blog")
+
+    build = root / "build"
+    if not build.exists():
+        _logger.info("Creating `build/` directory")
+        build.mkdir()
+
+    # persist parsed Markdown, so unchanged posts are not parsed again
+    document_cache.directory = (
+        root / CACHE_DIRECTORY / DOCUMENT_CACHE_DIRECTORY if use_cache else None
+    )
+
+    config = get_config(root)
+    for directory in get_inventory(root / "posts").values():
+        for path in directory.posts:
+            normalize_post(root, config, path)
+
+    state = load(root, use_cache, workers)
+    _, repository, graph, builders = state
+    await rebuild(builders, repository.get_posts(), graph)
+    document_cache.prune()
+    for builder in builders.values():
+        builder.render_cache.prune()
+
+    watcher = get_watcher(
+        [root / "posts", root / "templates", root / CONFIG_FILENAME],
+        interval,
+    )
+    _logger.info("Watching for changes")
+    try:
+        while True:
+            changes = await watcher.wait()
+            _logger.debug("Modified files: %s", changes)
+
+            try:
+                state = await handle_changes(root, changes, state, use_cache, workers)
+            except Exception:  # pylint: disable=broad-except
+                _logger.exception("Unable to rebuild blog")
+    finally:
+        watcher.close()
@@ -3,7 +3,7 @@ The configuration of a Nefelibata blog.
 """
 # pylint: disable=too-few-public-methods
 
-from typing import Dict, List
+from typing import Dict, List, Literal
 
 from pydantic import BaseModel, Extra, Field
 
@@ -49,6 +49,15 @@ class BuilderModel(BaseModel):
     home: str
     path: str
 
+    # number of posts in each page of indexes and feeds; zero disables pagination
+    page_size: int = Field(0, alias="page-size")
+
+    # how enclosures are placed in the build directory
+    enclosure_strategy: Literal["copy", "hardlink", "reflink", "symlink"] = Field(
+        "copy",
+        alias="enclosures",
+    )
+
     class Config:
         """
         Allow extra attributes that are builder-specific.
@@ -102,6 +111,40 @@ class PublisherModel(BaseModel):
         extra = Extra.allow
 
 
+class HostModel(BaseModel):
+    """
+    Model representing the limits on requests to a given host.
+    """
+
+    # maximum number of simultaneous requests; zero means unlimited
+    connections: int = 0
+
+    # requests per second, and how many can be done in a burst; zero means unlimited
+    rate: float = 0
+    burst: int = 1
+
+
+class ConcurrencyModel(BaseModel):
+    """
+    Model representing the limits on concurrent work done by plugins.
+    """
+
+    # maximum number of announcer, assistant and publisher tasks running at the same
+    # time; zero means unlimited
+    tasks: int = 0
+
+    # maximum number of simultaneous tasks for a given announcer, assistant or
+    # publisher, and of blocking calls each one can have running in threads
+    plugins: Dict[str, int] = {}
+
+    # number of threads running blocking calls from plugins, like uploads with
+    # boto3 or ftplib; zero uses the Python default
+    threads: int = 0
+
+    # limits on requests to each host; limits in "*" apply to hosts not listed
+    hosts: Dict[str, HostModel] = {}
+
+
 class Config(BaseModel):
     """
     Model representing the blog configuration.
@@ -121,3 +164,5 @@ class Config(BaseModel):
     assistants: Dict[str, AssistantModel]
     announcers: Dict[str, AnnouncerModel]
     publishers: Dict[str, PublisherModel]
+
+    concurrency: ConcurrencyModel = ConcurrencyModel()
@@ -4,19 +4,23 @@ Nefelibata blog engine.
 Usage:
   nb init [ROOT_DIR] [-f] [--loglevel=INFO]
   nb new POST [ROOT_DIR] [-t TYPE] [--loglevel=INFO]
-  nb build [ROOT_DIR] [-f] [--loglevel=INFO]
-  nb publish [ROOT_DIR] [-f] [--loglevel=INFO]
+  nb build [ROOT_DIR] [-f] [--no-cache] [-j JOBS] [--loglevel=INFO]
+  nb publish [ROOT_DIR] [-f] [--no-cache] [-j JOBS] [--loglevel=INFO]
+  nb watch [ROOT_DIR] [--no-cache] [-j JOBS] [--loglevel=INFO]
 
 Actions:
   init              Create a new blog skeleton.
   new               Create a new post.
   build             Build blog from Markdown files and online interactions.
   publish           Publish weblog to configured locations.
+  watch             Rebuild blog when posts, templates or configuration change.
 
 Options:
   -h --help         Show this screen.
   --version         Show version.
   -f --force        Force operation (eg, building up-to-date resources).
+  --no-cache        Parse all posts, ignoring the post cache.
+  -j --jobs=JOBS    Number of processes used to parse and render posts. [default: 1]
   -t TYPE           Custom template to use on the post. [default: post]
   --loglevel=LEVEL  Level for logging. [default: INFO]
 
@@ -31,7 +35,7 @@ from pathlib import Path
 from docopt import docopt
 
 from nefelibata import __version__
-from nefelibata.cli import build, init, new, publish
+from nefelibata.cli import build, init, new, publish, watch
 from nefelibata.utils import find_directory, setup_logging
 
 _logger = logging.getLogger(__name__)
@@ -56,9 +60,25 @@ async def main() -> None:
         elif arguments["new"]:
             await new.run(root, arguments["POST"], arguments["-t"])
         elif arguments["build"]:
-            await build.run(root, arguments["--force"])
+            await build.run(
+                root,
+                arguments["--force"],
+                use_cache=not arguments["--no-cache"],
+                workers=int(arguments["--jobs"]),
+            )
         elif arguments["publish"]:
-            await publish.run(root, arguments["--force"])
+            await publish.run(
+                root,
+                arguments["--force"],
+                use_cache=not arguments["--no-cache"],
+                workers=int(arguments["--jobs"]),
+            )
+        elif arguments["watch"]:
+            await watch.run(
+                root,
+                use_cache=not arguments["--no-cache"],
+                workers=int(arguments["--jobs"]),
+            )
     except asyncio.CancelledError:
         _logger.info("Canceled")
 
@@ -7,3 +7,14 @@ CONFIG_FILENAME = "nefelibata.yaml"
 ANNOUNCEMENTS_FILENAME = "announcements.yaml"
 PUBLISHINGS_FILENAME = "publishings.yaml"
 INTERACTIONS_FILENAME = "interactions.yaml"
+
+# directory inside the blog root where persistent caches are stored
+CACHE_DIRECTORY = ".cache"
+POST_CACHE_FILENAME = "posts.pickle"
+DOCUMENT_CACHE_DIRECTORY = "markdown"
+RENDER_CACHE_DIRECTORY = "rendered"
+TEMPLATE_CACHE_DIRECTORY = "jinja"
+
+# content cache entries not used for this long are removed, in seconds
+CACHE_MAX_AGE = 30 * 24 * 60 * 60
+DEPENDENCIES_FILENAME = "dependencies.pickle"
@@ -0,0 +1,235 @@
+"""
+A persistent graph of the inputs used to build each output.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from nefelibata import __version__
+from nefelibata.cache import write_pickle
+from nefelibata.config import Config
+from nefelibata.constants import CACHE_DIRECTORY, DEPENDENCIES_FILENAME
+from nefelibata.inventory import PostDirectory, scan_post_directory
+
+_logger = logging.getLogger(__name__)
+
+# sections of the configuration that can affect the output of builders
+CONFIG_SECTIONS = [
+    "title",
+    "subtitle",
+    "author",
+    "language",
+    "social",
+    "categories",
+    "templates",
+    "builders",
+    "announcers",
+]
+
+# input name (a file path or a configuration section) and its signature, ie, the
+# size and modification time of a file or a hash of the configuration section
+Signatures = Dict[str, Optional[Tuple[Any, ...]]]
+
+
+def get_config_signatures(config: Config) -> Signatures:
+    """
+    Compute the signature of each section of the configuration.
+    """
+    signatures: Signatures = {}
+    for section in CONFIG_SECTIONS:
+        payload = config.json(include={section}, sort_keys=True)
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        signatures[f"config:{section}"] = (digest,)
+
+    return signatures
+
+
+class StatCache:
+
+    """
+    A run-scoped cache of file stats.
+
+    The same inputs are checked many times in a build, since every post appears in
+    the main index, in its tag pages and in its category pages. With the cache each
+    file is stat'ed only once; stats collected when scanning post directories are
+    reused as well.
+
+    The cache should be cleared when files are expected to have changed, eg,
+    between rebuilds in watch mode.
+    """
+
+    def __init__(self) -> None:
+        self.entries: Dict[Path, Optional[os.stat_result]] = {}
+        self.directories: Dict[Path, PostDirectory] = {}
+
+    def stat(self, path: Path) -> Optional[os.stat_result]:
+        """
+        Return the stat of a file, or ``None`` if it doesn't exist.
+        """
+        if path not in self.entries:
+            try:
+                self.entries[path] = path.stat()
+            except FileNotFoundError:
+                self.entries[path] = None
+
+        return self.entries[path]
+
+    def scan(self, directory: Path) -> PostDirectory:
+        """
+        Scan a post directory, storing the stats of its files.
+        """
+        if directory not in self.directories:
+            post_directory = scan_post_directory(directory)
+            self.entries.update(post_directory.files)
+            self.directories[directory] = post_directory
+
+        return self.directories[directory]
+
+    def invalidate(self, directory: Path) -> None:
+        """
+        Forget the stats of a post directory, eg, after its files were modified.
+        """
+        post_directory = self.directories.pop(directory, None)
+        if post_directory is not None:
+            for path, _ in post_directory.files:
+                self.entries.pop(path, None)
+
+    def get_last_modified(self, paths: Iterable[Path]) -> float:
+        """
+        Return the modification time of the most recently modified file.
+        """
+        return max(
+            (stat.st_mtime for stat in map(self.stat, paths) if stat is not None),
+            default=0.0,
+        )
+
+    def clear(self) -> None:
+        """
+        Forget all stats.
+        """
+        self.entries.clear()
+        self.directories.clear()
+
+
+class DependencyGraph:
+
+    """
+    A persistent record of the inputs used to build each output.
+
+    Inputs are files (posts, YAML files, enclosures and templates) and sections of
+    the configuration. An output needs to be built again only if any of its inputs
+    changed, or if the set of inputs is different, eg, when a post is added to an
+    index.
+
+    The graph also records when each enclosure was copied or linked into the build
+    directory, since hardlinks keep the modification time of their source.
+    """
+
+    def __init__(self, root: Path, config: Config, enabled: bool = True):
+        self.path = root / CACHE_DIRECTORY / DEPENDENCIES_FILENAME
+        self.enabled = enabled
+        self.config_signatures = get_config_signatures(config)
+
+        self.entries: Dict[Path, Signatures] = {}
+        self.materialized: Dict[Path, float] = {}
+        self.modified = False
+
+        # the inputs are not modified during a build, so their stats are cached
+        self.stats = StatCache()
+
+        if self.enabled:
+            self.load()
+
+    def load(self) -> None:
+        """
+        Load the graph from disk.
+        """
+        if not self.path.exists():
+            return
+
+        try:
+            with open(self.path, "rb") as input_:
+                version, entries, materialized = pickle.load(input_)
+        except (
+            pickle.UnpicklingError,
+            EOFError,
+            AttributeError,
+            ImportError,
+            ValueError,
+        ):
+            _logger.warning("Invalid dependency graph: %s", self.path)
+            return
+
+        if version == __version__:
+            self.entries = entries
+            self.materialized = materialized
+
+    def get_signatures(self, paths: Iterable[Path]) -> Signatures:
+        """
+        Compute the signatures of the configuration and of a list of files.
+        """
+        signatures = dict(self.config_signatures)
+        for path in paths:
+            stat = self.stats.stat(path)
+            signatures[str(path)] = (
+                None if stat is None else (stat.st_size, stat.st_mtime_ns)
+            )
+
+        return signatures
+
+    def is_up_to_date(
+        self,
+        output: Path,
+        signatures: Signatures,
+        last_modified: float,
+    ) -> bool:
+        """
+        Check if an output is up-to-date with its inputs.
+
+        If the output was never recorded, eg, if it was built before the graph
+        existed, it's considered up-to-date when it's newer than ``last_modified``,
+        the modification time of its most recent source.
+        """
+        if not output.exists():
+            return False
+
+        if output in self.entries:
+            return self.entries[output] == signatures
+
+        return last_modified < output.stat().st_mtime
+
+    def record(self, output: Path, signatures: Signatures) -> None:
+        """
+        Record the inputs used to build an output.
+        """
+        if self.entries.get(output) != signatures:
+            self.entries[output] = signatures
+            self.modified = True
+
+    def record_materialized(self, path: Path) -> None:
+        """
+        Record that an enclosure was copied or linked into the build directory.
+        """
+        self.materialized[path] = time.time()
+        self.modified = True
+
+    def get_last_materialized(self, path: Path) -> float:
+        """
+        Return when an enclosure was last copied or linked, or 0 if unknown.
+        """
+        return self.materialized.get(path, 0.0)
+
+    def save(self) -> None:
+        """
+        Persist the graph to disk, if it was modified.
+        """
+        if not self.enabled or not self.modified:
+            return
+
+        write_pickle(self.path, (__version__, self.entries, self.materialized))
+        self.modified = False
@@ -4,16 +4,21 @@ Enclosures for media associated with posts.
 
 import mimetypes
 from pathlib import Path
-from typing import Dict, List, Type, Union
+from typing import Dict, List, Optional, Type, Union
 
 import piexif
 from mutagen.mp3 import MP3
 from pydantic import BaseModel
 
+from nefelibata.inventory import scan_post_directory
+
 
 class Enclosure(BaseModel):
     """
     An enclosure.
+
+    Enclosures are built from files in the post directory, so they are constructed
+    without validation.
     """
 
     path: Path
@@ -32,7 +37,7 @@ class Enclosure(BaseModel):
         href = str(path.relative_to(root / "posts"))
         description = path.name
 
-        return cls(
+        return cls.construct(
             path=path,
             description=description,
             type=mimetype,
@@ -97,7 +102,7 @@ class MP3Enclosure(Enclosure):
         pretty_duration = get_pretty_duration(duration)
         description = f'"{title}" ({pretty_duration}) by {artist} ({album}, {year})'
 
-        return cls(
+        return cls.construct(
             path=path,
             description=description,
             length=length,
@@ -134,7 +139,7 @@ class ImageEnclosure(Enclosure):
         else:
             description = f"Image {path.name}"
 
-        return cls(
+        return cls.construct(
             path=path,
             description=description,
             type=mimetype,
@@ -151,12 +156,22 @@ mimetype_map: Dict[str, Type[Enclosure]] = {
 }
 
 
-def get_enclosures(root: Path, post_directory: Path) -> List[Enclosure]:
+def get_enclosures(
+    root: Path,
+    post_directory: Path,
+    paths: Optional[List[Path]] = None,
+) -> List[Enclosure]:
     """
     Find all enclosures in a given post.
+
+    If the paths of the files in the post directory are already known they can be
+    passed in ``paths``, otherwise the directory is scanned.
     """
+    if paths is None:
+        paths = [path for path, _ in scan_post_directory(post_directory).files]
+
     enclosures = []
-    for file_path in post_directory.glob("**/*"):
+    for file_path in paths:
         mimetype, _ = mimetypes.guess_type(file_path)
         class_ = mimetype_map.get(mimetype) if mimetype else None
         if class_:
@@ -0,0 +1,266 @@
+"""
+Limits on the concurrent work done by plugins.
+"""
+# pylint: disable=too-few-public-methods, unused-argument
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack, asynccontextmanager
+from contextvars import ContextVar
+from functools import partial
+from types import SimpleNamespace
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Optional,
+    TypeVar,
+    Union,
+)
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, TraceConfig
+from yarl import URL
+
+from nefelibata.config import ConcurrencyModel, HostModel
+
+T = TypeVar("T")
+
+# how long DNS lookups are cached, and idle connections are kept alive, in seconds
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 30
+
+# downloads can be large, so the total timeout is generous
+TIMEOUT = ClientTimeout(total=300, sock_connect=30, sock_read=60)
+
+# the plugin whose task is running, so that its blocking calls can be limited
+current_plugin: ContextVar[Optional[str]] = ContextVar("plugin", default=None)
+
+
+class TokenBucket:
+
+    """
+    A token bucket, limiting the rate of requests.
+
+    Tokens are added at ``rate`` per second, up to ``burst`` tokens. Each request
+    takes a token, waiting for one when the bucket is empty.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        """
+        Take a token from the bucket, waiting until one is available.
+        """
+        while True:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst,
+                self.tokens + (now - self.updated) * self.rate,
+            )
+            self.updated = now
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Governor:
+
+    """
+    A governor, limiting the concurrent work done by plugins.
+
+    Calls to plugins go through ``run``, which enforces the global task budget and
+    the limit of each plugin. Network requests go through ``host``, or through
+    the HTTP session from ``get_session``, enforcing the limits of each host.
+    Blocking calls, like the ones from synchronous SDKs, go through
+    ``run_in_executor`` so they don't stall the event loop; calls made from a
+    plugin task are also subject to the limit of the plugin.
+
+    The governor is shared by all the plugins in a run, so that the limits apply
+    to the run as a whole, and so that connections are reused between plugins.
+    """
+
+    def __init__(self, config: Optional[ConcurrencyModel] = None):
+        self.config = config or ConcurrencyModel()
+
+        # semaphores are created on first use, since they're bound to a loop
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._session: Optional[ClientSession] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        trace_config = TraceConfig()
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_request_end.append(self._on_request_end)
+        trace_config.on_request_exception.append(self._on_request_end)
+        self.trace_configs = [trace_config]
+
+    def get_session(self) -> ClientSession:
+        """
+        Return the HTTP session shared by the plugins.
+
+        The session keeps connections alive and caches DNS lookups, and applies the
+        limits of each host to its requests. It's created on first use, and should
+        be closed at the end of the run with ``close``.
+        """
+        if self._session is None or self._session.closed:
+            self._session = ClientSession(
+                connector=TCPConnector(
+                    ttl_dns_cache=DNS_CACHE_TTL,
+                    keepalive_timeout=KEEPALIVE_TIMEOUT,
+                ),
+                timeout=TIMEOUT,
+                trace_configs=self.trace_configs,
+            )
+        return self._session
+
+    async def run_in_executor(
+        self,
+        function: Callable[..., T],
+        *args: Any,
+        **kwargs: Any,
+    ) -> T:
+        """
+        Run a blocking function in a thread, without blocking the event loop.
+
+        The threads are shared by the plugins, and the pool is created on first use.
+        When called from a plugin task, the number of calls running at the same time
+        is limited by the plugin limit.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.config.threads or None,
+                thread_name_prefix="nefelibata",
+            )
+
+        # the plugin already holds a task slot, so threads are counted separately
+        name = current_plugin.get()
+        semaphore = (
+            self._get_semaphore(f"threads:{name}", self.config.plugins.get(name, 0))
+            if name
+            else None
+        )
+
+        loop = asyncio.get_running_loop()
+        async with AsyncExitStack() as stack:
+            if semaphore:
+                await stack.enter_async_context(semaphore)
+            return await loop.run_in_executor(
+                self._executor,
+                partial(function, *args, **kwargs),
+            )
+
+    async def close(self) -> None:
+        """
+        Close the shared HTTP session and the threads, if they were created.
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _get_semaphore(self, key: str, limit: int) -> Optional[asyncio.Semaphore]:
+        if limit <= 0:
+            return None
+
+        if key not in self._semaphores:
+            self._semaphores[key] = asyncio.Semaphore(limit)
+        return self._semaphores[key]
+
+    def get_host_limits(self, host: str) -> HostModel:
+        """
+        Return the limits on requests to a given host.
+        """
+        if host in self.config.hosts:
+            return self.config.hosts[host]
+        return self.config.hosts.get("*", HostModel())
+
+    @asynccontextmanager
+    async def plugin(self, name: str) -> AsyncIterator[None]:
+        """
+        Hold a slot for a plugin task.
+        """
+        # the plugin slot is acquired first, so that tasks waiting on a busy plugin
+        # don't hold slots from the global budget
+        semaphores = [
+            self._get_semaphore(f"plugin:{name}", self.config.plugins.get(name, 0)),
+            self._get_semaphore("tasks", self.config.tasks),
+        ]
+        async with AsyncExitStack() as stack:
+            for semaphore in semaphores:
+                if semaphore:
+                    await stack.enter_async_context(semaphore)
+            yield
+
+    async def run(self, name: str, awaitable: Awaitable[T]) -> T:
+        """
+        Run a plugin task, waiting for a slot.
+        """
+        async with self.plugin(name):
+            token = current_plugin.set(name)
+            try:
+                return await awaitable
+            finally:
+                current_plugin.reset(token)
+
+    async def _acquire_host(self, url: Union[str, URL]) -> Optional[asyncio.Semaphore]:
+        host = URL(str(url)).host or ""
+        limits = self.get_host_limits(host)
+
+        semaphore = self._get_semaphore(f"host:{host}", limits.connections)
+        if semaphore:
+            await semaphore.acquire()
+
+        if limits.rate > 0:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(limits.rate, limits.burst)
+            try:
+                await self._buckets[host].acquire()
+            except BaseException:
+                if semaphore:
+                    semaphore.release()
+                raise
+
+        return semaphore
+
+    @asynccontextmanager
+    async def host(self, url: Union[str, URL]) -> AsyncIterator[None]:
+        """
+        Hold a connection to the host of a given URL.
+        """
+        semaphore = await self._acquire_host(url)
+        try:
+            yield
+        finally:
+            if semaphore:
+                semaphore.release()
+
+    async def _on_request_start(
+        self,
+        session: ClientSession,
+        context: SimpleNamespace,
+        params: Any,
+    ) -> None:
+        context.semaphore = await self._acquire_host(params.url)
+
+    async def _on_request_end(
+        self,
+        session: ClientSession,
+        context: SimpleNamespace,
+        params: Any,
+    ) -> None:
+        semaphore = getattr(context, "semaphore", None)
+        if semaphore:
+            semaphore.release()
@@ -0,0 +1,119 @@
+"""
+An inventory of the files in the blog.
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# relative path, size, modification time and inode of every file in a post
+Fingerprint = Tuple[Tuple[str, int, int, int], ...]
+
+
+class PostDirectory:
+
+    """
+    A directory with posts, and all the files that belong to them.
+
+    Files in subdirectories belong to the post directory, unless the subdirectory
+    has posts of its own.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+
+        # the ``.mkd`` files in the directory
+        self.posts: List[Path] = []
+
+        # every file in the directory tree (including the posts), with its stat
+        self.files: List[Tuple[Path, os.stat_result]] = []
+
+    @property
+    def sidecars(self) -> List[Path]:
+        """
+        YAML files with extra metadata, stored alongside the posts.
+        """
+        return [
+            path
+            for path, _ in self.files
+            if path.parent == self.path and path.suffix == ".yaml"
+        ]
+
+    @property
+    def fingerprint(self) -> Fingerprint:
+        """
+        The fingerprint of the files in the directory.
+
+        Any change to a post, its sidecar files or its enclosures modifies the
+        fingerprint.
+        """
+        return tuple(
+            sorted(
+                (
+                    str(path.relative_to(self.path)),
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                    stat.st_ino,
+                )
+                for path, stat in self.files
+            ),
+        )
+
+
+def _walk(
+    directory: Path,
+    owner: Optional[PostDirectory],
+    inventory: Dict[Path, PostDirectory],
+) -> None:
+    """
+    Walk a directory tree, assigning files to the nearest post directory.
+    """
+    stack = [(directory, owner)]
+    while stack:
+        directory, owner = stack.pop()
+
+        with os.scandir(directory) as iterator:
+            entries = sorted(iterator, key=lambda entry: entry.name)
+
+        files = [entry for entry in entries if entry.is_file()]
+        is_owner = owner is not None and owner.path == directory
+        if not is_owner and any(entry.name.endswith(".mkd") for entry in files):
+            owner = inventory[directory] = PostDirectory(directory)
+
+        if owner is not None:
+            for entry in files:
+                path = Path(entry.path)
+                owner.files.append((path, entry.stat()))
+                if owner.path == directory and path.suffix == ".mkd":
+                    owner.posts.append(path)
+
+        # don't follow symlinks to directories, to avoid loops
+        stack.extend(
+            (Path(entry.path), owner)
+            for entry in reversed(entries)
+            if entry.is_dir(follow_symlinks=False)
+        )
+
+
+def get_inventory(directory: Path) -> Dict[Path, PostDirectory]:
+    """
+    Build the inventory of all post directories under a directory.
+
+    The directory tree is traversed only once, and every file is assigned to its
+    nearest post directory, ie, the closest ancestor directory with a post.
+    """
+    inventory: Dict[Path, PostDirectory] = {}
+    if directory.exists():
+        _walk(directory, None, inventory)
+    return inventory
+
+
+def scan_post_directory(directory: Path) -> PostDirectory:
+    """
+    Scan a single post directory.
+
+    Subdirectories with posts of their own are not included.
+    """
+    post_directory = PostDirectory(directory)
+    _walk(directory, post_directory, {directory: post_directory})
+    return post_directory
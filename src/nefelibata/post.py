@@ -3,22 +3,57 @@ A Nefelibata post (and associated functions).
 """
 
 import asyncio
+import heapq
+import logging
+import math
 import operator
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
 from email.header import decode_header, make_header
-from email.parser import Parser
+from email.message import Message
+from email.parser import HeaderParser, Parser
 from email.utils import formatdate, parsedate_to_datetime
+from itertools import repeat
 from pathlib import Path
-from typing import Any, Dict, Iterator, List, Optional, Set
+from typing import Any, Dict, Iterator, List, MutableMapping, Optional, Set, Tuple
 
 import marko
 from pydantic import BaseModel, PrivateAttr
 from yarl import URL
 
+from nefelibata.cache import ContentCache, PostCache
 from nefelibata.config import Config
 from nefelibata.enclosure import Enclosure, get_enclosures
+from nefelibata.inventory import PostDirectory, get_inventory
 from nefelibata.utils import load_extra_metadata, split_header
 
+_logger = logging.getLogger(__name__)
+
+# a header line, or the continuation of a header (same as ``email.feedparser``)
+HEADER_LINE = re.compile(r"^(From |[\041-\071\073-\176]*:|[\t ])")
+
+# number of chunks each worker receives when building posts in parallel
+CHUNKS_PER_WORKER = 4
+
+# parsed Markdown documents, shared by everything that needs the AST of a post;
+# the parser version is part of the key, since the AST changes between versions
+document_cache = ContentCache(namespace=f"marko-{marko.__version__}", size=256)
+
+
+def parse_markdown(content: str) -> marko.block.Document:
+    """
+    Parse Markdown, reusing the document if the content was already parsed.
+    """
+    key = document_cache.get_key(content)
+    document = document_cache.get(key)
+    if document is None:
+        document = marko.Markdown().parse(content)
+        document_cache.set(key, document)
+
+    return document
+
 
 class Post(BaseModel):  # pylint: disable=too-few-public-methods
     """
@@ -34,8 +69,8 @@ class Post(BaseModel):  # pylint: disable=too-few-public-methods
     # post creation timestamp, stored in the "date" header
     timestamp: datetime
 
-    # all the headers from the post
-    metadata: Dict[str, Any]
+    # all the headers from the post, and extra metadata from YAML files
+    metadata: MutableMapping[str, Any]
 
     # special metadata
     tags: Set[str]
@@ -56,35 +91,126 @@ class Post(BaseModel):  # pylint: disable=too-few-public-methods
     # add a lock to manipulate the post file
     _lock: asyncio.Lock = PrivateAttr(default_factory=asyncio.Lock)
 
+    def __getstate__(self) -> Dict[str, Any]:
+        # locks can't be pickled, so they're recreated when the post is unpickled
+        state = super().__getstate__()
+        private_attributes = dict(state["__private_attribute_values__"])
+        del private_attributes["_lock"]
+        return {**state, "__private_attribute_values__": private_attributes}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        super().__setstate__(state)
+        object.__setattr__(self, "_lock", asyncio.Lock())
+
+    @property
+    def document(self) -> marko.block.Document:
+        """
+        The Markdown AST of the post.
+
+        The document should not be modified, since it's shared with every other
+        post with the same content.
+        """
+        return parse_markdown(self.content)
+
+
+class LazyPost(Post):
+    """
+    A post that is loaded on demand.
+
+    Only the headers are parsed when the post is built; the Markdown content, the
+    enclosures and the extra metadata stored in YAML files are loaded the first time
+    they are accessed. This is useful when only the title, date, tags and URL of the
+    posts are needed, eg, when building indexes.
+
+    Exporting or pickling the post loads it completely first, so that it's never
+    serialized with missing fields.
+    """
+
+    _root: Path = PrivateAttr()
+    _headers: Dict[str, str] = PrivateAttr()
+
+    def load(self) -> None:
+        """
+        Load all the fields that haven't been loaded yet.
+        """
+        for name in ("content", "enclosures", "metadata"):
+            getattr(self, name)
+
+    def dict(self, **kwargs: Any) -> Dict[str, Any]:  # type: ignore
+        self.load()
+        return super().dict(**kwargs)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        self.load()
+        return super().__getstate__()
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "content":
+            with open(self.path, encoding="utf-8") as input_:
+                value = Parser().parse(input_).get_payload(decode=False)
+        elif name == "enclosures":
+            value = get_enclosures(self._root, self.path.parent)
+        elif name == "metadata":
+            value = load_extra_metadata(self.path.parent, data=dict(self._headers))
+        else:
+            raise AttributeError(name)
+
+        self.__dict__[name] = value
+        return value
+
 
-def build_post(  # pylint: disable=too-many-locals
+def read_headers(path: Path) -> Message:
+    """
+    Parse only the headers of a post.
+
+    The file is read up to the end of the headers, so the body is never loaded.
+    """
+    lines = []
+    with open(path, encoding="utf-8") as input_:
+        for line in input_:
+            if not line.strip() or not HEADER_LINE.match(line):
+                break
+            lines.append(line)
+
+    return HeaderParser().parsestr("".join(lines))
+
+
+def get_default_date(path: Path) -> str:
+    """
+    Return the default date of a post, based on its modification time.
+    """
+    return formatdate(path.stat().st_mtime, localtime=True)
+
+
+def parse_date(date: str) -> datetime:
+    """
+    Parse the date of a post into a UTC timestamp.
+    """
+    return parsedate_to_datetime(date).replace(microsecond=0).astimezone(timezone.utc)
+
+
+def get_post_attributes(
     root: Path,
     config: Config,
     path: Path,
-) -> Post:
+    headers: Message,
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
     """
-    Build a post from a file path.
+    Compute the attributes of a post from its headers.
 
-    Each post is stored in a file as an email.
+    Returns the attributes, and default values for any required headers that are
+    missing.
     """
-    with open(path, encoding="utf-8") as input_:
-        parsed = Parser().parse(input_)
-
-    # set default for missing values
-    required = {
-        "subject": "No subject found",
-        "date": formatdate(path.stat().st_mtime, localtime=True),
-    }
-    modified = False
-    for header, default in required.items():
-        if header not in parsed:
-            parsed[header] = default
-            modified = True
+    defaults = {}
+    if "subject" not in headers:
+        defaults["subject"] = "No subject found"
+    if "date" not in headers:
+        defaults["date"] = get_default_date(path)
 
     metadata = {
         k: str(make_header(decode_header(v)))
-        for k, v in parsed.items()
-        if k not in required
+        for k, v in headers.items()
+        if k not in {"subject", "date"}
     }
     type_ = metadata.get("type", "post")
     tags = split_header(metadata.get("keywords"))
@@ -98,50 +224,243 @@ def build_post(  # pylint: disable=too-many-locals
         announcers = split_header(metadata.get("announce-on"))
     else:
         announcers = set(config.announcers)
-        parsed["announce-on"] = ", ".join(announcers)
-        modified = True
+        defaults["announce-on"] = ", ".join(sorted(announcers))
+
+    timestamp = parse_date(headers.get("date", defaults.get("date")))
+    subject = headers.get("subject", defaults.get("subject"))
+
+    attributes = {
+        "path": path,
+        "title": str(make_header(decode_header(subject))),
+        "timestamp": timestamp,
+        "metadata": metadata,
+        "tags": tags,
+        "categories": categories,
+        "announcers": announcers,
+        "type": type_,
+        "url": str(path.relative_to(root / "posts").with_suffix("")),
+    }
 
-    if modified:
-        with open(path, "w", encoding="utf-8") as output:
-            output.write(str(parsed))
+    return attributes, defaults
 
-    # load metadata from YAML files
-    metadata.update(load_extra_metadata(path.parent))
 
-    timestamp = (
-        parsedate_to_datetime(parsed["date"])
-        .replace(microsecond=0)
-        .astimezone(timezone.utc)
+def get_timestamp(path: Path) -> datetime:
+    """
+    Return the timestamp of a post, reading only its headers.
+    """
+    headers = read_headers(path)
+    date = headers["date"] if "date" in headers else get_default_date(path)
+    return parse_date(date)
+
+
+def build_post(
+    root: Path,
+    config: Config,
+    path: Path,
+    directory: Optional[PostDirectory] = None,
+) -> Post:
+    """
+    Build a post from a file path.
+
+    Each post is stored in a file as an email. Building a post never modifies the
+    file; missing headers are filled in with default values, which can be persisted
+    by calling ``normalize_post``.
+
+    If the post directory was already scanned it can be passed in ``directory``,
+    so the enclosures and YAML files are read from it.
+    """
+    with open(path, encoding="utf-8") as input_:
+        parsed = Parser().parse(input_)
+
+    attributes, _ = get_post_attributes(root, config, path, parsed)
+
+    if directory is None:
+        sidecars = enclosures = None
+    else:
+        sidecars = directory.sidecars
+        enclosures = [file_path for file_path, _ in directory.files]
+
+    # metadata from YAML files is loaded on demand
+    attributes["metadata"] = load_extra_metadata(
+        path.parent,
+        sidecars,
+        attributes["metadata"],
     )
 
-    return Post(
-        path=path,
-        title=str(make_header(decode_header(parsed["subject"]))),
-        timestamp=timestamp,
-        metadata=metadata,
-        tags=tags,
-        categories=categories,
-        announcers=announcers,
-        enclosures=get_enclosures(root, path.parent),
-        type=type_,
-        url=str(path.relative_to(root / "posts").with_suffix("")),
+    # the attributes are computed from the file, so there's no need to validate them
+    return Post.construct(
+        **attributes,
+        enclosures=get_enclosures(root, path.parent, enclosures),
         content=parsed.get_payload(decode=False),
     )
 
 
-def get_posts(root: Path, config: Config, count: Optional[int] = None) -> List[Post]:
+def normalize_post(root: Path, config: Config, path: Path) -> bool:
+    """
+    Store default values for missing headers in a post.
+
+    The modification time of the file is preserved, so that the post is not
+    considered modified by builders and publishers. Since the default date is
+    derived from the modification time this is also idempotent: once the headers
+    are written the post is never rewritten. Returns true if the post was modified.
+    """
+    headers = read_headers(path)
+    _, defaults = get_post_attributes(root, config, path, headers)
+    if not defaults:
+        return False
+
+    stat = path.stat()
+    with open(path, encoding="utf-8") as input_:
+        parsed = Parser().parse(input_)
+    for header, default in defaults.items():
+        parsed[header] = default
+    with open(path, "w", encoding="utf-8") as output:
+        output.write(str(parsed))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    _logger.info("Added missing headers to %s: %s", path, ", ".join(defaults))
+    return True
+
+
+def build_lazy_post(root: Path, config: Config, path: Path) -> LazyPost:
+    """
+    Build a post from a file path, parsing only its headers.
+    """
+    headers = read_headers(path)
+    attributes, _ = get_post_attributes(root, config, path, headers)
+
+    post = LazyPost.construct(
+        **{key: value for key, value in attributes.items() if key != "metadata"}
+    )
+    post._root = root  # pylint: disable=protected-access
+    post._headers = attributes["metadata"]  # pylint: disable=protected-access
+
+    return post
+
+
+def build_posts(
+    root: Path,
+    config: Config,
+    paths: List[Path],
+    inventory: Dict[Path, PostDirectory],
+) -> List[Post]:
+    """
+    Build a list of posts.
+
+    This is the unit of work sent to worker processes when building posts in
+    parallel.
+    """
+    return [build_post(root, config, path, inventory[path.parent]) for path in paths]
+
+
+def build_posts_in_parallel(
+    root: Path,
+    config: Config,
+    paths: List[Path],
+    inventory: Dict[Path, PostDirectory],
+    workers: int = 1,
+) -> List[Post]:
+    """
+    Build posts using a pool of worker processes.
+
+    Paths are split into chunks, so that each worker receives a few batches of
+    posts instead of one task per post. Posts are returned in the same order as
+    the paths.
+    """
+    if workers <= 1 or len(paths) < 2:
+        return build_posts(root, config, paths, inventory)
+
+    size = math.ceil(len(paths) / (workers * CHUNKS_PER_WORKER))
+    chunks = [paths[i : i + size] for i in range(0, len(paths), size)]
+    # send each worker only the part of the inventory it needs
+    inventories = [
+        {path.parent: inventory[path.parent] for path in chunk} for chunk in chunks
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(
+            build_posts,
+            repeat(root),
+            repeat(config),
+            chunks,
+            inventories,
+        )
+        return [post for chunk in results for post in chunk]
+
+
+def get_posts(  # pylint: disable=too-many-arguments, too-many-locals
+    root: Path,
+    config: Config,
+    count: Optional[int] = None,
+    use_cache: bool = True,
+    workers: int = 1,
+    lazy: bool = False,
+) -> List[Post]:
     """
     Return all the posts.
 
-    Posts are sorted by timestamp in descending order.
+    Posts are sorted by timestamp in descending order. Unless ``use_cache`` is false,
+    posts are read from a persistent index, and only posts that have been modified
+    are built again. When ``workers`` is greater than one modified posts are built
+    in parallel, using that many processes.
+
+    If ``lazy`` is true modified posts are built from their headers only, and
+    the rest of the post is loaded on demand. Lazy posts are not stored in the
+    index, since they would have to be loaded completely in order to be stored.
+
+    When ``count`` is passed only the headers of modified posts are read in order
+    to find the most recent ones, and only those are built.
     """
-    paths = list((root / "posts").glob("**/*.mkd"))
-    posts = sorted(
-        (build_post(root, config, path) for path in paths),
+    cache = PostCache(root, config, use_cache)
+
+    inventory = get_inventory(root / "posts")
+    paths = [path for directory in inventory.values() for path in directory.posts]
+    posts: Dict[Path, Post] = {}
+    fingerprints = {path: inventory[path.parent].fingerprint for path in paths}
+    modified_paths = []
+    for path in paths:
+        post = cache.get(path, fingerprints[path])
+        if post is None:
+            modified_paths.append(path)
+        else:
+            posts[path] = post
+
+    # keep the order of the paths, so that posts with the same timestamp are
+    # always returned in the same order
+    if count is None:
+        selected_paths = paths
+    else:
+        timestamps = {
+            path: posts[path].timestamp if path in posts else get_timestamp(path)
+            for path in paths
+        }
+        selected_paths = heapq.nlargest(count, paths, key=timestamps.__getitem__)
+        selected = set(selected_paths)
+        modified_paths = [path for path in modified_paths if path in selected]
+
+    if lazy:
+        for path in modified_paths:
+            posts[path] = build_lazy_post(root, config, path)
+    else:
+        built_posts = build_posts_in_parallel(
+            root,
+            config,
+            modified_paths,
+            inventory,
+            workers,
+        )
+        for post in built_posts:
+            cache.set(post.path, fingerprints[post.path], post)
+            posts[post.path] = post
+
+    _logger.info("Post cache: %d hits, %d misses", cache.hits, cache.misses)
+    cache.prune(paths)
+    cache.save()
+
+    return sorted(
+        (posts[path] for path in selected_paths),
         key=operator.attrgetter("timestamp"),
         reverse=True,
     )
-    return posts[:count]  # a[:None] == a
 
 
 def extract_links(post: Post) -> Iterator[URL]:
@@ -150,12 +469,12 @@ def extract_links(post: Post) -> Iterator[URL]:
 
     This includes links in the content, as well as metadata.
     """
-    for key, value in post.metadata.items():
-        if key.endswith("-url"):
-            yield URL(value)
+    # filter the keys first, so that YAML files with extra metadata are not parsed
+    for key in [key for key in post.metadata if key.endswith("-url")]:
+        if key in post.metadata:
+            yield URL(post.metadata[key])
 
-    tree = marko.parse(post.content)
-    queue = [tree]
+    queue = [post.document]
     while queue:
         element = queue.pop(0)
 
@@ -10,6 +10,8 @@ from pkg_resources import iter_entry_points
 from pydantic import BaseModel
 
 from nefelibata.config import Config
+from nefelibata.dependencies import DependencyGraph
+from nefelibata.governor import Governor
 
 
 class Publishing(BaseModel):  # pylint: disable=too-few-public-methods
@@ -28,10 +30,18 @@ class Publisher:
 
     name = ""
 
-    def __init__(self, root: Path, config: Config, path: str, **kwargs: Any):
+    def __init__(
+        self,
+        root: Path,
+        config: Config,
+        path: str,
+        governor: Optional[Governor] = None,
+        **kwargs: Any,
+    ):
         self.root = root
         self.config = config
         self.path = path
+        self.governor = governor or Governor(config.concurrency)
         self.kwargs = kwargs
 
     async def publish(
@@ -55,6 +65,8 @@ class Publisher:
         # convert to timestamp to compare with ``st_mtime``
         last_published = since.timestamp() if since else 0
 
+        graph = DependencyGraph(self.root, self.config)
+
         build = self.root / "build" / self.path
         queue = [build]
         while queue:
@@ -62,11 +74,23 @@ class Publisher:
             for path in current.glob("*"):
                 if path.is_dir():
                     queue.append(path)
-                elif force or path.stat().st_mtime > last_published:
+                    continue
+
+                # hardlinked enclosures keep the modification time of their source,
+                # so the time when they were linked is used as well
+                modified = max(
+                    path.lstat().st_mtime,
+                    graph.get_last_materialized(path),
+                )
+                if force or modified > last_published:
                     yield path
 
 
-def get_publishers(root: Path, config: Config) -> Dict[str, Publisher]:
+def get_publishers(
+    root: Path,
+    config: Config,
+    governor: Optional[Governor] = None,
+) -> Dict[str, Publisher]:
     """
     Return configured publishers.
 
@@ -82,6 +106,7 @@ def get_publishers(root: Path, config: Config) -> Dict[str, Publisher]:
           vsftp:
             ...
 
+    If a governor is passed it's shared by all the publishers.
     """
     classes = {
         entry_point.name: entry_point.load()
@@ -96,6 +121,12 @@ def get_publishers(root: Path, config: Config) -> Dict[str, Publisher]:
             path = builder_config.path
 
             name = f"{builder_name} => {publisher_name}"
-            publishers[name] = class_(root, config, path, **publisher_config.dict())
+            publishers[name] = class_(
+                root,
+                config,
+                path,
+                governor=governor,
+                **publisher_config.dict(),
+            )
 
     return publishers
@@ -5,7 +5,7 @@ import logging
 from datetime import datetime, timezone
 from ftplib import FTP, FTP_TLS, error_perm
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, List, Optional
 
 from nefelibata.config import Config
 from nefelibata.publishers.base import Publisher, Publishing
@@ -44,6 +44,22 @@ class FTPPublisher(Publisher):
         since: Optional[datetime] = None,
         force: bool = False,
     ) -> Optional[Publishing]:
+        # ``ftplib`` is blocking, so files are uploaded in a thread
+        modified_files = await self.governor.run_in_executor(
+            self._upload_files,
+            since,
+            force,
+        )
+
+        if modified_files:
+            return Publishing(timestamp=datetime.now(timezone.utc))
+
+        return None
+
+    def _upload_files(self, since: Optional[datetime], force: bool) -> List[Path]:
+        """
+        Upload modified files to the FTP server.
+        """
         build = self.root / "build" / self.path
 
         FTPClass = FTP_TLS if self.use_tls else FTP
@@ -75,7 +91,4 @@ class FTPPublisher(Publisher):
                 with open(path, "rb") as input_:
                     ftp.storbinary(f"STOR {path.name}", input_)
 
-        if modified_files:
-            return Publishing(timestamp=datetime.now(timezone.utc))
-
-        return None
+        return modified_files
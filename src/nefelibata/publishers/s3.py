@@ -1,6 +1,7 @@
 """
 An S3 publisher.
 """
+import asyncio
 import logging
 import mimetypes
 from datetime import datetime, timezone
@@ -52,9 +53,17 @@ class S3Publisher(Publisher):
 
         modified_files = list(self.find_modified_files(force, since))
 
-        for path in modified_files:
-            key = str(path.relative_to(build))
-            self._upload_file(path, key)
+        # the client is thread-safe, so files are uploaded in parallel
+        await asyncio.gather(
+            *[
+                self.governor.run_in_executor(
+                    self._upload_file,
+                    path,
+                    str(path.relative_to(build)),
+                )
+                for path in modified_files
+            ]
+        )
 
         if modified_files:
             return Publishing(timestamp=datetime.now(timezone.utc))
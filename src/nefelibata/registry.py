@@ -0,0 +1,108 @@
+"""
+A run-scoped registry of plugins.
+"""
+
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Dict, Optional
+
+from nefelibata.announcers.base import Announcer, Scope, get_announcers
+from nefelibata.assistants.base import Assistant, get_assistants
+from nefelibata.builders.base import Builder, get_builders
+from nefelibata.config import Config
+from nefelibata.dependencies import DependencyGraph
+from nefelibata.governor import Governor
+from nefelibata.publishers.base import Publisher, get_publishers
+from nefelibata.repository import PostRepository
+
+
+class PluginRegistry:  # pylint: disable=too-many-instance-attributes
+
+    """
+    The plugins of a blog, loaded once per run.
+
+    Entry points are resolved and each builder, assistant, announcer and publisher
+    is instantiated on first use, and then shared by all the phases of the run.
+    Announcers and assistants are filtered by scope when requested, so that
+    plugins that handle both posts and the site are not instantiated twice.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        root: Path,
+        config: Config,
+        repository: Optional[PostRepository] = None,
+        graph: Optional[DependencyGraph] = None,
+        executor: Optional[Executor] = None,
+        governor: Optional[Governor] = None,
+    ):
+        self.root = root
+        self.config = config
+        self.repository = repository
+        self.graph = graph
+        self.executor = executor
+        self.governor = governor
+
+        self._builders: Optional[Dict[str, Builder]] = None
+        self._announcers: Optional[Dict[str, Announcer]] = None
+        self._assistants: Optional[Dict[str, Assistant]] = None
+        self._publishers: Optional[Dict[str, Publisher]] = None
+
+    @property
+    def builders(self) -> Dict[str, Builder]:
+        """
+        Return all the builders.
+        """
+        if self._builders is None:
+            self._builders = get_builders(
+                self.root,
+                self.config,
+                self.repository,
+                self.graph,
+                self.executor,
+            )
+        return self._builders
+
+    @property
+    def publishers(self) -> Dict[str, Publisher]:
+        """
+        Return configured publishers.
+        """
+        if self._publishers is None:
+            self._publishers = get_publishers(self.root, self.config, self.governor)
+        return self._publishers
+
+    def get_announcers(self, scope: Optional[Scope] = None) -> Dict[str, Announcer]:
+        """
+        Return configured announcers, optionally for a given scope.
+        """
+        if self._announcers is None:
+            self._announcers = get_announcers(
+                self.root,
+                self.config,
+                repository=self.repository,
+                governor=self.governor,
+                builders=self.builders,
+            )
+        return {
+            name: announcer
+            for name, announcer in self._announcers.items()
+            if scope is None or scope in announcer.scopes
+        }
+
+    def get_assistants(self, scope: Optional[Scope] = None) -> Dict[str, Assistant]:
+        """
+        Return configured assistants, optionally for a given scope.
+        """
+        if self._assistants is None:
+            self._assistants = get_assistants(
+                self.root,
+                self.config,
+                repository=self.repository,
+                governor=self.governor,
+            )
+        return {
+            name: assistant
+            for name, assistant in self._assistants.items()
+            if scope is None or scope in assistant.scopes
+        }
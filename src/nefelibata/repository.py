@@ -0,0 +1,121 @@
+"""
+A run-scoped repository of posts.
+"""
+
+import logging
+import operator
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from nefelibata.config import Config
+from nefelibata.dependencies import StatCache
+from nefelibata.post import Post, build_lazy_post, build_post, get_posts
+
+_logger = logging.getLogger(__name__)
+
+
+class PostRepository:  # pylint: disable=too-many-instance-attributes
+
+    """
+    The posts of a blog, loaded once per run.
+
+    The repository is shared between builders, announcers and assistants, so that
+    the archive is scanned only once regardless of the number of plugins. Plugins
+    that modify a post (rewriting the file, or storing extra metadata alongside it)
+    should call ``invalidate``, so that the post is built again the next time it's
+    requested. If the repository has the stat cache used by builders the stats of
+    the post directory are also discarded, so that builders see the new files.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        root: Path,
+        config: Config,
+        use_cache: bool = True,
+        workers: int = 1,
+        lazy: bool = False,
+        stats: Optional[StatCache] = None,
+    ):
+        self.root = root
+        self.config = config
+        self.use_cache = use_cache
+        self.workers = workers
+        self.lazy = lazy
+        self.stats = stats
+
+        self._posts: Optional[Dict[Path, Post]] = None
+        self._invalid: Set[Path] = set()
+
+    def _build_post(self, path: Path) -> Post:
+        if self.lazy:
+            return build_lazy_post(self.root, self.config, path)
+        return build_post(self.root, self.config, path)
+
+    def _load(self) -> Dict[Path, Post]:
+        """
+        Load all posts, or rebuild the ones that were invalidated.
+        """
+        if self._posts is None:
+            posts = get_posts(
+                self.root,
+                self.config,
+                use_cache=self.use_cache,
+                workers=self.workers,
+                lazy=self.lazy,
+            )
+            self._posts = {post.path: post for post in posts}
+            self._invalid.clear()
+
+        while self._invalid:
+            path = self._invalid.pop()
+            if not path.exists():
+                _logger.debug("Removing post %s", path)
+                self._posts.pop(path, None)
+                continue
+            _logger.debug("Reloading post %s", path)
+            self._posts[path] = self._build_post(path)
+
+        return self._posts
+
+    def get_posts(self, count: Optional[int] = None) -> List[Post]:
+        """
+        Return posts, sorted by timestamp in descending order.
+
+        If the posts haven't been loaded yet and ``count`` is passed, only the most
+        recent posts are built, and they're not kept in the repository.
+        """
+        if self._posts is None and count is not None:
+            return get_posts(
+                self.root,
+                self.config,
+                count=count,
+                use_cache=self.use_cache,
+                workers=self.workers,
+                lazy=self.lazy,
+            )
+
+        posts = sorted(
+            self._load().values(),
+            key=operator.attrgetter("timestamp"),
+            reverse=True,
+        )
+        return posts[:count]  # a[:None] == a
+
+    def get_post(self, path: Path) -> Post:
+        """
+        Return a single post, rebuilding it if it was invalidated.
+        """
+        return self._load()[path]
+
+    def invalidate(self, path: Path) -> None:
+        """
+        Mark a post as modified, so it's built again on the next access.
+
+        New posts are added to the repository, and posts that no longer exist are
+        removed from it.
+        """
+        if self.stats is not None:
+            self.stats.invalidate(path.parent)
+
+        if self._posts is not None:
+            self._invalid.add(path)
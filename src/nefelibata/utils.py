@@ -2,23 +2,49 @@
 Utility functions.
 """
 import asyncio
+import copy
+import fcntl
+import hashlib
 import logging
+import os
+import shutil
+import tempfile
+from collections.abc import ItemsView, KeysView, MutableMapping, ValuesView
 from contextlib import contextmanager
 from datetime import timedelta
 from pathlib import Path
-from typing import Any, Dict, Iterator, List, Optional, Set, Type
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+)
 
 import yaml
 from aiohttp import ClientSession
 from pydantic import BaseModel
+from pydantic.fields import SHAPE_DICT, SHAPE_LIST, SHAPE_MAPPING, ModelField
 from rich.logging import RichHandler
 from yarl import URL
 
+from nefelibata.cache import ContentCache
 from nefelibata.config import Config
 from nefelibata.constants import CONFIG_FILENAME
 
 _logger = logging.getLogger(__name__)
 
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# the umask can only be read by changing it, so it's read once
+UMASK = os.umask(0)
+os.umask(UMASK)
+
 
 def setup_logging(loglevel: str) -> None:
     """
@@ -38,6 +64,184 @@ def setup_logging(loglevel: str) -> None:
     )
 
 
+@contextmanager
+def temporary_file(path: Path) -> Iterator[Path]:
+    """
+    Create a unique temporary file alongside a path, to be moved over it.
+
+    Each call creates a different file, since other processes might be writing the
+    same path at the same time. The temporary file is removed when the context
+    exits, unless it was moved (eg, with ``os.replace``).
+    """
+    descriptor, name = tempfile.mkstemp(
+        dir=path.parent,
+        prefix=f".{path.name}.",
+        suffix=".tmp",
+    )
+    os.close(descriptor)
+    temporary_path = Path(name)
+    try:
+        # ``mkstemp`` creates files readable only by the user
+        os.chmod(temporary_path, 0o666 & ~UMASK)
+        yield temporary_path
+    finally:
+        temporary_path.unlink(missing_ok=True)
+
+
+def write_if_changed(path: Path, content: str) -> bool:
+    """
+    Write content to a file, unless the file already has the same content.
+
+    Unchanged files are left untouched, preserving their modification time, so they
+    are not published again. Otherwise the file is written atomically. Returns true
+    if the file was written.
+    """
+    payload = content.encode("utf-8")
+    if (
+        path.exists()
+        and path.stat().st_size == len(payload)
+        and path.read_bytes() == payload
+    ):
+        return False
+
+    with temporary_file(path) as temporary_path:
+        temporary_path.write_bytes(payload)
+        os.replace(temporary_path, path)
+
+    return True
+
+
+def get_file_digest(path: Path, block_size: int = 65536) -> bytes:
+    """
+    Compute the SHA-256 digest of a file, reading it in blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as input_:
+        for block in iter(lambda: input_.read(block_size), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+def write_stream_if_changed(path: Path, chunks: Iterable[str]) -> bool:
+    """
+    Write content generated in chunks to a file, unless it has the same content.
+
+    This is the streaming version of ``write_if_changed``: chunks are written to a
+    temporary file as they are generated, and the content is compared by hash, so
+    the full content is never held in memory. Returns true if the file was written.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with temporary_file(path) as temporary_path:
+        with open(temporary_path, "wb") as output:
+            for chunk in chunks:
+                payload = chunk.encode("utf-8")
+                output.write(payload)
+                digest.update(payload)
+                size += len(payload)
+
+        if (
+            path.exists()
+            and path.stat().st_size == size
+            and get_file_digest(path) == digest.digest()
+        ):
+            return False
+
+        os.replace(temporary_path, path)
+
+    return True
+
+
+# ioctl that clones a file, sharing its data (``FICLONE`` in ``linux/fs.h``)
+FICLONE = 0x40049409
+
+
+def clone_file(source: Path, target: Path) -> None:
+    """
+    Copy a file, sharing its data with the source when possible.
+
+    On copy-on-write filesystems (Btrfs, XFS) the copy is a reflink, sharing the
+    blocks of the source until one of them is modified. Otherwise the data is
+    copied inside the kernel with ``copy_file_range``, which network filesystems
+    can do server-side, and as a last resort the file is copied normally.
+    """
+    with open(source, "rb") as input_, open(target, "wb") as output:
+        try:
+            fcntl.ioctl(output.fileno(), FICLONE, input_.fileno())
+            return
+        except OSError:
+            pass
+
+        try:
+            remaining = os.fstat(input_.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(input_.fileno(), output.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+            return
+        except (AttributeError, OSError):
+            pass
+
+    shutil.copyfile(source, target)
+
+
+def is_same_file(source: Path, target: Path) -> bool:
+    """
+    Check if a target has the same content as a source file.
+
+    This is true when the target is a link to the source, or when both files have
+    the same size and hash.
+    """
+    if not target.exists():
+        return False
+
+    source_stat = source.stat()
+    target_stat = target.stat()
+    if os.path.samestat(source_stat, target_stat):
+        return True
+
+    return source_stat.st_size == target_stat.st_size and get_file_digest(
+        source
+    ) == get_file_digest(target)
+
+
+def materialize_file(source: Path, target: Path, strategy: str = "copy") -> bool:
+    """
+    Materialize a file in a different location, eg, an enclosure in a build.
+
+    The strategy can be ``copy``, ``hardlink``, ``reflink`` (see ``clone_file``) or
+    ``symlink``. Hardlinks can't cross filesystems, so in that case the file is
+    copied. The target is left untouched if it already has the same content as
+    the source. Returns true if the target was created.
+    """
+    if is_same_file(source, target):
+        return False
+
+    with temporary_file(target) as temporary_path:
+        if strategy == "symlink":
+            temporary_path.unlink()
+            temporary_path.symlink_to(source.resolve())
+        elif strategy == "hardlink":
+            temporary_path.unlink()
+            try:
+                os.link(source, temporary_path)
+            except OSError:
+                _logger.debug("Unable to hardlink %s, copying", source)
+                shutil.copyfile(source, temporary_path)
+                shutil.copymode(source, temporary_path)
+        elif strategy == "reflink":
+            clone_file(source, temporary_path)
+            shutil.copymode(source, temporary_path)
+        else:
+            shutil.copyfile(source, temporary_path)
+            shutil.copymode(source, temporary_path)
+
+        os.replace(temporary_path, target)
+
+    return True
+
+
 def find_directory(cwd: Path) -> Path:
     """
     Find root of blog, starting from `cwd`.
@@ -85,9 +289,53 @@ def split_header(header: Optional[str]) -> Set[str]:
     return {value.strip() for value in header.split(",") if value.strip()}
 
 
+def _construct_value(field: ModelField, value: Any) -> Any:
+    """
+    Construct nested models in the value of a field.
+    """
+    if not isinstance(field.type_, type) or not issubclass(field.type_, BaseModel):
+        return value
+
+    if field.shape == SHAPE_LIST and isinstance(value, list):
+        return [
+            construct_model(field.type_, item) if isinstance(item, dict) else item
+            for item in value
+        ]
+    if field.shape in {SHAPE_DICT, SHAPE_MAPPING} and isinstance(value, dict):
+        return {
+            key: construct_model(field.type_, item) if isinstance(item, dict) else item
+            for key, item in value.items()
+        }
+    if isinstance(value, dict):
+        return construct_model(field.type_, value)
+
+    return value
+
+
+def construct_model(class_: Type[ModelT], data: Dict[str, Any]) -> ModelT:
+    """
+    Build a model from trusted data, skipping validation.
+
+    This should be used only for data produced by Nefelibata itself, like the
+    YAML files stored alongside posts; configuration and payloads from external
+    services should always be validated. Nested models are built recursively.
+    """
+    # like in validation, unknown keys are ignored
+    values = {
+        field.alias: _construct_value(field, data[field.alias])
+        for field in class_.__fields__.values()
+        if field.alias in data
+    }
+
+    return class_.construct(**values)
+
+
 def load_yaml(path: Path, class_: Type[BaseModel]) -> Dict[str, BaseModel]:
     """
     Load a YAML file into a model.
+
+    The file should have been written by Nefelibata, so its content is trusted and
+    not validated.
     """
     if not path.exists():
         return {}
@@ -99,7 +347,10 @@ def load_yaml(path: Path, class_: Type[BaseModel]) -> Dict[str, BaseModel]:
             _logger.warning("Invalid YAML file: %s", path)
             raise ex
 
-    return {name: class_(**parameters) for name, parameters in content.items()}
+    return {
+        name: construct_model(class_, parameters)
+        for name, parameters in content.items()
+    }
 
 
 @contextmanager
@@ -147,24 +398,163 @@ def dict_merge(original, update):
             original[key] = update[key]
 
 
-def load_extra_metadata(post_directory: Path) -> Dict[str, Any]:
+# parsed YAML files with extra metadata, keyed by path and modification time
+_extra_metadata_cache = ContentCache(namespace="yaml", size=1024)
+
+
+def load_extra_metadata_file(path: Path) -> Any:
     """
-    Load all YAML files with extra metadata for a given path.
+    Load a YAML file with extra metadata.
+
+    Files are parsed only once, unless they are modified. Since the parsed content
+    is shared between posts each call returns a copy of it.
+    """
+    key = f"{path}:{path.stat().st_mtime_ns}"
+    if key in _extra_metadata_cache:
+        content = _extra_metadata_cache.get(key)
+    else:
+        with open(path, encoding="utf-8") as input_:
+            content = yaml.load(input_, Loader=yaml.SafeLoader)
+        _extra_metadata_cache.set(key, content)
+
+    return copy.deepcopy(content)
+
+
+class LazyKeysView(KeysView):
+
+    """
+    The keys of lazy metadata, skipping YAML files that can't be parsed.
+    """
+
+    _mapping: "LazyMetadata"
+
+    def __iter__(self) -> Iterator[str]:
+        for key in list(self._mapping):
+            if key in self._mapping:
+                yield key
+
+
+class LazyValuesView(ValuesView):  # pylint: disable=too-few-public-methods
+
+    """
+    The values of lazy metadata, skipping YAML files that can't be parsed.
+    """
+
+    _mapping: "LazyMetadata"
+
+    def __iter__(self) -> Iterator[Any]:
+        for key in self._mapping.keys():
+            yield self._mapping[key]
+
+
+class LazyItemsView(ItemsView):
+
+    """
+    The items of lazy metadata, skipping YAML files that can't be parsed.
+    """
+
+    _mapping: "LazyMetadata"
+
+    def __iter__(self) -> Iterator[Tuple[str, Any]]:
+        for key in self._mapping.keys():
+            yield key, self._mapping[key]
+
+
+class LazyMetadata(MutableMapping):  # pylint: disable=too-many-ancestors
+
     """
-    extra_metadata = {}
-    for file_path in post_directory.glob("*.yaml"):
-        with open(file_path, encoding="utf-8") as input_:
+    The metadata of a post, with extra metadata loaded on demand.
+
+    Each YAML file stored alongside a post is available under the name of the file,
+    and is parsed only when the key is accessed. Values from YAML files take
+    precedence over values in ``data``, eg, the post headers.
+
+    Iterating over the metadata (or calling ``len``) lists the keys without parsing
+    the files, so that keys can be filtered before reading their values. A file
+    that can't be parsed is removed from the metadata once its value is read. The
+    views returned by ``keys``, ``values`` and ``items`` parse the files in order
+    to skip invalid ones, so that converting the metadata to a dictionary gives the
+    same result as loading it eagerly.
+    """
+
+    def __init__(self, data: Dict[str, Any], paths: Iterable[Path]):
+        self._data = data
+        self._paths = {path.stem: path for path in paths}
+
+        # values read by this post, with the modification time of their files
+        self._values: Dict[str, Tuple[int, Any]] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._paths:
+            path = self._paths[key]
+            mtime = path.stat().st_mtime_ns
+            if key in self._values and self._values[key][0] == mtime:
+                return self._values[key][1]
+
             try:
-                content = yaml.load(input_, Loader=yaml.SafeLoader)
-            except (AttributeError, yaml.parser.ParserError):
-                _logger.warning("Invalid file: %s", file_path)
-                continue
-        extra_metadata[file_path.stem] = content
+                value = load_extra_metadata_file(path)
+            except (AttributeError, yaml.parser.ParserError) as ex:
+                _logger.warning("Invalid file: %s", path)
+                del self._paths[key]
+                raise KeyError(key) from ex
+
+            self._values[key] = (mtime, value)
+            return value
+
+        return self._data[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._paths.pop(key, None)
+        self._values.pop(key, None)
+        self._data[key] = value
 
-    return extra_metadata
+    def __delitem__(self, key: str) -> None:
+        if key not in self._paths and key not in self._data:
+            raise KeyError(key)
+        self._paths.pop(key, None)
+        self._values.pop(key, None)
+        self._data.pop(key, None)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from (key for key in self._data if key not in self._paths)
+        yield from list(self._paths)
+
+    def __len__(self) -> int:
+        return len(self._data.keys() | self._paths.keys())
+
+    def keys(self) -> LazyKeysView:  # type: ignore
+        return LazyKeysView(self)
+
+    def values(self) -> LazyValuesView:  # type: ignore
+        return LazyValuesView(self)
+
+    def items(self) -> LazyItemsView:  # type: ignore
+        return LazyItemsView(self)
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+
+def load_extra_metadata(
+    post_directory: Path,
+    paths: Optional[List[Path]] = None,
+    data: Optional[Dict[str, Any]] = None,
+) -> LazyMetadata:
+    """
+    Load all YAML files with extra metadata for a given path.
+
+    The files are parsed only when accessed. If the paths of the YAML files are
+    already known they can be passed in ``paths``, otherwise the directory is
+    scanned. Any other metadata, like the post headers, can be passed in ``data``.
+    """
+    if paths is None:
+        paths = list(post_directory.glob("*.yaml"))
+
+    return LazyMetadata(data or {}, paths)
 
 
 async def archive_urls(
+    session: ClientSession,
     urls: List[URL],
     sleep: timedelta = timedelta(seconds=12),
 ) -> Dict[URL, URL]:
@@ -177,20 +567,19 @@ async def archive_urls(
 
     saved_urls = {}
 
-    async with ClientSession() as session:
-        for i, url in enumerate(urls):
-            if url.scheme not in {"http", "https"}:
-                continue
-
-            _logger.info("Saving URL %s", url)
-            save_url = f"https://web.archive.org/save/{url}"
-            async with lock:
-                if i > 0:
-                    await asyncio.sleep(sleep.total_seconds())
-
-                async with session.get(save_url) as response:
-                    for rel, params in response.links.items():
-                        if rel == "memento":
-                            saved_urls[url] = params["url"]
+    for i, url in enumerate(urls):
+        if url.scheme not in {"http", "https"}:
+            continue
+
+        _logger.info("Saving URL %s", url)
+        save_url = f"https://web.archive.org/save/{url}"
+        async with lock:
+            if i > 0:
+                await asyncio.sleep(sleep.total_seconds())
+
+            async with session.get(save_url) as response:
+                for rel, params in response.links.items():
+                    if rel == "memento":
+                        saved_urls[url] = params["url"]
 
     return saved_urls
@@ -0,0 +1,243 @@
+"""
+Watch files and directories for changes.
+"""
+
+import asyncio
+import ctypes
+import logging
+import os
+import struct
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+_logger = logging.getLogger(__name__)
+
+# inotify flags, from ``sys/inotify.h``
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# ``struct inotify_event``, without the variable length name
+EVENT_HEADER = struct.Struct("iIII")
+
+# time to wait for more events after a change, so that an editor saving a file
+# (often in multiple operations) triggers a single rebuild
+DEBOUNCE_SECONDS = 0.1
+
+
+class Watcher:
+
+    """
+    Base class for watchers.
+
+    Directories are watched recursively; files are watched individually.
+    """
+
+    def __init__(self, paths: List[Path]):
+        self.paths = paths
+
+    async def wait(self) -> Set[Path]:
+        """
+        Wait until something changes, returning the paths that were modified.
+        """
+        raise NotImplementedError("Subclasses must implement ``wait``")
+
+    def close(self) -> None:
+        """
+        Stop watching.
+        """
+
+
+class PollingWatcher(Watcher):
+
+    """
+    A watcher that periodically compares the size and modification time of files.
+    """
+
+    def __init__(self, paths: List[Path], interval: float = 1.0):
+        super().__init__(paths)
+        self.interval = interval
+        self.snapshot = self.get_snapshot()
+
+    def get_snapshot(self) -> Dict[Path, Tuple[int, int]]:
+        """
+        Return the size and modification time of every file being watched.
+        """
+        snapshot = {}
+        for path in self.paths:
+            if path.is_file():
+                files = [path]
+            else:
+                files = [
+                    Path(directory) / name
+                    for directory, _, names in os.walk(path)
+                    for name in names
+                ]
+
+            for file_path in files:
+                try:
+                    stat = file_path.stat()
+                except FileNotFoundError:  # pragma: no cover
+                    continue
+                snapshot[file_path] = (stat.st_size, stat.st_mtime_ns)
+
+        return snapshot
+
+    async def wait(self) -> Set[Path]:
+        while True:
+            await asyncio.sleep(self.interval)
+            snapshot = self.get_snapshot()
+            changes = {
+                path
+                for path in set(snapshot) | set(self.snapshot)
+                if snapshot.get(path) != self.snapshot.get(path)
+            }
+            self.snapshot = snapshot
+            if changes:
+                return changes
+
+
+class InotifyWatcher(Watcher):
+
+    """
+    A watcher using inotify(7), available on Linux.
+
+    The inotify API is called directly through ``ctypes``, so no additional
+    dependencies are needed.
+    """
+
+    def __init__(self, paths: List[Path]):
+        super().__init__(paths)
+
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+        # map from watch descriptors to directories
+        self.directories: Dict[int, Path] = {}
+
+        # files are watched through their parent directory
+        self.files: Set[Path] = set()
+        self.trees: List[Path] = []
+
+        for path in paths:
+            if path.is_dir():
+                self.trees.append(path)
+                self.add_directory(path)
+            else:
+                self.files.add(path)
+                self.add_watch(path.parent)
+
+    def add_watch(self, directory: Path) -> None:
+        """
+        Watch a single directory.
+        """
+        descriptor = self.libc.inotify_add_watch(
+            self.fd,
+            os.fsencode(directory),
+            WATCH_MASK,
+        )
+        if descriptor < 0:
+            _logger.warning("Unable to watch %s", directory)
+            return
+        self.directories[descriptor] = directory
+
+    def add_directory(self, directory: Path) -> Set[Path]:
+        """
+        Watch a directory and all its subdirectories.
+
+        Returns the files already in the directory.
+        """
+        files: Set[Path] = set()
+        for current, _, names in os.walk(directory):
+            self.add_watch(Path(current))
+            files.update(Path(current) / name for name in names)
+        return files
+
+    def is_watched(self, path: Path) -> bool:
+        """
+        Check if changes to a given path should be reported.
+        """
+        return path in self.files or any(
+            path.is_relative_to(tree) for tree in self.trees
+        )
+
+    def read_events(self) -> Set[Path]:
+        """
+        Read all pending events, returning the paths that changed.
+        """
+        changes: Set[Path] = set()
+        while True:
+            try:
+                buffer = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+
+            offset = 0
+            while offset < len(buffer):
+                descriptor, mask, _, length = EVENT_HEADER.unpack_from(buffer, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(buffer[offset : offset + length].rstrip(b"\0"))
+                offset += length
+
+                if descriptor not in self.directories or not name:
+                    continue
+                path = self.directories[descriptor] / name
+
+                # watch new directories, eg, a new post; files that were already
+                # in the directory, eg, when it's copied or moved, have no events
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    changes.update(
+                        file
+                        for file in self.add_directory(path)
+                        if self.is_watched(file)
+                    )
+
+                if self.is_watched(path):
+                    changes.add(path)
+
+        return changes
+
+    async def wait(self) -> Set[Path]:
+        loop = asyncio.get_running_loop()
+        while True:
+            ready = loop.create_future()
+            loop.add_reader(self.fd, ready.set_result, None)
+            try:
+                await ready
+            finally:
+                loop.remove_reader(self.fd)
+
+            await asyncio.sleep(DEBOUNCE_SECONDS)
+            changes = self.read_events()
+            if changes:
+                return changes
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def get_watcher(paths: List[Path], interval: Optional[float] = None) -> Watcher:
+    """
+    Return the best watcher available.
+
+    Inotify is used when available, with a fallback to polling. If ``interval`` is
+    passed polling is always used.
+    """
+    if interval is None:
+        try:
+            return InotifyWatcher(paths)
+        except (AttributeError, OSError):
+            _logger.info("Inotify not available, polling for changes")
+            interval = 1.0
+
+    return PollingWatcher(paths, interval)
@@ -64,11 +64,13 @@ async def test_announcer_announce_post(
     )
 
     archive_urls.assert_called_with(
+        announcer.governor.get_session(),
         [
             URL("gemini://example.com/first/index.gmi"),
             URL("https://example.com/first/index.html"),
         ],
     )
+    await announcer.governor.close()
 
 
 @pytest.mark.asyncio
@@ -117,8 +119,10 @@ async def test_announcer_announce_site(
     )
 
     archive_urls.assert_called_with(
+        announcer.governor.get_session(),
         [
             URL("gemini://example.com/"),
             URL("https://example.com/"),
         ],
     )
+    await announcer.governor.close()
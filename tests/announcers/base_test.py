@@ -52,7 +52,7 @@ def test_get_announcers(
         "nefelibata.announcers.base.iter_entry_points",
         return_value=entry_points,
     )
-    mocker.patch(
+    get_builders = mocker.patch(
         "nefelibata.announcers.base.get_builders",
     )
 
@@ -74,8 +74,17 @@ def test_get_announcers(
             }
         ),
     }
-    announcers = get_announcers(root, config, Scope.SITE)
+    repository = mocker.MagicMock()
+    announcers = get_announcers(root, config, Scope.SITE, repository)
     assert len(announcers) == 1
+    assert announcers["dummy_announcer"].repository is repository
 
     announcers = get_announcers(root, config, Scope.POST)
     assert len(announcers) == 0
+
+    # builders can be passed, instead of being built again
+    get_builders.reset_mock()
+    builder = mocker.MagicMock()
+    announcers = get_announcers(root, config, builders={"site_builder": builder})
+    get_builders.assert_not_called()
+    assert announcers["dummy_announcer"].builders == [builder]
@@ -43,7 +43,12 @@ async def test_assistant(root: Path, config: Config, post: Post) -> None:
 
 
 @pytest.mark.asyncio
-async def test_assistant_dummy(root: Path, config: Config, post: Post) -> None:
+async def test_assistant_dummy(
+    mocker: MockerFixture,
+    root: Path,
+    config: Config,
+    post: Post,
+) -> None:
     """
     Test a simple assistant.
     """
@@ -61,11 +66,13 @@ async def test_assistant_dummy(root: Path, config: Config, post: Post) -> None:
         async def get_site_metadata(self) -> Dict[str, Any]:
             return {"hello": "world"}
 
-    assistant = DummyAssistant(root, config)
+    repository = mocker.MagicMock()
+    assistant = DummyAssistant(root, config, repository=repository)
 
     with freeze_time("2021-01-01T00:00:00Z"):
         await assistant.process_post(post)
         await assistant.process_site()
+    repository.invalidate.assert_called_once_with(post.path)
     assert (post.path.parent / "dummy.yaml").stat().st_mtime == datetime(
         2021,
         1,
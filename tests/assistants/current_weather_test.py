@@ -23,10 +23,11 @@ async def test_assistant(
     """
     Test the assistant.
     """
-    get = mocker.patch("nefelibata.assistants.current_weather.ClientSession.get")
+    governor = mocker.MagicMock()
+    get = governor.get_session.return_value.get
     get.return_value.__aenter__.return_value.json.return_value = {"hello": "world"}
 
-    assistant = CurrentWeatherAssistant(root, config)
+    assistant = CurrentWeatherAssistant(root, config, governor=governor)
 
     with freeze_time("2021-01-01T00:00:00Z"):
         response = await assistant.get_post_metadata(post)
@@ -27,7 +27,8 @@ async def test_assistant(
     random = mocker.patch("nefelibata.assistants.news.random")
     random.choice = lambda l: l[0]
 
-    get = mocker.patch("nefelibata.assistants.news.ClientSession.get")
+    governor = mocker.MagicMock()
+    get = governor.get_session.return_value.get
     get.return_value.__aenter__.return_value.json.return_value = {
         "articles": [
             {"hello": "world"},
@@ -35,7 +36,7 @@ async def test_assistant(
         ],
     }
 
-    assistant = NewsAssistant(root, config, "SECRET", "us")
+    assistant = NewsAssistant(root, config, "SECRET", "us", governor=governor)
 
     with freeze_time("2021-01-01T00:00:00Z"):
         response = await assistant.get_post_metadata(post)
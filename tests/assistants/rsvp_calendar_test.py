@@ -28,10 +28,11 @@ async def test_fetch_event_no_events(mocker: MockerFixture) -> None:
     """
     _logger = mocker.patch("nefelibata.assistants.rsvp_calendar._logger")
 
-    get = mocker.patch("nefelibata.assistants.rsvp_calendar.ClientSession.get")
+    session = mocker.MagicMock()
+    get = session.get
     get.return_value.__aenter__.return_value.text.return_value = "<p>Hello!</p>"
 
-    event = await fetch_event(URL("https://example.com/events"))
+    event = await fetch_event(session, URL("https://example.com/events"))
     assert event is None
     _logger.warning.assert_called_with(
         "No events found on %s",
@@ -46,7 +47,8 @@ async def test_fetch_event_multiple_events(mocker: MockerFixture) -> None:
     """
     _logger = mocker.patch("nefelibata.assistants.rsvp_calendar._logger")
 
-    get = mocker.patch("nefelibata.assistants.rsvp_calendar.ClientSession.get")
+    session = mocker.MagicMock()
+    get = session.get
     get.return_value.__aenter__.return_value.text.return_value = """
 <div class="h-event">
   <h1 class="p-name">Microformats Meetup</h1>
@@ -67,7 +69,7 @@ async def test_fetch_event_multiple_events(mocker: MockerFixture) -> None:
 </div>
     """
 
-    event = await fetch_event(URL("https://example.com/events"))
+    event = await fetch_event(session, URL("https://example.com/events"))
     assert event is None
     _logger.warning.assert_called_with(
         "Multiple events found on %s",
@@ -80,7 +82,8 @@ async def test_fetch_event_simple_event(mocker: MockerFixture) -> None:
     """
     Test ``fetch_event``.
     """
-    get = mocker.patch("nefelibata.assistants.rsvp_calendar.ClientSession.get")
+    session = mocker.MagicMock()
+    get = session.get
     get.return_value.__aenter__.return_value.text.return_value = """
 <div class="h-event">
   <h1 class="p-name">Microformats Meetup</h1>
@@ -93,7 +96,7 @@ async def test_fetch_event_simple_event(mocker: MockerFixture) -> None:
     """
 
     with freeze_time("2021-01-01T00:00:00Z"):
-        event = await fetch_event(URL("https://example.com/events"))
+        event = await fetch_event(session, URL("https://example.com/events"))
     assert (
         event.to_ical()
         == b"""BEGIN:VEVENT\r
@@ -111,7 +114,8 @@ async def test_fetch_event_full_event(mocker: MockerFixture) -> None:
     """
     Test ``fetch_event``.
     """
-    get = mocker.patch("nefelibata.assistants.rsvp_calendar.ClientSession.get")
+    session = mocker.MagicMock()
+    get = session.get
     get.return_value.__aenter__.return_value.text.return_value = """
 <div class="h-event">
   <img src="logo.png" class="u-featured">
@@ -130,7 +134,7 @@ async def test_fetch_event_full_event(mocker: MockerFixture) -> None:
     """
 
     with freeze_time("2021-01-01T00:00:00Z"):
-        event = await fetch_event(URL("https://example.com/events"))
+        event = await fetch_event(session, URL("https://example.com/events"))
     assert (
         event.to_ical()
         == b"""BEGIN:VEVENT\r
@@ -1,15 +1,27 @@
 """
 Tests for ``nefelibata.builders.base``.
 """
+import pickle
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Type
 
+import pytest
+from pyfakefs.fake_filesystem import FakeFilesystem
 from pytest_mock import MockerFixture
 from yarl import URL
 
-from nefelibata.builders.base import Builder, get_builders
+from nefelibata.builders.base import (
+    Builder,
+    call_worker_builder,
+    get_builders,
+    get_page_name,
+    init_worker,
+    paginate,
+)
 from nefelibata.config import BuilderModel, Config
 from nefelibata.post import Post
+from nefelibata.repository import PostRepository
 
 from ..conftest import MockEntryPoint
 
@@ -50,9 +62,13 @@ def test_get_builders(
             }
         ),
     }
-    builders = get_builders(root, config)
+    repository = mocker.MagicMock()
+    graph = mocker.MagicMock()
+    builders = get_builders(root, config, repository, graph)
     assert len(builders) == 1
     assert isinstance(builders["builder"], DummyBuilder)
+    assert builders["builder"].repository is repository
+    assert builders["builder"].graph is graph
 
 
 def test_builder_render(root: Path, config: Config) -> None:
@@ -63,6 +79,223 @@ def test_builder_render(root: Path, config: Config) -> None:
     assert builder.render("test") == "test"
 
 
+def test_builder_render_cache(
+    mocker: MockerFixture,
+    root: Path,
+    config: Config,
+) -> None:
+    """
+    Test that rendered content is cached in memory and on disk.
+    """
+    DummyBuilder = make_dummy_builder("DummyBuilder")
+    DummyBuilder.name = "dummy"
+    convert = mocker.patch.object(DummyBuilder, "convert", return_value="<p>Hi</p>")
+
+    builder = DummyBuilder(root, config, "https://example.com/")
+    assert builder.render("Hi") == "<p>Hi</p>"
+    assert builder.render("Hi") == "<p>Hi</p>"
+    convert.assert_called_once_with("Hi")
+
+    key = builder.render_cache.get_key("Hi")
+    assert (root / ".cache/rendered/dummy" / f"{key}.pickle").exists()
+
+    # a new builder reuses the rendered content from disk
+    builder = DummyBuilder(root, config, "https://example.com/")
+    assert builder.render("Hi") == "<p>Hi</p>"
+    convert.assert_called_once_with("Hi")
+
+    # nothing is persisted when the cache is disabled
+    repository = PostRepository(root, config, use_cache=False)
+    builder = DummyBuilder(root, config, "https://example.com/", repository=repository)
+    assert builder.render_cache.directory is None
+
+
+def test_builder_get_environment(
+    fs: FakeFilesystem,
+    root: Path,
+    config: Config,
+) -> None:
+    """
+    Test that environments are shared, and compiled templates cached on disk.
+    """
+    DummyBuilder = make_dummy_builder("DummyBuilder")
+    DummyBuilder.name = "dummy"
+    fs.create_file(root / "templates/builders/dummy/post.html", contents="Hi")
+
+    builder = DummyBuilder(root, config, "https://example.com/")
+    assert DummyBuilder(root, config, "https://example.com/").env is builder.env
+
+    assert builder.env.get_template("post.html").render() == "Hi"
+    assert len(list((root / ".cache/jinja").iterdir())) == 1
+
+    repository = PostRepository(root, config, use_cache=False)
+    builder = DummyBuilder(root, config, "https://example.com/", repository=repository)
+    assert builder.env.bytecode_cache is None
+
+
+@pytest.mark.asyncio
+async def test_builder_run_in_executor(
+    fs: FakeFilesystem,
+    root: Path,
+    config: Config,
+) -> None:
+    """
+    Test rendering templates in an executor.
+    """
+    DummyBuilder = make_dummy_builder("DummyBuilder")
+    DummyBuilder.name = "dummy"
+    fs.create_file(
+        root / "templates/builders/dummy/post.html",
+        contents="{{ render(title) }} by {{ config.author.name }}",
+    )
+
+    builder = DummyBuilder(root, config, "https://example.com/")
+    assert await builder.run_in_executor(
+        builder.render_template,
+        "post.html",
+        title="Hi",
+    ) == ("Hi by Beto Dealmeida")
+
+    with ThreadPoolExecutor() as executor:
+        builder = DummyBuilder(
+            root,
+            config,
+            "https://example.com/",
+            executor=executor,
+        )
+        assert await builder.run_in_executor(
+            builder.render_template,
+            "post.html",
+            title="Hi",
+        ) == ("Hi by Beto Dealmeida")
+
+        # templates can also be streamed to a file
+        path = root / "build/dummy/index.html"
+        fs.create_dir(path.parent)
+        assert await builder.run_in_executor(
+            builder.write_template,
+            path,
+            "post.html",
+            title="Hi",
+        )
+        assert path.read_text() == "Hi by Beto Dealmeida"
+
+
+@pytest.mark.asyncio
+async def test_builder_run_in_worker(
+    mocker: MockerFixture,
+    fs: FakeFilesystem,
+    root: Path,
+    config: Config,
+) -> None:
+    """
+    Test that methods are called on the builder sent to workers when they start.
+    """
+    document_cache = mocker.patch("nefelibata.builders.base.document_cache")
+    mocker.patch("nefelibata.builders.base._worker_builders", {})
+    fs.create_file(root / "templates/builders/builder/post.html", contents="Hi")
+
+    builder = Builder(root, config, "https://example.com/")
+    worker_builder = mocker.MagicMock()
+    init_worker({"builder": worker_builder}, root / ".cache/markdown")
+    assert document_cache.directory == root / ".cache/markdown"
+    assert call_worker_builder("builder", "render", "Hello") == (
+        worker_builder.render.return_value
+    )
+    worker_builder.render.assert_called_with("Hello")
+
+    with ThreadPoolExecutor() as executor:
+        builder.executor = executor
+        builder.worker_name = "builder"
+        assert await builder.run_in_executor(builder.render_template, "post.html") == (
+            worker_builder.render_template.return_value
+        )
+        worker_builder.render_template.assert_called_with("post.html")
+
+        # other functions are sent with each task
+        assert await builder.run_in_executor(str.upper, "hi") == "HI"
+
+
+def test_builder_pickle(root: Path, config: Config, post: Post) -> None:
+    """
+    Test that builders can be sent to worker processes.
+    """
+    repository = PostRepository(root, config, use_cache=False)
+    repository.get_posts()
+    with ThreadPoolExecutor() as executor:
+        builder = Builder(
+            root,
+            config,
+            "https://example.com/",
+            repository=repository,
+            executor=executor,
+        )
+        builder.render("Hello")
+
+        copy = pickle.loads(pickle.dumps(builder))
+
+    assert copy.home == builder.home
+    assert copy.config == builder.config
+    assert copy.env is builder.env
+    assert copy.executor is None
+    assert copy.worker_name is None
+    assert copy.repository is not repository
+    assert not copy.repository.use_cache
+    assert copy.render_cache.namespace == builder.render_cache.namespace
+    assert copy.render_cache.entries == {}
+
+
+def test_get_page_name() -> None:
+    """
+    Test ``get_page_name``.
+    """
+    assert get_page_name("index.html", 1) == "index.1.html"
+    assert get_page_name("tags/python.gmi", 12) == "tags/python.12.gmi"
+
+
+def test_paginate(mocker: MockerFixture) -> None:
+    """
+    Test ``paginate``.
+    """
+    posts = [mocker.MagicMock(name=f"post{i}") for i in range(5, 0, -1)]
+
+    (page,) = paginate("index.html", posts)
+    assert (page.name, page.posts, page.previous, page.current) == (
+        "index.html",
+        posts,
+        None,
+        None,
+    )
+    (page,) = paginate("index.html", posts, 5)
+    assert page.posts == posts
+
+    current, first, second = paginate("index.html", posts, 2)
+    assert (current.name, current.posts, current.previous, current.current) == (
+        "index.html",
+        posts[:2],
+        "index.2.html",
+        None,
+    )
+    assert (first.name, first.posts, first.previous, first.current) == (
+        "index.1.html",
+        [posts[3], posts[4]],
+        None,
+        "index.html",
+    )
+    assert (second.name, second.posts, second.previous, second.current) == (
+        "index.2.html",
+        [posts[1], posts[2]],
+        "index.1.html",
+        "index.html",
+    )
+
+    # archived pages don't change when new posts are added
+    new_post = mocker.MagicMock(name="post6")
+    _, first_again, second_again = paginate("index.html", [new_post] + posts, 2)
+    assert first_again.posts == first.posts
+    assert second_again.posts == second.posts
+
+
 def test_builder_absolute_url(root: Path, config: Config, post: Post) -> None:
     """
     Test the ``absolute_url`` method in ``Builder``.
@@ -70,3 +303,39 @@ def test_builder_absolute_url(root: Path, config: Config, post: Post) -> None:
     builder = Builder(root, config, "https://example.com/")
     builder.extension = ".html"
     assert builder.absolute_url(post) == URL("https://example.com/first/index.html")
+
+
+def test_builder_get_template_paths(
+    fs: FakeFilesystem,
+    root: Path,
+    config: Config,
+) -> None:
+    """
+    Test ``get_template_paths``.
+    """
+    DummyBuilder = make_dummy_builder("DummyBuilder")
+    DummyBuilder.name = "dummy"
+
+    templates = root / "templates/builders/dummy"
+    fs.create_file(
+        templates / "post.html",
+        contents=(
+            '{% extends "base.html" %}'
+            '{% include "footer.html" %}'
+            "{% include name %}"
+        ),
+    )
+    fs.create_file(templates / "base.html", contents='{% include "footer.html" %}')
+    fs.create_file(templates / "footer.html", contents="The end")
+
+    builder = DummyBuilder(root, config, "https://example.com/")
+    paths = builder.get_template_paths("post.html")
+    assert sorted(paths) == [
+        templates / "base.html",
+        templates / "footer.html",
+        templates / "post.html",
+    ]
+    assert builder.get_template_paths("post.html") is paths
+
+    builder.clear_template_paths()
+    assert builder.get_template_paths("post.html") is not paths
@@ -5,15 +5,18 @@ Tests for ``nefelibata.builders.gemini``.
 from pathlib import Path
 from typing import Any, Dict
 
+import marko
 import pytest
 from freezegun import freeze_time
 from marko import Markdown
+from pyfakefs.fake_filesystem import FakeFilesystem
 from pytest_mock import MockerFixture
 
+from nefelibata import __version__
 from nefelibata.builders.gemini import GeminiBuilder, GemtextRenderer
 from nefelibata.config import Config, SocialModel
 from nefelibata.enclosure import Enclosure
-from nefelibata.post import Post
+from nefelibata.post import Post, build_post
 
 
 @pytest.mark.asyncio
@@ -42,6 +45,17 @@ async def test_builder_setup(root: Path, config: Config) -> None:
     assert build_directory.stat().st_mtime == last_update[build_directory]
 
 
+def test_builder_render(root: Path, config: Config) -> None:
+    """
+    Test that the render key includes the Markdown renderer.
+    """
+    builder = GeminiBuilder(root, config, "https://example.com/")
+    assert builder.get_render_key() == (
+        f"gemini:{__version__}:marko-{marko.__version__}"
+    )
+    assert builder.render("Hello") == builder.convert("Hello")
+
+
 @pytest.mark.asyncio
 async def test_builder_post(
     mocker: MockerFixture,
@@ -77,7 +91,9 @@ async def test_builder_post(
     _logger.info.assert_has_calls(
         [
             mocker.call("Creating %s post", "Gemini"),
-            mocker.call("Copying enclosure %s", enclosure_path),
+            mocker.call(
+                "Creating enclosure %s", root / "build/gemini/first/picture.jpg"
+            ),
         ],
     )
     with open(post_path, encoding="utf-8") as input_:
@@ -127,13 +143,25 @@ Published on 2021-01-01 00:00:00+00:00 by Beto Dealmeida <roberto@dealmeida.net>
     last_update = post_path.stat().st_mtime
     with freeze_time("2021-01-04T00:00:00Z"):
         await builder.process_post(post, force=True)
-    assert post_path.stat().st_mtime > last_update
-    _logger.info.assert_has_calls(
+    assert post_path.stat().st_mtime == last_update
+    _logger.debug.assert_has_calls(
         [
-            mocker.call("Creating %s post", "Gemini"),
-            mocker.call("Copying enclosure %s", enclosure_path),
+            mocker.call("Post %s is unchanged", post_path),
+            mocker.call(
+                "Enclosure %s is unchanged",
+                root / "build/gemini/first/picture.jpg",
+            ),
         ],
     )
+    _logger.info.assert_not_called()
+
+    # the file is only written if the content changes
+    _logger.reset_mock()
+    post.title = "A new title"
+    with freeze_time("2021-01-05T00:00:00Z"):
+        await builder.process_post(post, force=True)
+    assert post_path.stat().st_mtime > last_update
+    _logger.info.assert_called_with("Creating %s post", "Gemini")
 
 
 @pytest.mark.asyncio
@@ -147,7 +175,7 @@ async def test_builder_site(
     Test ``process_site``.
     """
     _logger = mocker.patch("nefelibata.builders.base._logger")
-    mocker.patch("nefelibata.builders.base.get_posts", return_value=[post])
+    mocker.patch("nefelibata.repository.get_posts", return_value=[post])
 
     config.social = [SocialModel(title="Mastodon", url="https://2c.taoetc.org/@beto")]
     builder = GeminiBuilder(root, config, "gemini://localhost:1965")
@@ -256,6 +284,15 @@ Crafted with ❤️ using Nefelibata
     _logger.reset_mock()
     with freeze_time("2021-01-04T00:00:00Z"):
         await builder.process_site(force=True)
+    for asset in assets:
+        assert (assets_directory / asset).stat().st_mtime == last_update[asset]
+    _logger.info.assert_not_called()
+
+    # files are only written if their content changes
+    _logger.reset_mock()
+    post.title = "A new title"
+    with freeze_time("2021-01-05T00:00:00Z"):
+        await builder.process_site(force=True)
     for asset in assets:
         assert (assets_directory / asset).stat().st_mtime > last_update[asset]
     _logger.info.assert_has_calls(
@@ -677,3 +714,37 @@ This is a paragraph.
 This is a paragraph.
 """
     )
+
+
+@pytest.mark.asyncio
+async def test_builder_site_paginated(
+    mocker: MockerFixture,
+    fs: FakeFilesystem,
+    root: Path,
+    config: Config,
+) -> None:
+    """
+    Test ``process_site`` with pagination.
+    """
+    posts = []
+    for day in (2, 1):
+        path = root / f"posts/post{day}/index.mkd"
+        fs.create_file(
+            path,
+            contents=f"subject: Post {day}\ndate: Fri, 0{day} Jan 2021 00:00:00 +0000",
+        )
+        posts.append(build_post(root, config, path))
+    mocker.patch("nefelibata.repository.get_posts", return_value=posts)
+
+    builder = GeminiBuilder(root, config, "gemini://localhost:1965", page_size=1)
+    await builder.process_site()
+
+    feed = (root / "build/gemini/feed.gmi").read_text()
+    assert "Post 2" in feed and "Post 1" not in feed
+    assert feed.endswith("\n=> gemini://localhost:1965/feed.1.gmi Older posts\n")
+
+    archived_feed = (root / "build/gemini/feed.1.gmi").read_text()
+    assert "Post 1" in archived_feed and "Post 2" not in archived_feed
+    assert archived_feed.endswith(
+        "\n=> gemini://localhost:1965/feed.gmi Latest posts\n",
+    )
@@ -5,14 +5,19 @@ Tests for ``nefelibata.builders.html``.
 from pathlib import Path
 from typing import Any, Dict
 
+import marko
 import pytest
 from freezegun import freeze_time
+from pyfakefs.fake_filesystem import FakeFilesystem
 from pytest_mock import MockerFixture
 
 from nefelibata import __version__
+from nefelibata.builders.base import create_executor
 from nefelibata.builders.html import HTMLBuilder
 from nefelibata.config import Config, SocialModel
-from nefelibata.post import Post
+from nefelibata.post import Post, build_post
+
+from ..fakes import CONFIG, POST_CONTENT
 
 
 @pytest.mark.asyncio
@@ -43,6 +48,17 @@ async def test_builder_setup(root: Path, config: Config) -> None:
     assert build_directory.stat().st_mtime == last_update[build_directory]
 
 
+def test_builder_render(root: Path, config: Config) -> None:
+    """
+    Test that the render key includes the Markdown renderer.
+    """
+    builder = HTMLBuilder(root, config, "https://example.com/")
+    assert builder.get_render_key() == (
+        f"html:{__version__}:marko-{marko.__version__}:codehilite"
+    )
+    assert builder.render("Hello") == builder.convert("Hello")
+
+
 @pytest.mark.asyncio
 async def test_builder_post(
     mocker: MockerFixture,
@@ -150,6 +166,27 @@ async def test_builder_post(
     last_update = post_path.stat().st_mtime
     with freeze_time("2021-01-04T00:00:00Z"):
         await builder.process_post(post, force=True)
+    assert post_path.stat().st_mtime == last_update
+    _logger.debug.assert_called_with("Post %s is unchanged", post_path)
+
+    # adding a YAML file to the post triggers a rebuild, but the file is only
+    # written if the content changes
+    _logger.reset_mock()
+    with freeze_time("2021-01-05T00:00:00Z"):
+        (post.path.parent / "reading_time.yaml").write_text("words: 1")
+        builder.graph.stats.clear()
+        await builder.process_post(post)
+    assert post_path.stat().st_mtime == last_update
+    _logger.debug.assert_called_with("Post %s is unchanged", post_path)
+
+    # and so does modifying a parent template
+    _logger.reset_mock()
+    last_update = post_path.stat().st_mtime
+    with freeze_time("2021-01-06T00:00:00Z"):
+        base = root / "templates/builders/html/minimal/src/base.html"
+        base.write_text(base.read_text() + "\n")
+        builder.graph.stats.clear()
+        await builder.process_post(post)
     assert post_path.stat().st_mtime > last_update
     _logger.info.assert_called_with("Creating %s post", "HTML")
 
@@ -165,7 +202,7 @@ async def test_builder_site(
     Test ``process_site``.
     """
     _logger = mocker.patch("nefelibata.builders.base._logger")
-    mocker.patch("nefelibata.builders.base.get_posts", return_value=[post])
+    mocker.patch("nefelibata.repository.get_posts", return_value=[post])
 
     config.social = [SocialModel(title="Mastodon", url="https://2c.taoetc.org/@beto")]
     builder = HTMLBuilder(root, config, "https://example.com/")
@@ -324,6 +361,15 @@ async def test_builder_site(
     _logger.reset_mock()
     with freeze_time("2021-01-04T00:00:00Z"):
         await builder.process_site(force=True)
+    for asset in assets:
+        assert (assets_directory / asset).stat().st_mtime == last_update[asset]
+    _logger.info.assert_not_called()
+
+    # files are only written if their content changes
+    _logger.reset_mock()
+    post.title = "A new title"
+    with freeze_time("2021-01-05T00:00:00Z"):
+        await builder.process_site(force=True)
     for asset in assets:
         assert (assets_directory / asset).stat().st_mtime > last_update[asset]
     _logger.info.assert_has_calls(
@@ -344,3 +390,107 @@ async def test_builder_site(
             ),
         ],
     )
+
+
+@pytest.mark.asyncio
+async def test_builder_process_pool(tmp_path: Path) -> None:
+    """
+    Test that rendering in a process pool produces the same output.
+    """
+    config = Config(**CONFIG)
+    post_path = tmp_path / "posts/first/index.mkd"
+    post_path.parent.mkdir(parents=True)
+    post_path.write_text(POST_CONTENT)
+    post = build_post(tmp_path, config, post_path)
+
+    builder = HTMLBuilder(tmp_path, config, "https://example.com/")
+    builder.setup()
+    await builder.process_post(post)
+    await builder.process_site()
+    expected = {
+        path: path.read_text() for path in (tmp_path / "build/html").glob("**/*.html")
+    }
+
+    for path in expected:
+        path.unlink()
+
+    builder = HTMLBuilder(tmp_path, config, "https://example.com/")
+    with create_executor({"html": builder}, 2):
+        await builder.process_post(post)
+        await builder.process_site()
+
+    assert {
+        path: path.read_text() for path in (tmp_path / "build/html").glob("**/*.html")
+    } == expected
+
+
+@pytest.mark.asyncio
+async def test_builder_site_paginated(
+    mocker: MockerFixture,
+    fs: FakeFilesystem,
+    root: Path,
+    config: Config,
+) -> None:
+    """
+    Test ``process_site`` with pagination.
+    """
+
+    def create_post(day: int) -> Post:
+        path = root / f"posts/post{day}/index.mkd"
+        fs.create_file(
+            path,
+            contents=(
+                f"subject: Post {day}\n"
+                f"date: Fri, 0{day} Jan 2021 00:00:00 +0000\n"
+                "keywords: blog\n\nHello!"
+            ),
+        )
+        return build_post(root, config, path)
+
+    posts = [create_post(day) for day in range(3, 0, -1)]
+    get_posts = mocker.patch("nefelibata.repository.get_posts", return_value=posts)
+
+    builder = HTMLBuilder(root, config, "https://example.com/", page_size=2)
+    builder.setup()
+    await builder.process_site()
+
+    build = root / "build/html"
+    assert not (build / "index.2.html").exists()
+    index = (build / "index.html").read_text()
+    assert "Post 3" in index and "Post 2" in index and "Post 1" not in index
+    assert '<a href="https://example.com/index.1.html">Older posts</a>' in index
+    archive = (build / "index.1.html").read_text()
+    assert "Post 2" in archive and "Post 1" in archive and "Post 3" not in archive
+    assert '<a href="https://example.com/index.html">Latest posts</a>' in archive
+    assert (build / "tags/blog.1.html").exists()
+
+    feed = (build / "atom.xml").read_text()
+    assert (
+        '<link rel="prev-archive" type="application/atom+xml" '
+        'href="https://example.com/atom.1.xml" />'
+    ) in feed
+    assert "fh:archive" not in feed
+    archived_feed = (build / "atom.1.xml").read_text()
+    assert (
+        '<link rel="self" type="application/atom+xml" '
+        'href="https://example.com/atom.1.xml" />'
+    ) in archived_feed
+    assert (
+        '<link rel="current" type="application/atom+xml" '
+        'href="https://example.com/atom.xml" />'
+    ) in archived_feed
+    assert '<fh:archive xmlns:fh="http://purl.org/syndication/history/1.0" />' in (
+        archived_feed
+    )
+    assert "prev-archive" not in archived_feed
+
+    # a new post creates a new archived page, leaving the old one untouched
+    last_update = (build / "atom.1.xml").stat().st_mtime_ns
+    get_posts.return_value = [create_post(4)] + posts
+    builder = HTMLBuilder(root, config, "https://example.com/", page_size=2)
+    await builder.process_site()
+
+    assert (build / "atom.1.xml").stat().st_mtime_ns == last_update
+    feed = (build / "atom.xml").read_text()
+    assert "Post 4" in feed and "Post 3" in feed and "Post 2" not in feed
+    assert not (build / "atom.2.xml").exists()
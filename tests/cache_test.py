@@ -0,0 +1,215 @@
+"""
+Tests for ``nefelibata.cache``.
+"""
+# pylint: disable=invalid-name
+
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+from freezegun import freeze_time
+from pyfakefs.fake_filesystem import FakeFilesystem
+from pytest_mock import MockerFixture
+
+from nefelibata.cache import ContentCache, PostCache, get_config_key, write_pickle
+from nefelibata.config import AnnouncerModel, Config
+from nefelibata.inventory import scan_post_directory
+from nefelibata.post import Post
+
+
+def test_get_config_key(config: Config) -> None:
+    """
+    Test ``get_config_key``.
+    """
+    key = get_config_key(config)
+    assert key == get_config_key(config)
+
+    # changes to unrelated sections don't affect the key
+    config.title = "A new title"
+    assert get_config_key(config) == key
+
+    config.announcers["antenna"] = AnnouncerModel(plugin="antenna")
+    assert get_config_key(config) != key
+
+
+def test_post_cache(root: Path, config: Config, post: Post) -> None:
+    """
+    Test storing and retrieving posts.
+    """
+    fingerprint = scan_post_directory(post.path.parent).fingerprint
+
+    cache = PostCache(root, config)
+    assert cache.get(post.path, fingerprint) is None
+    cache.set(post.path, fingerprint, post)
+    assert cache.get(post.path, fingerprint) == post
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.save()
+
+    # load from disk
+    cache = PostCache(root, config)
+    assert cache.get(post.path, fingerprint) == post
+    assert cache.get(post.path, ()) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # saving is a no-op if nothing changed
+    assert not cache.modified
+    cache.save()
+
+    # a different configuration discards the index
+    config.announcers["antenna"] = AnnouncerModel(plugin="antenna")
+    cache = PostCache(root, config)
+    assert cache.entries == {}
+
+
+def test_post_cache_disabled(root: Path, config: Config, post: Post) -> None:
+    """
+    Test that a disabled cache is never read or written.
+    """
+    fingerprint = scan_post_directory(post.path.parent).fingerprint
+
+    cache = PostCache(root, config, enabled=False)
+    cache.set(post.path, fingerprint, post)
+    assert cache.get(post.path, fingerprint) is None
+    cache.save()
+
+    assert not (root / ".cache/posts.pickle").exists()
+
+
+def test_post_cache_prune(root: Path, config: Config, post: Post) -> None:
+    """
+    Test removing deleted posts from the index.
+    """
+    cache = PostCache(root, config)
+    cache.set(post.path, (), post)
+    cache.modified = False
+
+    cache.prune([post.path])
+    assert not cache.modified
+
+    cache.prune([])
+    assert cache.entries == {}
+    assert cache.modified
+
+
+def test_post_cache_invalid(
+    mocker: MockerFixture,
+    fs: FakeFilesystem,
+    root: Path,
+    config: Config,
+) -> None:
+    """
+    Test that an invalid index is ignored.
+    """
+    _logger = mocker.patch("nefelibata.cache._logger")
+    fs.create_file(root / ".cache/posts.pickle", contents="invalid")
+
+    cache = PostCache(root, config)
+    assert cache.entries == {}
+    _logger.warning.assert_called_with(
+        "Invalid post cache: %s",
+        Path("/path/to/blog/.cache/posts.pickle"),
+    )
+
+
+def test_content_cache(fs: FakeFilesystem, root: Path) -> None:
+    """
+    Test ``ContentCache``.
+    """
+    cache = ContentCache(namespace="test", size=2)
+    key = cache.get_key("Hello")
+    assert key != ContentCache(namespace="other").get_key("Hello")
+
+    assert cache.get(key) is None
+    assert key not in cache
+    cache.set(key, {"answer": 42})
+    assert cache.get(key) == {"answer": 42}
+    assert key in cache
+
+    # least recently used values are evicted
+    cache.set("a", 1)
+    cache.get(key)
+    cache.set("b", 2)
+    assert list(cache.entries) == [key, "b"]
+
+    # values are persisted to disk when a directory is set
+    cache.directory = root / ".cache/test"
+    cache.set("c", 3)
+    cache.clear()
+    assert "c" in cache
+    assert "d" not in cache
+    assert cache.get("c") == 3
+    assert cache.get("d") is None
+
+    fs.create_file(root / ".cache/test/d.pickle", contents="invalid")
+    assert cache.get("d") is None
+
+
+def test_write_pickle(fs: FakeFilesystem, root: Path) -> None:
+    """
+    Test ``write_pickle``.
+    """
+    path = root / ".cache/test/value.pickle"
+    write_pickle(path, {"answer": 42})
+    with open(path, "rb") as input_:
+        assert pickle.load(input_) == {"answer": 42}
+
+    # the temporary file is removed if the value can't be stored
+    with pytest.raises(Exception):
+        write_pickle(path, lambda: None)
+    assert [child.name for child in path.parent.iterdir()] == ["value.pickle"]
+
+
+def store_values(directory: Path, count: int) -> None:
+    """
+    Store the same key repeatedly, from a worker process.
+    """
+    cache = ContentCache(directory=directory)
+    for i in range(count):
+        cache.set("key", i)
+
+
+def test_content_cache_processes(tmp_path: Path) -> None:
+    """
+    Test that multiple processes can store the same value at the same time.
+    """
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(store_values, tmp_path, 500) for _ in range(4)]
+        for future in futures:
+            future.result()
+
+    assert [child.name for child in tmp_path.iterdir()] == ["key.pickle"]
+    assert ContentCache(directory=tmp_path).get("key") == 499
+
+
+def test_content_cache_prune(fs: FakeFilesystem, root: Path) -> None:
+    """
+    Test removing stale entries from disk.
+    """
+    directory = root / ".cache/test"
+
+    # nothing to prune
+    ContentCache().prune()
+    ContentCache(directory=directory).prune()
+
+    with freeze_time("2021-01-01T00:00:00Z"):
+        cache = ContentCache(directory=directory)
+        cache.set("old", 1)
+        cache.set("used", 2)
+        fs.create_file(directory / ".orphan.pickle.1234.tmp")
+
+    with freeze_time("2021-03-01T00:00:00Z"):
+        # reading an entry from disk marks it as used
+        cache = ContentCache(directory=directory)
+        assert cache.get("used") == 2
+        cache.set("new", 3)
+
+        cache.prune()
+        assert sorted(path.name for path in directory.iterdir()) == [
+            "new.pickle",
+            "used.pickle",
+        ]
+
+    with freeze_time("2021-03-02T00:00:00Z"):
+        cache.prune(max_age=60)
+        assert not list(directory.iterdir())
@@ -1,27 +1,36 @@
 """
 Test ``nefelibata.cli.build``.
 """
-# pylint: disable=invalid-name
+# pylint: disable=invalid-name, unused-argument
 
+import asyncio
 from pathlib import Path
+from typing import Dict
 
 import pytest
+import yaml
+from pyfakefs.fake_filesystem import FakeFilesystem
 from pytest_mock import MockerFixture
 
-from nefelibata.cli import build
-from nefelibata.post import Post
+from nefelibata.announcers.base import Interaction, Scope
+from nefelibata.builders.base import Builder
+from nefelibata.cli import build, init
+from nefelibata.config import Config
+from nefelibata.post import Post, document_cache
 
 
 @pytest.mark.asyncio
 async def test_run(
     mocker: MockerFixture,
     root: Path,
+    config: Config,
     post: Post,
 ) -> None:
     """
     Test ``run``.
     """
     assistant = mocker.MagicMock()
+    assistant.scopes = [Scope.POST, Scope.SITE]
     assistant.process_post = mocker.AsyncMock()
     assistant.process_site = mocker.AsyncMock()
 
@@ -30,24 +39,27 @@ async def test_run(
     builder.process_site = mocker.AsyncMock()
 
     announcer1 = mocker.MagicMock()
+    announcer1.scopes = [Scope.POST, Scope.SITE]
     announcer1.collect_post = mocker.AsyncMock(return_value={})
     announcer1.collect_site = mocker.AsyncMock(return_value={})
 
     announcer2 = mocker.MagicMock()
+    announcer2.scopes = [Scope.POST, Scope.SITE]
     announcer2.collect_site = mocker.AsyncMock(return_value={})
     announcer2.collect_site.return_value = {}
 
     mocker.patch(
-        "nefelibata.cli.build.get_announcers",
+        "nefelibata.registry.get_announcers",
         return_value={"announcer1": announcer1, "announcer2": announcer2},
     )
     mocker.patch(
-        "nefelibata.cli.build.get_assistants",
+        "nefelibata.registry.get_assistants",
         return_value={"assistant": assistant},
     )
-    mocker.patch("nefelibata.cli.build.get_builders", return_value={"builder": builder})
-    mocker.patch("nefelibata.cli.build.get_config")
-    mocker.patch("nefelibata.cli.build.get_posts", return_value=[post])
+    mocker.patch("nefelibata.registry.get_builders", return_value={"builder": builder})
+    mocker.patch("nefelibata.cli.build.get_config", return_value=config)
+    DependencyGraph = mocker.patch("nefelibata.cli.build.DependencyGraph")
+    mocker.patch("nefelibata.repository.get_posts", return_value=[post])
 
     _logger = mocker.patch("nefelibata.cli.build._logger")
 
@@ -57,8 +69,15 @@ async def test_run(
 
     assistant.process_post.assert_called_with(post, False)
     assistant.process_site.assert_called_with(False)
-    builder.process_post.assert_called_with(post, False)
+
+    # the post is reloaded after the interactions are stored
+    builder.process_post.assert_called_with(mocker.ANY, False)
+    reloaded_post = builder.process_post.call_args[0][0]
+    assert reloaded_post.path == post.path
+    assert reloaded_post.metadata["interactions"] == {}
     builder.process_site.assert_called_with(False)
+    builder.render_cache.prune.assert_called_with()
+    DependencyGraph.return_value.save.assert_called_with()
     announcer1.collect_post.assert_called_with(post)
     announcer1.collect_site.assert_called_with()
     announcer2.collect_post.assert_not_called()
@@ -67,21 +86,260 @@ async def test_run(
         [
             mocker.call("Building blog"),
             mocker.call("Creating `build/` directory"),
-            mocker.call("Collecting interactions from posts"),
-            mocker.call("Collecting interactions from site"),
-            mocker.call("Running post assistants"),
+            mocker.call("Normalizing posts"),
             mocker.call("Running site assistants"),
             mocker.call("Processing posts"),
+            mocker.call("Collecting interactions from site"),
             mocker.call("Processing site"),
         ],
     )
 
+    # parsed Markdown is persisted in the cache directory
+    assert document_cache.directory == root / ".cache/markdown"
+
     _logger.reset_mock()
 
-    await build.run(root)
+    await build.run(root, use_cache=False)
+    assert document_cache.directory is None
     _logger.info.assert_has_calls(
         [
             mocker.call("Processing posts"),
+            mocker.call("Collecting interactions from site"),
             mocker.call("Processing site"),
         ],
     )
+
+
+@pytest.mark.asyncio
+async def test_run_with_workers(
+    mocker: MockerFixture,
+    root: Path,
+    post: Post,
+) -> None:
+    """
+    Test that templates are rendered in a process pool when using workers.
+    """
+    builder = mocker.MagicMock()
+    builder.process_post = mocker.AsyncMock()
+    builder.process_site = mocker.AsyncMock(side_effect=Exception("Boom"))
+    get_builders = mocker.patch(
+        "nefelibata.registry.get_builders",
+        return_value={"builder": builder},
+    )
+    mocker.patch("nefelibata.registry.get_announcers", return_value={})
+    mocker.patch("nefelibata.registry.get_assistants", return_value={})
+    mocker.patch("nefelibata.cli.build.get_config")
+    mocker.patch("nefelibata.cli.build.DependencyGraph")
+    mocker.patch("nefelibata.repository.get_posts", return_value=[post])
+    create_executor = mocker.patch("nefelibata.cli.build.create_executor")
+
+    # the pool is shut down even if the build fails
+    with pytest.raises(Exception) as excinfo:
+        await build.run(root, workers=4)
+    assert str(excinfo.value) == "Boom"
+
+    create_executor.assert_called_with({"builder": builder}, 4)
+    get_builders.assert_called_once()
+    create_executor.return_value.shutdown.assert_called_with()
+
+
+@pytest.mark.asyncio
+async def test_run_post_pipelines(
+    mocker: MockerFixture,
+    fs: FakeFilesystem,
+    root: Path,
+    config: Config,
+) -> None:
+    """
+    Test that posts are built without waiting for other posts or for the site.
+    """
+    fs.create_file(
+        root / "posts/fast/index.mkd",
+        contents="subject: Fast\ndate: Fri, 01 Jan 2021 00:00:00 +0000\n\n",
+    )
+    fs.create_file(
+        root / "posts/slow/index.mkd",
+        contents=(
+            "subject: Slow\ndate: Sat, 02 Jan 2021 00:00:00 +0000\n"
+            "announce-on: slow\n\n"
+        ),
+    )
+
+    fs.create_dir(root / "posts/deleted")
+
+    built = asyncio.Event()
+    events = []
+
+    async def collect_post(post: Post) -> Dict[str, Interaction]:
+        # the fast post is built while interactions are being collected
+        await built.wait()
+        events.append(f"collected {post.title}")
+        return {}
+
+    async def collect_site() -> Dict[Path, Dict[str, Interaction]]:
+        # posts are built while interactions are collected from the site
+        await built.wait()
+        events.append("collected site")
+        return {
+            path: {
+                "reply,1": Interaction(
+                    id="reply,1",
+                    name="Bob",
+                    url="https://example.com/",
+                    type="reply",
+                ),
+            }
+            for path in [
+                root / "posts/deleted/index.mkd",
+                root / "posts/fast/index.mkd",
+            ]
+        }
+
+    async def process_post(post: Post, force: bool) -> None:
+        events.append(f"built {post.title}")
+        built.set()
+
+    async def process_site(force: bool) -> None:
+        events.append("built site")
+
+    async def process_assistant_site(force: bool) -> None:
+        events.append("assisted site")
+
+    announcer = mocker.MagicMock()
+    announcer.scopes = [Scope.POST, Scope.SITE]
+    announcer.collect_post = collect_post
+    announcer.collect_site = collect_site
+    assistant = mocker.MagicMock()
+    assistant.scopes = [Scope.SITE]
+    assistant.process_site = process_assistant_site
+    builder = mocker.MagicMock()
+    builder.process_post = process_post
+    builder.process_site = process_site
+    mocker.patch("nefelibata.registry.get_announcers", return_value={"slow": announcer})
+    mocker.patch(
+        "nefelibata.registry.get_assistants",
+        return_value={"assistant": assistant},
+    )
+    mocker.patch("nefelibata.registry.get_builders", return_value={"builder": builder})
+
+    await build.run(root, use_cache=False)
+
+    assert events == [
+        # posts are only built after the site assistants
+        "assisted site",
+        "built Fast",
+        "collected Slow",
+        "collected site",
+        "built Slow",
+        # the fast post received new interactions, so it's built again
+        "built Fast",
+        "built site",
+    ]
+    assert (root / "posts/fast/interactions.yaml").exists()
+
+    # interactions for posts that are not being built are also stored
+    assert (root / "posts/deleted/interactions.yaml").exists()
+
+    # posts are not built again when there are no new interactions
+    events.clear()
+    built.clear()
+    await build.run(root, use_cache=False)
+    assert events.count("built Fast") == 1
+
+
+@pytest.mark.asyncio
+async def test_store_site_interactions(
+    fs: FakeFilesystem,
+    root: Path,
+    config: Config,
+) -> None:
+    """
+    Test that posts with new site interactions are built again.
+    """
+    fs.create_file(
+        root / "posts/first/index.mkd",
+        contents="subject: Hi\ndate: Fri, 01 Jan 2021 00:00:00 +0000\n\nHello!",
+    )
+    fs.create_file(
+        root / "templates/builders/dummy/post.html",
+        contents=(
+            "{% for interaction in post.metadata.get('interactions', {}).values() %}"
+            "{{ interaction.name }}{% endfor %}"
+        ),
+    )
+
+    class DummyBuilder(Builder):
+        """
+        A builder that renders interactions.
+        """
+
+        name = "dummy"
+        extension = ".html"
+
+    builder = DummyBuilder(root, config, "https://example.com/")
+    repository = builder.repository
+    path = root / "posts/first/index.mkd"
+    output = root / "build/dummy/first/index.html"
+
+    pipeline = asyncio.create_task(builder.process_post(repository.get_post(path)))
+    interactions = {
+        "reply,1": Interaction(
+            id="reply,1",
+            name="Bob",
+            url="https://example.com/",
+            type="reply",
+        ),
+    }
+    await build.store_site_interactions(
+        path,
+        interactions,
+        pipeline,
+        {"dummy": builder},
+        repository,
+    )
+    assert output.read_text() == "Bob"
+    assert str(root / "posts/first/interactions.yaml") in builder.graph.entries[output]
+
+
+@pytest.mark.asyncio
+async def test_run_parallel(tmp_path: Path) -> None:
+    """
+    Test building a blog with worker processes and cold caches.
+
+    Posts are parsed and rendered in worker processes, and both builders render the
+    same posts, storing the same documents in the persistent cache concurrently.
+    """
+    await init.run(tmp_path)
+
+    # keep only the builders, since announcers and assistants use the network
+    config = yaml.safe_load((tmp_path / "nefelibata.yaml").read_text())
+    config["assistants"] = {}
+    config["announcers"] = {}
+    for builder in config["builders"].values():
+        builder["announce-on"] = []
+    (tmp_path / "nefelibata.yaml").write_text(yaml.dump(config))
+
+    # long posts with the same content, so that workers parse them at the same time
+    content = "# Hello #\n\n" + "Hello, [world](https://example.com/)!\n\n" * 200
+    for i in range(16):
+        post_directory = tmp_path / f"posts/post{i}"
+        post_directory.mkdir(parents=True)
+        (post_directory / "index.mkd").write_text(
+            f"subject: Post {i}\n"
+            f"date: Fri, {i + 1:02d} Jan 2021 00:00:00 +0000\n"
+            f"keywords: blog\n\n{content}",
+        )
+
+    await build.run(tmp_path, workers=4)
+
+    for i in range(16):
+        assert (tmp_path / f"build/www/post{i}/index.html").exists()
+        assert (tmp_path / f"build/gemini/post{i}/index.gmi").exists()
+
+    cache = tmp_path / ".cache"
+    assert list((cache / "markdown").glob("*.pickle"))
+    assert not list(cache.glob("**/*.tmp"))
+
+    # warm caches
+    await build.run(tmp_path, workers=4, force=True)
+    assert not list(cache.glob("**/*.tmp"))
@@ -9,7 +9,7 @@ from pathlib import Path
 import pytest
 from pytest_mock import MockerFixture
 
-from nefelibata.announcers.base import Announcement
+from nefelibata.announcers.base import Announcement, Scope
 from nefelibata.cli import publish
 from nefelibata.config import Config
 from nefelibata.post import Post
@@ -36,6 +36,7 @@ async def test_run(
     )
 
     announcer = mocker.MagicMock()
+    announcer.scopes = [Scope.POST, Scope.SITE]
     announcer.announce_post = mocker.AsyncMock(
         side_effect=[
             None,
@@ -56,13 +57,14 @@ async def test_run(
     )
 
     mocker.patch(
-        "nefelibata.cli.publish.get_announcers",
+        "nefelibata.registry.get_announcers",
         return_value={"announcer": announcer},
     )
     mocker.patch(
-        "nefelibata.cli.publish.get_publishers",
+        "nefelibata.registry.get_publishers",
         return_value={"publisher": publisher},
     )
+    mocker.patch("nefelibata.registry.get_builders", return_value={})
 
     # On the first publish we should announce site and post.
     await publish.run(root)
@@ -0,0 +1,170 @@
+"""
+Test ``nefelibata.cli.watch``.
+"""
+# pylint: disable=invalid-name, unused-argument
+
+import asyncio
+from pathlib import Path
+
+import pytest
+from pyfakefs.fake_filesystem import FakeFilesystem
+from pytest_mock import MockerFixture
+
+from nefelibata.cli import watch
+from nefelibata.config import Config
+from nefelibata.post import Post, document_cache
+
+
+def test_get_affected_posts(fs: FakeFilesystem, root: Path) -> None:
+    """
+    Test ``get_affected_posts``.
+    """
+    fs.create_file(root / "posts/first/index.mkd")
+    fs.create_file(root / "posts/first/img/photo.jpg")
+    fs.create_file(root / "posts/first/nested/index.mkd")
+    fs.create_file(root / "posts/first/nested/song.mp3")
+    fs.create_file(root / "posts/drafts/notes.txt")
+
+    assert watch.get_affected_posts(root, []) == set()
+    assert watch.get_affected_posts(
+        root,
+        [
+            root / "posts/first/img/photo.jpg",
+            root / "posts/first/nested/song.mp3",
+            root / "posts/drafts/notes.txt",
+            root / "posts/deleted/index.mkd",
+            root / "templates/builders/html/post.html",
+        ],
+    ) == {
+        root / "posts/first/index.mkd",
+        root / "posts/first/nested/index.mkd",
+        root / "posts/deleted/index.mkd",
+    }
+
+
+@pytest.mark.asyncio
+async def test_run(  # pylint: disable=too-many-locals
+    mocker: MockerFixture,
+    fs: FakeFilesystem,
+    root: Path,
+    config: Config,
+    post: Post,
+) -> None:
+    """
+    Test ``run``.
+    """
+    builder = mocker.MagicMock()
+    builder.process_post = mocker.AsyncMock()
+    builder.process_site = mocker.AsyncMock()
+    get_builders = mocker.patch(
+        "nefelibata.cli.watch.get_builders",
+        return_value={"builder": builder},
+    )
+    DependencyGraph = mocker.patch("nefelibata.cli.watch.DependencyGraph")
+    _logger = mocker.patch("nefelibata.cli.watch._logger")
+
+    second = root / "posts/second/index.mkd"
+    changes = [
+        # a file was added to the post
+        {root / "posts/first/img/notes.txt"},
+        # a new post was created, without a date
+        {second, root / "notes.txt"},
+        # a template was modified
+        {root / "templates/builders/builder/post.html"},
+        # the configuration was modified
+        {root / "nefelibata.yaml"},
+        # a post was deleted, and the builder fails
+        {second},
+        asyncio.CancelledError(),
+    ]
+
+    async def wait() -> None:
+        change = changes.pop(0)
+        if change == {root / "posts/first/img/notes.txt"}:
+            fs.create_file(root / "posts/first/img/notes.txt")
+        elif change == {second, root / "notes.txt"}:
+            fs.create_file(second, contents="subject: Second\n\nHi!")
+        elif change == {second}:
+            # the new post was normalized
+            with open(second, encoding="utf-8") as input_:
+                assert "date: " in input_.read()
+            second.unlink()
+            builder.process_site.side_effect = Exception("Boom")
+        elif isinstance(change, BaseException):
+            raise change
+        return change
+
+    get_watcher = mocker.patch("nefelibata.cli.watch.get_watcher")
+    watcher = get_watcher.return_value
+    watcher.wait = wait
+
+    with pytest.raises(asyncio.CancelledError):
+        await watch.run(root, use_cache=False, interval=0.5)
+
+    get_watcher.assert_called_with(
+        [root / "posts", root / "templates", root / "nefelibata.yaml"],
+        0.5,
+    )
+    watcher.close.assert_called_with()
+    assert document_cache.directory is None
+    builder.render_cache.prune.assert_called_once_with()
+    assert (root / "build").exists()
+
+    posts = [call.args[0].title for call in builder.process_post.mock_calls]
+    assert posts == [
+        # initial build
+        "This is your first post",
+        # file added
+        "This is your first post",
+        # new post
+        "Second",
+        # template modified
+        "Second",
+        "This is your first post",
+        # configuration modified
+        "Second",
+        "This is your first post",
+    ]
+    assert builder.process_site.call_count == 6
+    builder.clear_template_paths.assert_called_with()
+    assert get_builders.call_count == 2
+    assert DependencyGraph.return_value.save.call_count == 5
+
+    _logger.info.assert_has_calls(
+        [
+            mocker.call("Building blog"),
+            mocker.call("Creating `build/` directory"),
+            mocker.call("Watching for changes"),
+            mocker.call("Rebuilding blog"),
+            mocker.call("Rebuilding blog"),
+            mocker.call("Templates modified, rebuilding posts"),
+            mocker.call("Rebuilding blog"),
+            mocker.call("Configuration modified, reloading"),
+            mocker.call("Rebuilding blog"),
+            mocker.call("Rebuilding blog"),
+        ],
+    )
+    _logger.exception.assert_called_with("Unable to rebuild blog")
+
+
+@pytest.mark.asyncio
+async def test_run_with_cache(
+    mocker: MockerFixture,
+    fs: FakeFilesystem,
+    root: Path,
+    config: Config,
+) -> None:
+    """
+    Test that the document cache is persisted.
+    """
+    fs.create_dir(root / "build")
+    mocker.patch("nefelibata.cli.watch.get_builders", return_value={})
+    get_watcher = mocker.patch("nefelibata.cli.watch.get_watcher")
+    get_watcher.return_value.wait = mocker.AsyncMock(
+        side_effect=asyncio.CancelledError(),
+    )
+
+    with pytest.raises(asyncio.CancelledError):
+        await watch.run(root)
+
+    assert document_cache.directory == root / ".cache/markdown"
@@ -10,9 +10,10 @@ import yaml
 from freezegun import freeze_time
 from pyfakefs.fake_filesystem import FakeFilesystem
 
+from nefelibata.builders.base import _environments
 from nefelibata.config import Config
 from nefelibata.constants import CONFIG_FILENAME
-from nefelibata.post import Post, build_post
+from nefelibata.post import Post, build_post, document_cache
 from nefelibata.utils import get_project_root
 
 from .fakes import CONFIG, POST_CONTENT
@@ -42,6 +43,25 @@ def make_entry_point() -> Type[MockEntryPoint]:
     return MockEntryPoint
 
 
+@pytest.fixture(autouse=True)
+def reset_document_cache() -> Iterator[None]:
+    """
+    Reset the cache of parsed Markdown between tests.
+    """
+    yield
+    document_cache.clear()
+    document_cache.directory = None
+
+
+@pytest.fixture(autouse=True)
+def reset_environments() -> Iterator[None]:
+    """
+    Reset the Jinja2 environments shared between builders.
+    """
+    yield
+    _environments.clear()
+
+
 @pytest.fixture
 def root(fs: FakeFilesystem) -> Iterator[Path]:
     """
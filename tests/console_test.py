@@ -26,6 +26,7 @@ async def test_main_init(mocker: MockerFixture) -> None:
             "new": False,
             "build": False,
             "publish": False,
+            "watch": False,
             "ROOT_DIR": "/path/to/blog",
             "--force": False,
         },
@@ -50,6 +51,7 @@ async def test_main_new(mocker: MockerFixture) -> None:
             "new": True,
             "build": False,
             "publish": False,
+            "watch": False,
             "ROOT_DIR": "/path/to/blog",
             "POST": "A like",
             "-t": "like",
@@ -76,12 +78,17 @@ async def test_main_build(mocker: MockerFixture) -> None:
             "new": False,
             "build": True,
             "publish": False,
+            "watch": False,
             "ROOT_DIR": "/path/to/blog",
             "--force": False,
+            "--no-cache": False,
+            "--jobs": "1",
         },
     )
     await console.main()
-    build.run.assert_called_with(Path("/path/to/blog"), False)
+    build.run.assert_called_with(
+        Path("/path/to/blog"), False, use_cache=True, workers=1
+    )
 
     mocker.patch(
         "nefelibata.console.docopt",
@@ -91,12 +98,17 @@ async def test_main_build(mocker: MockerFixture) -> None:
             "new": False,
             "build": True,
             "publish": False,
+            "watch": False,
             "ROOT_DIR": "/path/to/blog",
             "--force": True,
+            "--no-cache": True,
+            "--jobs": "4",
         },
     )
     await console.main()
-    build.run.assert_called_with(Path("/path/to/blog"), True)
+    build.run.assert_called_with(
+        Path("/path/to/blog"), True, use_cache=False, workers=4
+    )
 
     mocker.patch(
         "nefelibata.console.docopt",
@@ -106,8 +118,11 @@ async def test_main_build(mocker: MockerFixture) -> None:
             "new": False,
             "build": True,
             "publish": False,
+            "watch": False,
             "ROOT_DIR": None,
             "--force": True,
+            "--no-cache": False,
+            "--jobs": "1",
         },
     )
     mocker.patch(
@@ -115,7 +130,7 @@ async def test_main_build(mocker: MockerFixture) -> None:
         return_value=Path("/path/to/blog"),
     )
     await console.main()
-    build.run.assert_called_with(Path("/path/to/blog"), True)
+    build.run.assert_called_with(Path("/path/to/blog"), True, use_cache=True, workers=1)
 
 
 @pytest.mark.asyncio
@@ -134,14 +149,48 @@ async def test_main_publish(mocker: MockerFixture) -> None:
             "new": False,
             "build": False,
             "publish": True,
+            "watch": False,
             "ROOT_DIR": "/path/to/blog",
             "POST": "A like",
             "-t": "like",
             "--force": False,
+            "--no-cache": False,
+            "--jobs": "1",
+        },
+    )
+    await console.main()
+    publish.run.assert_called_with(
+        Path("/path/to/blog"), False, use_cache=True, workers=1
+    )
+
+
+@pytest.mark.asyncio
+async def test_main_watch(mocker: MockerFixture) -> None:
+    """
+    Test ``main`` with the "watch" action.
+    """
+    watch = mocker.patch("nefelibata.console.watch")
+    watch.run = mocker.AsyncMock()
+
+    mocker.patch(
+        "nefelibata.console.docopt",
+        return_value={
+            "--loglevel": "debug",
+            "init": False,
+            "new": False,
+            "build": False,
+            "publish": False,
+            "watch": True,
+            "ROOT_DIR": "/path/to/blog",
+            "POST": None,
+            "-t": "post",
+            "--force": False,
+            "--no-cache": True,
+            "--jobs": "2",
         },
     )
     await console.main()
-    publish.run.assert_called_with(Path("/path/to/blog"), False)
+    watch.run.assert_called_with(Path("/path/to/blog"), use_cache=False, workers=2)
 
 
 @pytest.mark.asyncio
@@ -157,6 +206,7 @@ async def test_main_no_action(mocker: MockerFixture) -> None:
             "new": False,
             "build": False,
             "publish": False,
+            "watch": False,
             "ROOT_DIR": "/path/to/blog",
             "--force": False,
         },
@@ -181,8 +231,11 @@ async def test_main_canceled(mocker: MockerFixture) -> None:
             "new": False,
             "build": True,
             "publish": False,
+            "watch": False,
             "ROOT_DIR": "/path/to/blog",
             "--force": False,
+            "--no-cache": False,
+            "--jobs": "1",
         },
     )
     await console.main()
@@ -0,0 +1,164 @@
+"""
+Tests for ``nefelibata.dependencies``.
+"""
+# pylint: disable=invalid-name
+
+from pathlib import Path
+
+from freezegun import freeze_time
+from pyfakefs.fake_filesystem import FakeFilesystem
+from pytest_mock import MockerFixture
+
+from nefelibata.config import Config
+from nefelibata.dependencies import (
+    DependencyGraph,
+    StatCache,
+    get_config_signatures,
+)
+
+
+def test_get_config_signatures(config: Config) -> None:
+    """
+    Test ``get_config_signatures``.
+    """
+    signatures = get_config_signatures(config)
+    assert "config:title" in signatures
+    assert "config:publishers" not in signatures
+
+    config.title = "A new title"
+    new_signatures = get_config_signatures(config)
+    assert new_signatures["config:title"] != signatures["config:title"]
+    assert new_signatures["config:author"] == signatures["config:author"]
+
+
+def test_dependency_graph(fs: FakeFilesystem, root: Path, config: Config) -> None:
+    """
+    Test tracking the inputs of an output.
+    """
+    with freeze_time("2021-01-01T00:00:00Z"):
+        fs.create_file(root / "posts/first/index.mkd", contents="subject: Hi")
+        fs.create_file(root / "templates/post.html", contents="{{ post.title }}")
+    inputs = [root / "posts/first/index.mkd", root / "templates/post.html"]
+    output = root / "build/first/index.html"
+
+    graph = DependencyGraph(root, config)
+    signatures = graph.get_signatures(inputs)
+    assert signatures[str(root / "posts/first/index.mkd")] == (
+        11,
+        1609459200000000000,
+    )
+    assert graph.get_signatures([root / "missing"])[str(root / "missing")] is None
+
+    last_modified = graph.stats.get_last_modified(inputs[:1])
+    assert last_modified == 1609459200.0
+
+    # outputs that don't exist are never up-to-date
+    assert not graph.is_up_to_date(output, signatures, last_modified)
+
+    # outputs that were never recorded are compared by modification time
+    with freeze_time("2021-01-02T00:00:00Z"):
+        fs.create_file(output)
+    assert graph.is_up_to_date(output, signatures, last_modified)
+
+    graph.record(output, signatures)
+    assert graph.modified
+    graph.save()
+    assert not graph.modified
+    assert [path.name for path in graph.path.parent.iterdir()] == [graph.path.name]
+
+    # recording the same signatures again is a no-op
+    graph.record(output, signatures)
+    assert not graph.modified
+
+    # load from disk, and modify an input
+    graph = DependencyGraph(root, config)
+    assert graph.is_up_to_date(output, signatures, last_modified)
+    with freeze_time("2021-01-01T12:00:00Z"):
+        with open(root / "templates/post.html", "w", encoding="utf-8") as output_:
+            output_.write("{{ post.content }}")
+    assert not graph.is_up_to_date(output, graph.get_signatures(inputs), last_modified)
+
+    # a change in the configuration also affects the output
+    config.title = "A new title"
+    graph = DependencyGraph(root, config)
+    signatures = graph.get_signatures(inputs)
+    assert not graph.is_up_to_date(output, signatures, last_modified)
+
+
+def test_dependency_graph_disabled(root: Path, config: Config) -> None:
+    """
+    Test that a disabled graph is never persisted.
+    """
+    graph = DependencyGraph(root, config, enabled=False)
+    graph.record(root / "build/index.html", {})
+    graph.save()
+
+    assert not (root / ".cache/dependencies.pickle").exists()
+
+
+def test_dependency_graph_invalid(
+    mocker: MockerFixture,
+    fs: FakeFilesystem,
+    root: Path,
+    config: Config,
+) -> None:
+    """
+    Test that an invalid or outdated graph is ignored.
+    """
+    _logger = mocker.patch("nefelibata.dependencies._logger")
+    fs.create_file(root / ".cache/dependencies.pickle", contents="invalid")
+
+    graph = DependencyGraph(root, config)
+    assert graph.entries == {}
+    _logger.warning.assert_called_with(
+        "Invalid dependency graph: %s",
+        Path("/path/to/blog/.cache/dependencies.pickle"),
+    )
+
+    graph.record(root / "build/index.html", {})
+    graph.save()
+    mocker.patch("nefelibata.dependencies.__version__", "0.0.0")
+    assert DependencyGraph(root, config).entries == {}
+
+
+def test_stat_cache(fs: FakeFilesystem, root: Path) -> None:
+    """
+    Test ``StatCache``.
+    """
+    with freeze_time("2021-01-01T00:00:00Z"):
+        fs.create_file(root / "posts/first/index.mkd", contents="subject: Hi")
+    with freeze_time("2021-01-02T00:00:00Z"):
+        fs.create_file(root / "posts/first/photo.jpg")
+
+    stats = StatCache()
+    directory = stats.scan(root / "posts/first")
+    assert stats.scan(root / "posts/first") is directory
+    assert set(stats.entries) == {
+        root / "posts/first/index.mkd",
+        root / "posts/first/photo.jpg",
+    }
+
+    assert stats.stat(root / "missing") is None
+    assert stats.get_last_modified([root / "missing"]) == 0.0
+    assert (
+        stats.get_last_modified(
+            [root / "posts/first/index.mkd", root / "posts/first/photo.jpg"],
+        )
+        == 1609545600.0
+    )
+
+    # stats are reused until the cache is cleared
+    with freeze_time("2021-01-03T00:00:00Z"):
+        (root / "posts/first/index.mkd").write_text("subject: Hello")
+    assert stats.stat(root / "posts/first/index.mkd").st_size == 11
+    stats.clear()
+    assert stats.stat(root / "posts/first/index.mkd").st_size == 14
+    assert stats.directories == {}
+
+    # directories can be invalidated when their files are modified
+    stats.invalidate(root / "posts/first")
+    stats.scan(root / "posts/first")
+    fs.create_file(root / "posts/first/interactions.yaml")
+    stats.invalidate(root / "posts/first")
+    assert not stats.entries
+    assert len(stats.scan(root / "posts/first").files) == 3
@@ -57,9 +57,14 @@ def test_get_enclosures(mocker: MockerFixture, fs: FakeFilesystem, root: Path) -
     fs.create_file(root / "posts/first/test.txt")
 
     enclosures = get_enclosures(root, path.parent)
-    assert len(enclosures) == 4
+    assert [enclosure.path.name for enclosure in enclosures] == [
+        "bundle.zip",
+        "logo.png",
+        "photo.jpg",
+        "song.mp3",
+    ]
 
-    assert enclosures[0].dict() == {
+    assert enclosures[3].dict() == {
         "path": Path("/path/to/blog/posts/first/song.mp3"),
         "description": '"A title" (2m3s) by An artist (An album, 2021)',
         "type": "audio/mpeg",
@@ -73,7 +78,7 @@ def test_get_enclosures(mocker: MockerFixture, fs: FakeFilesystem, root: Path) -
         "track": 0,
     }
 
-    assert enclosures[1].dict() == {
+    assert enclosures[2].dict() == {
         "description": "This is a nice photo",
         "href": "first/photo.jpg",
         "length": 0,
@@ -81,7 +86,7 @@ def test_get_enclosures(mocker: MockerFixture, fs: FakeFilesystem, root: Path) -
         "type": "image/jpeg",
     }
 
-    assert enclosures[2].dict() == {
+    assert enclosures[1].dict() == {
         "description": "Image logo.png",
         "href": "first/logo.png",
         "length": 0,
@@ -89,7 +94,7 @@ def test_get_enclosures(mocker: MockerFixture, fs: FakeFilesystem, root: Path) -
         "type": "image/png",
     }
 
-    assert enclosures[3].dict() == {
+    assert enclosures[0].dict() == {
         "path": Path("/path/to/blog/posts/first/bundle.zip"),
         "description": "bundle.zip",
         "type": "application/zip",
@@ -0,0 +1,292 @@
+"""
+Tests for ``nefelibata.governor``.
+"""
+# pylint: disable=protected-access
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+from typing import List, Optional
+
+import pytest
+from pytest_mock import MockerFixture
+
+from nefelibata.config import ConcurrencyModel, HostModel
+from nefelibata.governor import Governor, TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_token_bucket(mocker: MockerFixture) -> None:
+    """
+    Test ``TokenBucket``.
+    """
+    now = [0.0]
+    mocker.patch("nefelibata.governor.time.monotonic", side_effect=lambda: now[0])
+    sleeps: List[float] = []
+
+    async def sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    mocker.patch("nefelibata.governor.asyncio.sleep", sleep)
+
+    bucket = TokenBucket(rate=2, burst=2)
+
+    # a burst doesn't wait
+    await bucket.acquire()
+    await bucket.acquire()
+    assert not sleeps
+
+    await bucket.acquire()
+    assert sleeps == [0.5]
+
+    # tokens are added over time, up to the burst
+    now[0] += 10
+    await bucket.acquire()
+    await bucket.acquire()
+    assert sleeps == [0.5]
+    assert bucket.tokens == 0
+
+
+@pytest.mark.asyncio
+async def test_governor_run() -> None:
+    """
+    Test that plugin tasks are limited.
+    """
+    governor = Governor(ConcurrencyModel(tasks=2, plugins={"mastodon": 1}))
+
+    running = {"mastodon": 0, "webmention": 0}
+    maximum = {"mastodon": 0, "webmention": 0}
+
+    async def task(name: str) -> str:
+        running[name] += 1
+        maximum[name] = max(maximum[name], running[name])
+        assert sum(running.values()) <= 2
+        await asyncio.sleep(0)
+        running[name] -= 1
+        return name
+
+    results = await asyncio.gather(
+        *[governor.run("mastodon", task("mastodon")) for _ in range(3)],
+        *[governor.run("webmention", task("webmention")) for _ in range(3)],
+    )
+    assert results == ["mastodon"] * 3 + ["webmention"] * 3
+    assert maximum == {"mastodon": 1, "webmention": 2}
+
+
+@pytest.mark.asyncio
+async def test_governor_unlimited() -> None:
+    """
+    Test that there are no limits by default.
+    """
+    governor = Governor()
+
+    async def task() -> None:
+        await asyncio.sleep(0)
+
+    await asyncio.gather(*[governor.run("plugin", task()) for _ in range(10)])
+    async with governor.host("https://example.com/"):
+        pass
+
+    assert not governor._semaphores
+    assert not governor._buckets
+
+
+def test_get_host_limits() -> None:
+    """
+    Test ``get_host_limits``.
+    """
+    governor = Governor(
+        ConcurrencyModel(
+            hosts={
+                "webmention.io": HostModel(connections=2),
+                "*": HostModel(connections=4, rate=1),
+            },
+        ),
+    )
+    assert governor.get_host_limits("webmention.io") == HostModel(connections=2)
+    assert governor.get_host_limits("example.com") == HostModel(
+        connections=4,
+        rate=1,
+    )
+
+    governor = Governor(ConcurrencyModel())
+    assert governor.get_host_limits("example.com") == HostModel()
+
+
+@pytest.mark.asyncio
+async def test_governor_host(mocker: MockerFixture) -> None:
+    """
+    Test that requests to a host are limited.
+    """
+    governor = Governor(
+        ConcurrencyModel(
+            hosts={"example.com": HostModel(connections=1, rate=100, burst=3)}
+        ),
+    )
+    acquire = mocker.spy(TokenBucket, "acquire")
+
+    running = 0
+    maximum = 0
+
+    async def request(url: str) -> None:
+        nonlocal running, maximum
+        async with governor.host(url):
+            running += 1
+            maximum = max(maximum, running)
+            await asyncio.sleep(0)
+            running -= 1
+
+    await asyncio.gather(
+        request("https://example.com/one"),
+        request("https://example.com/two"),
+    )
+    assert maximum == 1
+
+    # other hosts are not limited
+    await asyncio.gather(
+        request("https://example.org/"),
+        request("https://example.com/three"),
+    )
+    assert maximum == 2
+    assert acquire.call_count == 3
+    assert set(governor._buckets) == {"example.com"}
+
+
+@pytest.mark.asyncio
+async def test_governor_host_cancelled(mocker: MockerFixture) -> None:
+    """
+    Test that the connection is released if waiting for a token is cancelled.
+    """
+    governor = Governor(
+        ConcurrencyModel(hosts={"*": HostModel(connections=1, rate=1)}),
+    )
+    mocker.patch.object(
+        TokenBucket,
+        "acquire",
+        side_effect=asyncio.CancelledError(),
+    )
+
+    with pytest.raises(asyncio.CancelledError):
+        async with governor.host("https://example.com/"):
+            pass
+    assert not governor._semaphores["host:example.com"].locked()
+
+    # rate limits without connection limits
+    governor = Governor(ConcurrencyModel(hosts={"*": HostModel(rate=1)}))
+    with pytest.raises(asyncio.CancelledError):
+        async with governor.host("https://example.com/"):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_governor_trace_config() -> None:
+    """
+    Test the limits applied to aiohttp sessions.
+    """
+    governor = Governor(
+        ConcurrencyModel(hosts={"example.com": HostModel(connections=1)}),
+    )
+    assert len(governor.trace_configs) == 1
+
+    context = SimpleNamespace()
+    params = SimpleNamespace(url="https://example.com/")
+    await governor._on_request_start(None, context, params)  # type: ignore
+    semaphore = governor._semaphores["host:example.com"]
+    assert semaphore.locked()
+    await governor._on_request_end(None, context, params)  # type: ignore
+    assert not semaphore.locked()
+
+    # requests that failed before starting don't release anything
+    await governor._on_request_end(None, SimpleNamespace(), params)  # type: ignore
+    assert not semaphore.locked()
+
+    # unlimited hosts
+    context = SimpleNamespace()
+    params = SimpleNamespace(url="https://example.org/")
+    await governor._on_request_start(None, context, params)  # type: ignore
+    assert context.semaphore is None
+    await governor._on_request_end(None, context, params)  # type: ignore
+
+
+@pytest.mark.asyncio
+async def test_governor_session() -> None:
+    """
+    Test the shared HTTP session.
+    """
+    governor = Governor()
+
+    # nothing to close
+    await governor.close()
+
+    session = governor.get_session()
+    assert governor.get_session() is session
+    assert session.timeout.total == 300
+    assert session.trace_configs == governor.trace_configs
+
+    await governor.close()
+    assert session.closed
+
+    # a new session is created after closing
+    other = governor.get_session()
+    assert other is not session
+    await other.close()
+    assert governor.get_session() is not other
+    await governor.close()
+
+
+@pytest.mark.asyncio
+async def test_governor_run_in_executor() -> None:
+    """
+    Test running blocking functions in threads.
+    """
+    governor = Governor(ConcurrencyModel(threads=2))
+
+    def function(value: int, increment: int = 1) -> str:
+        return f"{threading.current_thread().name}: {value + increment}"
+
+    result = await governor.run_in_executor(function, 1, increment=2)
+    assert result.startswith("nefelibata")
+    assert result.endswith(": 3")
+    assert governor._executor._max_workers == 2  # type: ignore
+
+    await governor.close()
+    assert governor._executor is None
+
+
+@pytest.mark.asyncio
+async def test_governor_run_in_executor_limits() -> None:
+    """
+    Test that blocking calls from a plugin are limited by the plugin limit.
+    """
+    governor = Governor(ConcurrencyModel(plugins={"s3": 2, "ftp": 1}))
+
+    lock = threading.Lock()
+    running = {"s3": 0, "ftp": 0, None: 0}
+    maximum = {"s3": 0, "ftp": 0, None: 0}
+
+    def upload(name: Optional[str]) -> None:
+        with lock:
+            running[name] += 1
+            maximum[name] = max(maximum[name], running[name])
+        time.sleep(0.01)
+        with lock:
+            running[name] -= 1
+
+    async def publish(name: str) -> None:
+        await asyncio.gather(
+            *[governor.run_in_executor(upload, name) for _ in range(6)],
+        )
+
+    # a plugin with a single task slot can still make blocking calls
+    await asyncio.gather(
+        governor.run("s3", publish("s3")),
+        governor.run("ftp", publish("ftp")),
+        *[governor.run_in_executor(upload, None) for _ in range(4)],
+    )
+    assert maximum["s3"] == 2
+    assert maximum["ftp"] == 1
+    assert maximum[None] > 1
+
+    await governor.close()
@@ -0,0 +1,83 @@
+"""
+Tests for ``nefelibata.inventory``.
+"""
+
+from pathlib import Path
+
+from freezegun import freeze_time
+from pyfakefs.fake_filesystem import FakeFilesystem
+
+from nefelibata.inventory import get_inventory, scan_post_directory
+
+
+def test_get_inventory(fs: FakeFilesystem, root: Path) -> None:
+    """
+    Test ``get_inventory``.
+    """
+    fs.create_file(root / "posts/first/index.mkd")
+    fs.create_file(root / "posts/first/reading_time.yaml")
+    fs.create_file(root / "posts/first/img/photo.jpg")
+    fs.create_file(root / "posts/first/img/metadata.yaml")
+    fs.create_file(root / "posts/first/nested/index.mkd")
+    fs.create_file(root / "posts/first/nested/song.mp3")
+    fs.create_file(root / "posts/drafts/notes.txt")
+    fs.create_file(root / "posts/2021/second/index.mkd")
+    fs.create_symlink(root / "posts/first/loop", root / "posts/first")
+
+    inventory = get_inventory(root / "posts")
+    assert list(inventory) == [
+        root / "posts/2021/second",
+        root / "posts/first",
+        root / "posts/first/nested",
+    ]
+
+    directory = inventory[root / "posts/first"]
+    assert directory.posts == [root / "posts/first/index.mkd"]
+    assert [path for path, _ in directory.files] == [
+        root / "posts/first/index.mkd",
+        root / "posts/first/reading_time.yaml",
+        root / "posts/first/img/metadata.yaml",
+        root / "posts/first/img/photo.jpg",
+    ]
+    assert directory.sidecars == [root / "posts/first/reading_time.yaml"]
+
+    # files are assigned to the nearest post directory
+    directory = inventory[root / "posts/first/nested"]
+    assert directory.posts == [root / "posts/first/nested/index.mkd"]
+    assert [path for path, _ in directory.files] == [
+        root / "posts/first/nested/index.mkd",
+        root / "posts/first/nested/song.mp3",
+    ]
+
+    assert get_inventory(root / "invalid") == {}
+
+
+def test_fingerprint(fs: FakeFilesystem, root: Path) -> None:
+    """
+    Test the fingerprint of a post directory.
+    """
+    with freeze_time("2021-01-01T00:00:00Z"):
+        fs.create_file(root / "posts/first/index.mkd", contents="subject: Hi")
+        fs.create_file(root / "posts/first/reading_time.yaml", contents="words: 1")
+
+    fingerprint = scan_post_directory(root / "posts/first").fingerprint
+    assert [entry[:3] for entry in fingerprint] == [
+        ("index.mkd", 11, 1609459200000000000),
+        ("reading_time.yaml", 8, 1609459200000000000),
+    ]
+
+    fs.create_file(root / "posts/first/img/photo.jpg", contents="JPEG")
+    assert scan_post_directory(root / "posts/first").fingerprint != fingerprint
+
+
+def test_scan_post_directory(fs: FakeFilesystem, root: Path) -> None:
+    """
+    Test ``scan_post_directory``.
+    """
+    fs.create_file(root / "posts/first/photo.jpg")
+    fs.create_file(root / "posts/first/nested/index.mkd")
+
+    # the directory is scanned even if it has no posts
+    directory = scan_post_directory(root / "posts/first")
+    assert directory.posts == []
+    assert [path for path, _ in directory.files] == [root / "posts/first/photo.jpg"]
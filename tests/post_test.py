@@ -3,17 +3,34 @@ Tests for ``nefelibata.post``.
 """
 # pylint: disable=invalid-name, unused-argument
 
+import asyncio
+import pickle
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from email.utils import formatdate
 from pathlib import Path
 
+import marko
 import pytest
+import yaml
 from freezegun import freeze_time
 from pyfakefs.fake_filesystem import FakeFilesystem
+from pytest_mock import MockerFixture
 from yarl import URL
 
 from nefelibata.config import AnnouncerModel, Config
-from nefelibata.post import Post, build_post, extract_links, get_posts
+from nefelibata.post import (
+    LazyPost,
+    Post,
+    build_lazy_post,
+    build_post,
+    extract_links,
+    get_posts,
+    normalize_post,
+    parse_markdown,
+    read_headers,
+)
+from nefelibata.utils import load_extra_metadata
 
 from .fakes import POST_CONTENT, POST_DATA
 
@@ -56,7 +73,6 @@ async def test_build_post(fs: FakeFilesystem, root: Path, config: Config) -> Non
     # create post
     with freeze_time("2021-01-01T00:00:00Z"):
         fs.create_file(path, contents=POST_CONTENT)
-        local_date = formatdate(1609459200.0, localtime=True)
 
     config.announcers = {"antenna": AnnouncerModel(plugin="antenna")}
 
@@ -83,7 +99,31 @@ Read more about [Nefelibata](https://nefelibata.readthedocs.io/)."""
     )
     assert post.announcers == {"antenna"}
 
-    # check to file was updated with the ``date`` header
+    # check that the file was not modified
+    with open(path, encoding="utf-8") as input_:
+        assert input_.read() == POST_CONTENT
+
+
+def test_normalize_post(fs: FakeFilesystem, root: Path, config: Config) -> None:
+    """
+    Test ``normalize_post``.
+    """
+    path = Path(root / "posts/first/index.mkd")
+
+    # create post
+    with freeze_time("2021-01-01T00:00:00Z"):
+        fs.create_file(path, contents=POST_CONTENT)
+        local_date = formatdate(1609459200.0, localtime=True)
+    last_update = path.stat().st_mtime
+
+    config.announcers = {
+        "antenna": AnnouncerModel(plugin="antenna"),
+        "archive": AnnouncerModel(plugin="archive"),
+    }
+
+    assert normalize_post(root, config, path)
+
+    # check the file was updated with the missing headers
     with open(path, encoding="utf-8") as input_:
         content = input_.read()
     assert (
@@ -92,7 +132,7 @@ Read more about [Nefelibata](https://nefelibata.readthedocs.io/)."""
 keywords: welcome, blog
 summary: Hello, world!
 date: {local_date}
-announce-on: antenna
+announce-on: antenna, archive
 
 # Welcome #
 
@@ -100,12 +140,17 @@ This is your first post. It should be written using Markdown.
 
 Read more about [Nefelibata](https://nefelibata.readthedocs.io/)."""
     )
+    assert path.stat().st_mtime == last_update
 
-    # build again, and test that the file wasn't modified since it
+    # normalize again, and test that the file wasn't modified since it
     # already has all the required headers
-    last_update = path.stat().st_mtime
-    build_post(root, config, path)
-    assert path.stat().st_mtime == last_update
+    assert not normalize_post(root, config, path)
+    with open(path, encoding="utf-8") as input_:
+        assert input_.read() == content
+
+    post = build_post(root, config, path)
+    assert post.timestamp == datetime(2021, 1, 1, 0, 0, tzinfo=timezone.utc)
+    assert post.announcers == {"antenna", "archive"}
 
 
 @pytest.mark.asyncio
@@ -130,6 +175,279 @@ async def test_get_posts(fs: FakeFilesystem, root: Path, config: Config) -> None
     assert len(posts) == 1
 
 
+@pytest.mark.asyncio
+async def test_get_posts_count(
+    mocker: MockerFixture,
+    fs: FakeFilesystem,
+    root: Path,
+    config: Config,
+) -> None:
+    """
+    Test that ``get_posts`` only builds the most recent posts.
+    """
+    with freeze_time("2021-01-01T00:00:00Z"):
+        fs.create_file(root / "posts/one/index.mkd")
+    fs.create_file(
+        root / "posts/two/index.mkd",
+        contents="subject: Two\ndate: Sat, 02 Jan 2021 00:00:00 +0000\n\n",
+    )
+    with freeze_time("2021-01-03T00:00:00Z"):
+        fs.create_file(root / "posts/three/index.mkd")
+
+    build_post_ = mocker.patch(
+        "nefelibata.post.build_post",
+        side_effect=build_post,
+    )
+
+    posts = get_posts(root, config, 2, use_cache=False)
+    assert [post.path.parent.name for post in posts] == ["three", "two"]
+    assert build_post_.call_count == 2
+
+    # cached posts use their stored timestamp
+    get_posts(root, config)
+    build_post_.reset_mock()
+    with freeze_time("2021-01-04T00:00:00Z"):
+        fs.create_file(root / "posts/four/index.mkd")
+
+    posts = get_posts(root, config, 2)
+    assert [post.path.parent.name for post in posts] == ["four", "three"]
+    build_post_.assert_called_once_with(
+        root,
+        config,
+        root / "posts/four/index.mkd",
+        mocker.ANY,
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_posts_cache(
+    mocker: MockerFixture,
+    fs: FakeFilesystem,
+    root: Path,
+    config: Config,
+) -> None:
+    """
+    Test that ``get_posts`` only builds modified posts.
+    """
+    with freeze_time("2021-01-01T00:00:00Z"):
+        fs.create_file(root / "posts/one/index.mkd")
+        fs.create_file(root / "posts/two/index.mkd")
+
+    build_post_ = mocker.patch(
+        "nefelibata.post.build_post",
+        side_effect=build_post,
+    )
+    _logger = mocker.patch("nefelibata.post._logger")
+
+    get_posts(root, config)
+    assert build_post_.call_count == 2
+    _logger.info.assert_called_with("Post cache: %d hits, %d misses", 0, 2)
+
+    build_post_.reset_mock()
+    posts = get_posts(root, config)
+    build_post_.assert_not_called()
+    _logger.info.assert_called_with("Post cache: %d hits, %d misses", 2, 0)
+    assert {post.path for post in posts} == {
+        root / "posts/one/index.mkd",
+        root / "posts/two/index.mkd",
+    }
+
+    # adding a sidecar file invalidates the post
+    with freeze_time("2021-01-02T00:00:00Z"):
+        fs.create_file(root / "posts/one/reading_time.yaml", contents="words: 10")
+    build_post_.reset_mock()
+    posts = get_posts(root, config)
+    build_post_.assert_called_once_with(
+        root,
+        config,
+        root / "posts/one/index.mkd",
+        mocker.ANY,
+    )
+    post = next(post for post in posts if post.path.parent.name == "one")
+    assert post.metadata["reading_time"] == {"words": 10}
+
+    # bypass the cache
+    build_post_.reset_mock()
+    get_posts(root, config, use_cache=False)
+    assert build_post_.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_get_posts_parallel(
+    mocker: MockerFixture,
+    fs: FakeFilesystem,
+    root: Path,
+    config: Config,
+) -> None:
+    """
+    Test building posts with multiple workers.
+    """
+    # worker processes can't see the fake filesystem, so use threads instead
+    ProcessPoolExecutor = mocker.patch(
+        "nefelibata.post.ProcessPoolExecutor",
+        side_effect=ThreadPoolExecutor,
+    )
+
+    for i in range(10):
+        with freeze_time(f"2021-01-{i + 1:02d}T00:00:00Z"):
+            fs.create_file(root / f"posts/{i}/index.mkd")
+    # two posts with the same timestamp
+    with freeze_time("2021-01-01T00:00:00Z"):
+        fs.create_file(root / "posts/10/index.mkd")
+
+    serial = get_posts(root, config, use_cache=False)
+    ProcessPoolExecutor.assert_not_called()
+
+    parallel = get_posts(root, config, use_cache=False, workers=2)
+    ProcessPoolExecutor.assert_called_with(max_workers=2)
+    assert [post.path for post in parallel] == [post.path for post in serial]
+
+    # cached posts are not sent to workers
+    get_posts(root, config)
+    ProcessPoolExecutor.reset_mock()
+    get_posts(root, config, workers=2)
+    ProcessPoolExecutor.assert_not_called()
+
+
+def test_read_headers(fs: FakeFilesystem, root: Path) -> None:
+    """
+    Test ``read_headers``.
+    """
+    path = root / "posts/first/index.mkd"
+    fs.create_file(
+        path,
+        contents="""subject: A long
+  title
+keywords: a, b
+
+note: this is not a header
+""",
+    )
+    headers = read_headers(path)
+    assert dict(headers) == {"subject": "A long\n  title", "keywords": "a, b"}
+
+    # the body starts at the first line that is not a header
+    fs.create_file(root / "posts/second/index.mkd", contents=POST_CONTENT)
+    headers = read_headers(root / "posts/second/index.mkd")
+    assert list(headers.keys()) == ["subject", "keywords", "summary"]
+
+    # a post without a body
+    fs.create_file(root / "posts/third/index.mkd", contents="subject: Empty")
+    headers = read_headers(root / "posts/third/index.mkd")
+    assert dict(headers) == {"subject": "Empty"}
+
+
+@pytest.mark.asyncio
+async def test_build_lazy_post(fs: FakeFilesystem, root: Path, config: Config) -> None:
+    """
+    Test ``build_lazy_post``.
+    """
+    path = Path(root / "posts/first/index.mkd")
+    with freeze_time("2021-01-01T00:00:00Z"):
+        fs.create_file(path, contents=POST_CONTENT)
+        fs.create_file(root / "posts/first/reading_time.yaml", contents="words: 10")
+        fs.create_file(root / "posts/first/photo.png")
+
+    post = build_lazy_post(root, config, path)
+    assert isinstance(post, LazyPost)
+    assert post.title == "This is your first post"
+    assert post.timestamp == datetime(2021, 1, 1, 0, 0, tzinfo=timezone.utc)
+    assert post.tags == {"welcome", "blog"}
+    assert post.categories == {"stem"}
+    assert post.url == "first/index"
+
+    # nothing else is loaded until needed
+    assert set(post.__dict__) == {
+        "path",
+        "title",
+        "timestamp",
+        "tags",
+        "categories",
+        "announcers",
+        "type",
+        "url",
+    }
+    assert post.metadata == {
+        "keywords": "welcome, blog",
+        "summary": "Hello, world!",
+        "reading_time": {"words": 10},
+    }
+    assert (
+        post.content
+        == """# Welcome #
+
+This is your first post. It should be written using Markdown.
+
+Read more about [Nefelibata](https://nefelibata.readthedocs.io/)."""
+    )
+    assert [enclosure.path for enclosure in post.enclosures] == [
+        root / "posts/first/photo.png",
+    ]
+
+    with pytest.raises(AttributeError) as excinfo:
+        post.invalid  # pylint: disable=pointless-statement
+    assert str(excinfo.value) == "invalid"
+
+    # the post file is never modified
+    assert "date" not in read_headers(path)
+
+    # the post should be identical to a regular post
+    assert post == build_post(root, config, path)
+
+    posts = get_posts(root, config, use_cache=False, lazy=True)
+    assert isinstance(posts[0], LazyPost)
+
+
+def test_post_pickle(post: Post) -> None:
+    """
+    Test that posts can be pickled, even though they have a lock.
+    """
+    state = post.__getstate__()
+    assert "_lock" not in state["__private_attribute_values__"]
+
+    unpickled = pickle.loads(pickle.dumps(post))
+    assert unpickled == post
+    assert isinstance(unpickled._lock, asyncio.Lock)  # pylint: disable=protected-access
+    assert unpickled._lock is not post._lock  # pylint: disable=protected-access
+
+
+def test_lazy_post_serialization(
+    fs: FakeFilesystem,
+    root: Path,
+    config: Config,
+) -> None:
+    """
+    Test that lazy posts are loaded completely before being exported or pickled.
+    """
+    path = Path(root / "posts/first/index.mkd")
+    fs.create_file(path, contents=POST_CONTENT)
+    post = build_post(root, config, path)
+
+    assert build_lazy_post(root, config, path).dict() == post.dict()
+
+    lazy_post = build_lazy_post(root, config, path)
+    unpickled = pickle.loads(pickle.dumps(lazy_post))
+    assert "content" in unpickled.__dict__
+    assert unpickled == post
+
+
+def test_get_posts_lazy(fs: FakeFilesystem, root: Path, config: Config) -> None:
+    """
+    Test that lazy posts are not stored in the post cache.
+    """
+    fs.create_file(root / "posts/first/index.mkd", contents=POST_CONTENT)
+
+    posts = get_posts(root, config, lazy=True)
+    assert isinstance(posts[0], LazyPost)
+    assert not (root / ".cache/posts.pickle").exists()
+
+    # eager posts are stored, and reused by lazy callers
+    posts = get_posts(root, config)
+    assert (root / ".cache/posts.pickle").exists()
+    posts = get_posts(root, config, lazy=True)
+    assert not isinstance(posts[0], LazyPost)
+
+
 def test_extract_links(post: Post) -> None:
     """
     Test ``extract_links``.
@@ -141,3 +459,43 @@ def test_extract_links(post: Post) -> None:
         URL("https://example.com/"),
         URL("https://nefelibata.readthedocs.io/"),
     ]
+
+
+def test_extract_links_lazy_metadata(
+    mocker: MockerFixture,
+    fs: FakeFilesystem,
+    post: Post,
+) -> None:
+    """
+    Test that ``extract_links`` only parses YAML files that could have links.
+    """
+    fs.create_file(post.path.parent / "weather.yaml", contents="temperature: 20")
+    fs.create_file(post.path.parent / "broken-url.yaml", contents="{[")
+    fs.create_file(
+        post.path.parent / "image-url.yaml",
+        contents="https://example.com/image.png",
+    )
+    post.metadata = load_extra_metadata(post.path.parent, data=post.metadata)
+    load = mocker.patch("nefelibata.utils.yaml.load", wraps=yaml.load)
+
+    assert list(extract_links(post)) == [
+        URL("https://example.com/image.png"),
+        URL("https://nefelibata.readthedocs.io/"),
+    ]
+    assert load.call_count == 2
+
+
+def test_parse_markdown(mocker: MockerFixture, post: Post) -> None:
+    """
+    Test that Markdown documents are parsed only once.
+    """
+    Markdown = mocker.patch("nefelibata.post.marko.Markdown", wraps=marko.Markdown)
+
+    document = post.document
+    assert isinstance(document, marko.block.Document)
+    assert post.document is document
+    assert parse_markdown(post.content) is document
+    Markdown.assert_called_once()
+
+    # documents are keyed by content
+    assert parse_markdown("# Hello") is not document
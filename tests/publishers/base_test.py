@@ -2,6 +2,7 @@
 Tests for ``nefelibata.publishers.base``.
 """
 # pylint: disable=invalid-name
+import os
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional, Type
@@ -11,6 +12,7 @@ from pyfakefs.fake_filesystem import FakeFilesystem
 from pytest_mock import MockerFixture
 
 from nefelibata.config import BuilderModel, Config, PublisherModel
+from nefelibata.dependencies import DependencyGraph
 from nefelibata.publishers.base import Publisher, get_publishers
 
 from ..conftest import MockEntryPoint
@@ -92,3 +94,23 @@ def test_find_modified_files(
         Path("/path/to/blog/build/generic/one"),
         Path("/path/to/blog/build/generic/subdir/two"),
     ]
+
+    # symlinks have their own modification time, while hardlinks keep the one
+    # from their source, so the time when they were linked is recorded instead
+    with freeze_time("2021-01-03T00:00:00Z"):
+        os.link(root / "build/generic/one", root / "build/generic/three")
+        (root / "build/generic/four").symlink_to(root / "build/generic/one")
+        graph = DependencyGraph(root, config)
+        graph.record_materialized(root / "build/generic/three")
+        graph.save()
+    modified_files = list(publisher.find_modified_files(force=False, since=since))
+    assert sorted(modified_files) == [
+        Path("/path/to/blog/build/generic/four"),
+        Path("/path/to/blog/build/generic/three"),
+    ]
+
+    # status changes, like permissions, are not modifications
+    since = datetime(2021, 1, 3, 12, 0, 0, tzinfo=timezone.utc)
+    with freeze_time("2021-01-04T00:00:00Z"):
+        (root / "build/generic/one").chmod(0o600)
+    assert not list(publisher.find_modified_files(force=False, since=since))
@@ -75,6 +75,7 @@ async def test_publish(
                 ExtraArgs={"ACL": "public-read"},
             ),
         ],
+        any_order=True,
     )
 
 
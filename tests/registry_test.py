@@ -0,0 +1,86 @@
+"""
+Tests for ``nefelibata.registry``.
+"""
+
+from pathlib import Path
+
+from pytest_mock import MockerFixture
+
+from nefelibata.announcers.base import Scope
+from nefelibata.config import Config
+from nefelibata.registry import PluginRegistry
+
+
+def test_registry(mocker: MockerFixture, root: Path, config: Config) -> None:
+    """
+    Test that plugins are built once, and shared between scopes.
+    """
+    post_plugin = mocker.MagicMock()
+    post_plugin.scopes = [Scope.POST]
+    site_plugin = mocker.MagicMock()
+    site_plugin.scopes = [Scope.SITE]
+    both_plugin = mocker.MagicMock()
+    both_plugin.scopes = [Scope.POST, Scope.SITE]
+    plugins = {"post": post_plugin, "site": site_plugin, "both": both_plugin}
+
+    get_builders = mocker.patch(
+        "nefelibata.registry.get_builders",
+        return_value={"builder": mocker.MagicMock()},
+    )
+    get_announcers = mocker.patch(
+        "nefelibata.registry.get_announcers",
+        return_value=plugins,
+    )
+    get_assistants = mocker.patch(
+        "nefelibata.registry.get_assistants",
+        return_value=plugins,
+    )
+    get_publishers = mocker.patch(
+        "nefelibata.registry.get_publishers",
+        return_value={"builder => publisher": mocker.MagicMock()},
+    )
+
+    repository = mocker.MagicMock()
+    graph = mocker.MagicMock()
+    executor = mocker.MagicMock()
+    governor = mocker.MagicMock()
+    registry = PluginRegistry(root, config, repository, graph, executor, governor)
+
+    assert registry.get_announcers(Scope.SITE) == {
+        "site": site_plugin,
+        "both": both_plugin,
+    }
+    assert registry.get_announcers(Scope.POST) == {
+        "post": post_plugin,
+        "both": both_plugin,
+    }
+    assert registry.get_announcers() == plugins
+    get_announcers.assert_called_once_with(
+        root,
+        config,
+        repository=repository,
+        governor=governor,
+        builders=get_builders.return_value,
+    )
+
+    assert registry.get_assistants(Scope.SITE) == {
+        "site": site_plugin,
+        "both": both_plugin,
+    }
+    assert registry.get_assistants(Scope.POST) == {
+        "post": post_plugin,
+        "both": both_plugin,
+    }
+    get_assistants.assert_called_once_with(
+        root,
+        config,
+        repository=repository,
+        governor=governor,
+    )
+
+    assert registry.builders is get_builders.return_value
+    get_builders.assert_called_once_with(root, config, repository, graph, executor)
+
+    assert registry.publishers is get_publishers.return_value
+    assert registry.publishers is get_publishers.return_value
+    get_publishers.assert_called_once_with(root, config, governor)
@@ -0,0 +1,160 @@
+"""
+Tests for ``nefelibata.repository``.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from freezegun import freeze_time
+from pyfakefs.fake_filesystem import FakeFilesystem
+from pytest_mock import MockerFixture
+
+from nefelibata.config import Config
+from nefelibata.dependencies import StatCache
+from nefelibata.post import LazyPost, get_posts
+from nefelibata.repository import PostRepository
+
+
+def test_repository(
+    mocker: MockerFixture,
+    fs: FakeFilesystem,
+    root: Path,
+    config: Config,
+) -> None:
+    """
+    Test that posts are loaded only once.
+    """
+    with freeze_time("2021-01-01T00:00:00Z"):
+        fs.create_file(root / "posts/one/index.mkd", contents="subject: One")
+    with freeze_time("2021-01-02T00:00:00Z"):
+        fs.create_file(root / "posts/two/index.mkd", contents="subject: Two")
+
+    get_posts_ = mocker.patch(
+        "nefelibata.repository.get_posts",
+        side_effect=get_posts,
+    )
+    # worker processes can't see the fake filesystem, so use threads instead
+    mocker.patch("nefelibata.post.ProcessPoolExecutor", ThreadPoolExecutor)
+
+    repository = PostRepository(root, config, use_cache=False, workers=2)
+    get_posts_.assert_not_called()
+
+    # only the most recent posts are built before the repository is loaded
+    assert [post.title for post in repository.get_posts(1)] == ["Two"]
+    get_posts_.assert_called_once_with(
+        root,
+        config,
+        count=1,
+        use_cache=False,
+        workers=2,
+        lazy=False,
+    )
+    get_posts_.reset_mock()
+
+    posts = repository.get_posts()
+    assert [post.title for post in posts] == ["Two", "One"]
+    assert repository.get_posts(1) == posts[:1]
+    get_posts_.assert_called_once_with(
+        root,
+        config,
+        use_cache=False,
+        workers=2,
+        lazy=False,
+    )
+
+
+def test_repository_invalidate(fs: FakeFilesystem, root: Path, config: Config) -> None:
+    """
+    Test that invalidated posts are built again.
+    """
+    fs.create_file(
+        root / "posts/one/index.mkd",
+        contents="subject: One\ndate: Fri, 01 Jan 2021 00:00:00 +0000\n\n",
+    )
+    fs.create_file(
+        root / "posts/two/index.mkd",
+        contents="subject: Two\ndate: Sat, 02 Jan 2021 00:00:00 +0000\n\n",
+    )
+
+    repository = PostRepository(root, config)
+
+    # invalidating before loading is a no-op
+    repository.invalidate(root / "posts/one/index.mkd")
+
+    one, two = repository.get_posts()[::-1]
+    with open(one.path, "a", encoding="utf-8") as output:
+        output.write("Hello!")
+    fs.create_file(root / "posts/one/reading_time.yaml", contents="words: 1")
+
+    # posts that don't exist are ignored
+    repository.invalidate(root / "posts/three/index.mkd")
+
+    assert repository.get_posts()[1] is one
+    repository.invalidate(one.path)
+    posts = repository.get_posts()
+    assert posts[0] is two
+    assert posts[1] is not one
+    assert posts[1].content == "Hello!"
+    assert posts[1].metadata["reading_time"] == {"words": 1}
+    assert repository.get_post(one.path) is posts[1]
+
+
+def test_repository_invalidate_stats(
+    fs: FakeFilesystem,
+    root: Path,
+    config: Config,
+) -> None:
+    """
+    Test that invalidating a post discards the stats of its directory.
+    """
+    fs.create_file(root / "posts/one/index.mkd", contents="subject: One")
+
+    stats = StatCache()
+    repository = PostRepository(root, config, stats=stats)
+    stats.scan(root / "posts/one")
+    repository.invalidate(root / "posts/one/index.mkd")
+    assert not stats.directories
+    assert not stats.entries
+
+
+def test_repository_invalidate_new_and_deleted(
+    fs: FakeFilesystem,
+    root: Path,
+    config: Config,
+) -> None:
+    """
+    Test that invalidating new posts adds them, and deleted posts are removed.
+    """
+    fs.create_file(
+        root / "posts/one/index.mkd",
+        contents="subject: One\ndate: Fri, 01 Jan 2021 00:00:00 +0000\n\n",
+    )
+
+    repository = PostRepository(root, config)
+    assert [post.title for post in repository.get_posts()] == ["One"]
+
+    fs.create_file(
+        root / "posts/two/index.mkd",
+        contents="subject: Two\ndate: Sat, 02 Jan 2021 00:00:00 +0000\n\n",
+    )
+    repository.invalidate(root / "posts/two/index.mkd")
+    assert [post.title for post in repository.get_posts()] == ["Two", "One"]
+
+    (root / "posts/one/index.mkd").unlink()
+    repository.invalidate(root / "posts/one/index.mkd")
+    assert [post.title for post in repository.get_posts()] == ["Two"]
+
+
+def test_repository_lazy(fs: FakeFilesystem, root: Path, config: Config) -> None:
+    """
+    Test a lazy repository.
+    """
+    fs.create_file(root / "posts/one/index.mkd", contents="subject: One")
+
+    repository = PostRepository(root, config, use_cache=False, lazy=True)
+    (post,) = repository.get_posts()
+    assert isinstance(post, LazyPost)
+
+    repository.invalidate(post.path)
+    (post,) = repository.get_posts()
+    assert isinstance(post, LazyPost)
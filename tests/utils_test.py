@@ -4,7 +4,9 @@ Tests for ``nefelibata.utils``.
 # pylint: disable=invalid-name
 
 import logging
+import os
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional
 
 import pytest
 import yaml
@@ -14,16 +16,26 @@ from pytest_mock import MockerFixture
 from yarl import URL
 
 from nefelibata.announcers.base import Interaction
+from nefelibata.cache import ContentCache
 from nefelibata.config import Config
 from nefelibata.utils import (
+    UMASK,
     archive_urls,
+    clone_file,
+    construct_model,
     dict_merge,
     find_directory,
     get_config,
+    is_same_file,
     load_extra_metadata,
+    load_extra_metadata_file,
     load_yaml,
+    materialize_file,
     setup_logging,
+    temporary_file,
     update_yaml,
+    write_if_changed,
+    write_stream_if_changed,
 )
 
 
@@ -69,6 +81,7 @@ def test_get_config(root: Path, config: Config) -> None:
         "title": "道&c.",
         "subtitle": "Musings about the path and other things",
         "language": "en",
+        "concurrency": {"hosts": {}, "plugins": {}, "tasks": 0, "threads": 0},
         "categories": {
             "stem": {
                 "description": "Science, technology, engineering, & math",
@@ -82,6 +95,8 @@ def test_get_config(root: Path, config: Config) -> None:
             "builder": {
                 "announce_on": ["announcer"],
                 "home": "https://example.com/",
+                "page_size": 0,
+                "enclosure_strategy": "copy",
                 "path": "generic",
                 "plugin": "builder",
                 "publish_to": ["publisher"],
@@ -135,6 +150,47 @@ reply,gemini://ew.srht.site/en/2021/20210915-re-changing-old-code-is-risky.gmi:
     assert _logger.warning.called_with("Invalid YAML file: %s", path)
 
 
+def test_construct_model() -> None:
+    """
+    Test ``construct_model``.
+    """
+
+    class Child(BaseModel):  # pylint: disable=too-few-public-methods
+        """
+        A nested model.
+        """
+
+        name: str
+
+    class Parent(BaseModel):  # pylint: disable=too-few-public-methods
+        """
+        A model with nested models.
+        """
+
+        child: Optional[Child] = None
+        children: List[Child]
+        named: Dict[str, Child]
+        tags: List[str]
+        count: int = 0
+
+    data = {
+        "child": {"name": "a"},
+        "children": [{"name": "b"}, Child(name="c")],
+        "named": {"d": {"name": "d"}, "e": Child(name="e")},
+        "tags": ["one"],
+        "unknown": True,
+    }
+    parent = construct_model(Parent, data)
+    assert parent == Parent(**data)
+    assert parent.child == Child(name="a")
+
+    # values are not validated
+    parent = construct_model(Parent, {"children": None, "named": {}, "tags": [1]})
+    assert parent.children is None
+    assert parent.tags == [1]
+    assert parent.count == 0
+
+
 def test_dict_merge() -> None:
     """
     Test ``dict_merge``.
@@ -154,7 +210,21 @@ def test_load_extra_metadata(mocker: MockerFixture, fs: FakeFilesystem) -> None:
     fs.create_file("/path/to/blog/test.yaml", contents=yaml.dump(dict(a=42)))
     fs.create_file("/path/to/blog/broken.yaml", contents="{[")
 
+    # invalid files are only removed when read
+    metadata = load_extra_metadata(Path("/path/to/blog"))
+    assert sorted(metadata) == ["broken", "test"]
+    assert len(metadata) == 2
+    assert "broken" not in metadata
+    assert list(metadata) == ["test"]
+    assert len(metadata) == 1
+
+    # invalid files are skipped, like they were when metadata was loaded eagerly
+    metadata = load_extra_metadata(Path("/path/to/blog"))
+    assert dict(metadata) == {"test": {"a": 42}}
+    metadata = load_extra_metadata(Path("/path/to/blog"))
+    assert list(metadata.values()) == [{"a": 42}]
     metadata = load_extra_metadata(Path("/path/to/blog"))
+    assert list(metadata.items()) == [("test", {"a": 42})]
     assert metadata == {"test": {"a": 42}}
 
     _logger.warning.assert_called_with(
@@ -163,6 +233,55 @@ def test_load_extra_metadata(mocker: MockerFixture, fs: FakeFilesystem) -> None:
     )
 
 
+def test_lazy_metadata(mocker: MockerFixture, fs: FakeFilesystem) -> None:
+    """
+    Test that extra metadata is loaded on demand.
+    """
+    load = mocker.patch("nefelibata.utils.yaml.load", wraps=yaml.load)
+
+    fs.create_file("/path/to/blog/test.yaml", contents=yaml.dump(dict(a=42)))
+    fs.create_file("/path/to/blog/summary.yaml", contents=yaml.dump("From YAML"))
+
+    metadata = load_extra_metadata(
+        Path("/path/to/blog"),
+        data={"summary": "From header", "keywords": "blog"},
+    )
+    load.assert_not_called()
+
+    assert metadata["keywords"] == "blog"
+    load.assert_not_called()
+
+    # keys are listed without parsing the files
+    assert sorted(metadata) == ["keywords", "summary", "test"]
+    load.assert_not_called()
+
+    # files are parsed once, and take precedence over the headers
+    assert metadata["test"] == {"a": 42}
+    assert metadata["test"] is metadata["test"]
+    assert metadata["summary"] == "From YAML"
+    assert load.call_count == 2
+
+    # parsed files are shared, but each post gets its own copy
+    metadata["test"]["a"] = 0
+    other = load_extra_metadata(Path("/path/to/blog"))
+    assert other["test"] == {"a": 42}
+    assert load.call_count == 2
+
+    # files are parsed again when modified
+    with open("/path/to/blog/test.yaml", "w", encoding="utf-8") as output:
+        output.write(yaml.dump(dict(a=43)))
+    assert metadata["test"] == {"a": 43}
+
+    metadata["summary"] = "Updated"
+    assert metadata["summary"] == "Updated"
+    del metadata["keywords"]
+    del metadata["test"]
+    with pytest.raises(KeyError):
+        del metadata["test"]
+    assert repr(metadata) == "{'summary': 'Updated'}"
+    assert len(metadata) == 1
+
+
 def test_update_yaml(fs: FakeFilesystem) -> None:
     """
     Test ``update_yaml``.
@@ -249,10 +368,12 @@ async def test_archive_urls(mocker: MockerFixture) -> None:
             ),
         },
     }
-    get = mocker.patch("nefelibata.utils.ClientSession.get")
+    session = mocker.MagicMock()
+    get = session.get
     get.return_value.__aenter__.return_value.links = links
 
     saved_urls = await archive_urls(
+        session,
         [
             URL("https://nefelibata.readthedocs.io/"),
             URL("gemini://taoetc.org/"),
@@ -272,13 +393,235 @@ async def test_sleep(
     """
     Test that we ``sleep`` between URLs.
     """
-    get = mocker.patch("nefelibata.utils.ClientSession.get")
+    session = mocker.MagicMock()
+    get = session.get
     get.return_value.__aenter__.return_value.links = {}
 
     sleep = mocker.patch("nefelibata.utils.asyncio.sleep")
 
     await archive_urls(
+        session,
         [URL("https://example.com/foo"), URL("https://example.com/bar")],
     )
 
     sleep.assert_called_with(12.0)
+
+
+def test_write_if_changed(mocker: MockerFixture, fs: FakeFilesystem) -> None:
+    """
+    Test ``write_if_changed``.
+    """
+    path = Path("/path/to/blog/build/index.html")
+    fs.create_dir(path.parent)
+
+    assert write_if_changed(path, "Hello")
+    assert path.read_text() == "Hello"
+    last_update = path.stat().st_mtime_ns
+
+    # same content
+    assert not write_if_changed(path, "Hello")
+    assert path.stat().st_mtime_ns == last_update
+
+    # same size, different content
+    assert write_if_changed(path, "Hallo")
+    assert path.read_text() == "Hallo"
+    assert list(path.parent.iterdir()) == [path]
+
+    # the temporary file is removed if the content can't be written
+    mocker.patch("nefelibata.utils.os.replace", side_effect=OSError("Disk full"))
+    with pytest.raises(OSError):
+        write_if_changed(path, "Hello")
+    assert path.read_text() == "Hallo"
+    assert list(path.parent.iterdir()) == [path]
+
+
+def test_temporary_file(fs: FakeFilesystem) -> None:
+    """
+    Test ``temporary_file``.
+    """
+    path = Path("/path/to/blog/build/index.html")
+    fs.create_dir(path.parent)
+
+    with temporary_file(path) as first, temporary_file(path) as second:
+        assert first != second
+        assert first.parent == path.parent
+        assert first.name.startswith(".index.html.")
+        assert first.stat().st_mode & 0o777 == 0o666 & ~UMASK
+        os.replace(first, path)
+    assert list(path.parent.iterdir()) == [path]
+
+
+def test_write_stream_if_changed(fs: FakeFilesystem) -> None:
+    """
+    Test ``write_stream_if_changed``.
+    """
+    path = Path("/path/to/blog/build/atom.xml")
+    fs.create_dir(path.parent)
+
+    assert write_stream_if_changed(path, iter(["Hello", ", ", "world!"]))
+    assert path.read_text() == "Hello, world!"
+    last_update = path.stat().st_mtime_ns
+
+    # same content, in different chunks
+    assert not write_stream_if_changed(path, iter(["Hello, ", "world!"]))
+    assert path.stat().st_mtime_ns == last_update
+    assert list(path.parent.iterdir()) == [path]
+
+    # same size, different content
+    assert write_stream_if_changed(path, iter(["Hello, ", "World!"]))
+    assert path.read_text() == "Hello, World!"
+    assert list(path.parent.iterdir()) == [path]
+
+    # partial content is removed if rendering fails
+    def chunks() -> Iterator[str]:
+        yield "Hello, "
+        raise Exception("Boom")
+
+    with pytest.raises(Exception) as excinfo:
+        write_stream_if_changed(path, chunks())
+    assert str(excinfo.value) == "Boom"
+    assert path.read_text() == "Hello, World!"
+    assert list(path.parent.iterdir()) == [path]
+
+
+def test_clone_file(mocker: MockerFixture, tmp_path: Path) -> None:
+    """
+    Test ``clone_file``.
+    """
+    source = tmp_path / "song.mp3"
+    source.write_bytes(b"ID3" * 1000)
+
+    # reflinks are usually not supported in temporary directories
+    clone_file(source, tmp_path / "clone.mp3")
+    assert (tmp_path / "clone.mp3").read_bytes() == source.read_bytes()
+
+    ioctl = mocker.patch("nefelibata.utils.fcntl.ioctl")
+    clone_file(source, tmp_path / "reflink.mp3")
+    ioctl.assert_called()
+    assert ioctl.mock_calls[0].args[1] == 0x40049409
+
+    ioctl.side_effect = OSError("Operation not supported")
+    copy_file_range = mocker.patch(
+        "nefelibata.utils.os.copy_file_range",
+        return_value=0,
+    )
+    clone_file(source, tmp_path / "truncated.mp3")
+    copy_file_range.assert_called_once()
+
+    copy_file_range.side_effect = AttributeError("copy_file_range")
+    clone_file(source, tmp_path / "copy.mp3")
+    assert (tmp_path / "copy.mp3").read_bytes() == source.read_bytes()
+
+    # empty files don't need to be copied
+    (tmp_path / "empty.mp3").touch()
+    copy_file_range.reset_mock()
+    copy_file_range.side_effect = None
+    clone_file(tmp_path / "empty.mp3", tmp_path / "empty-clone.mp3")
+    copy_file_range.assert_not_called()
+
+
+def test_is_same_file(tmp_path: Path) -> None:
+    """
+    Test ``is_same_file``.
+    """
+    source = tmp_path / "song.mp3"
+    source.write_bytes(b"Hello")
+    target = tmp_path / "target.mp3"
+
+    assert not is_same_file(source, target)
+
+    target.write_bytes(b"Hello")
+    assert is_same_file(source, target)
+
+    target.write_bytes(b"World")
+    assert not is_same_file(source, target)
+
+    target.write_bytes(b"Hello, world!")
+    assert not is_same_file(source, target)
+
+    target.unlink()
+    os.link(source, target)
+    assert is_same_file(source, target)
+
+
+@pytest.mark.parametrize(
+    "strategy,linked",
+    [("copy", False), ("hardlink", True), ("reflink", False), ("symlink", True)],
+)
+def test_materialize_file(tmp_path: Path, strategy: str, linked: bool) -> None:
+    """
+    Test ``materialize_file``.
+    """
+    source = tmp_path / "posts/first/song.mp3"
+    source.parent.mkdir(parents=True)
+    source.write_bytes(b"ID3")
+    source.chmod(0o640)
+    target = tmp_path / "build/first/song.mp3"
+    target.parent.mkdir(parents=True)
+
+    assert materialize_file(source, target, strategy)
+    assert target.read_bytes() == b"ID3"
+    assert target.stat().st_mode & 0o777 == 0o640
+    assert os.path.samestat(source.stat(), target.stat()) == linked
+    assert target.is_symlink() == (strategy == "symlink")
+    assert list(target.parent.iterdir()) == [target]
+
+    # targets with the same content are not touched
+    last_update = target.lstat().st_mtime_ns
+    assert not materialize_file(source, target, strategy)
+    assert target.lstat().st_mtime_ns == last_update
+
+    # the source was replaced; symlinks still point to it
+    source.unlink()
+    source.write_bytes(b"RIFF")
+    assert materialize_file(source, target, strategy) == (strategy != "symlink")
+    assert target.read_bytes() == b"RIFF"
+
+
+def test_materialize_file_hardlink_error(mocker: MockerFixture, tmp_path: Path) -> None:
+    """
+    Test that files are copied when they can't be hardlinked.
+    """
+    _logger = mocker.patch("nefelibata.utils._logger")
+    mocker.patch("nefelibata.utils.os.link", side_effect=OSError("Cross-device link"))
+
+    source = tmp_path / "song.mp3"
+    source.write_bytes(b"ID3")
+    target = tmp_path / "target.mp3"
+
+    assert materialize_file(source, target, "hardlink")
+    assert target.read_bytes() == b"ID3"
+    assert not os.path.samestat(source.stat(), target.stat())
+    _logger.debug.assert_called_with("Unable to hardlink %s, copying", source)
+
+
+def test_materialize_file_error(mocker: MockerFixture, tmp_path: Path) -> None:
+    """
+    Test that partial copies are removed.
+    """
+    mocker.patch("nefelibata.utils.shutil.copymode", side_effect=OSError("Boom"))
+
+    source = tmp_path / "song.mp3"
+    source.write_bytes(b"ID3")
+    target = tmp_path / "build/song.mp3"
+    target.parent.mkdir()
+
+    with pytest.raises(OSError):
+        materialize_file(source, target)
+    assert list(target.parent.iterdir()) == []
+
+
+def test_extra_metadata_cache(mocker: MockerFixture, fs: FakeFilesystem) -> None:
+    """
+    Test that the cache of parsed YAML files is bounded.
+    """
+    cache = mocker.patch(
+        "nefelibata.utils._extra_metadata_cache",
+        ContentCache(size=1),
+    )
+    fs.create_file("/path/to/blog/one.yaml", contents="1")
+    fs.create_file("/path/to/blog/two.yaml", contents="2")
+
+    assert load_extra_metadata_file(Path("/path/to/blog/one.yaml")) == 1
+    assert load_extra_metadata_file(Path("/path/to/blog/two.yaml")) == 2
+    assert len(cache.entries) == 1
@@ -0,0 +1,171 @@
+"""
+Tests for ``nefelibata.watcher``.
+"""
+# pylint: disable=invalid-name, unused-argument
+
+import asyncio
+from pathlib import Path
+
+import pytest
+from pyfakefs.fake_filesystem import FakeFilesystem
+from pytest_mock import MockerFixture
+
+from nefelibata.config import Config
+from nefelibata.watcher import (
+    InotifyWatcher,
+    PollingWatcher,
+    Watcher,
+    get_watcher,
+)
+
+
+@pytest.mark.asyncio
+async def test_watcher() -> None:
+    """
+    Test the base class.
+    """
+    watcher = Watcher([])
+    with pytest.raises(NotImplementedError) as excinfo:
+        await watcher.wait()
+    assert str(excinfo.value) == "Subclasses must implement ``wait``"
+    watcher.close()
+
+
+@pytest.mark.asyncio
+async def test_polling_watcher(
+    mocker: MockerFixture,
+    fs: FakeFilesystem,
+    root: Path,
+    config: Config,
+) -> None:
+    """
+    Test ``PollingWatcher``.
+    """
+    fs.create_file(root / "posts/first/index.mkd", contents="Hello")
+    fs.create_file(root / "posts/second/index.mkd", contents="Hi")
+
+    watcher = PollingWatcher([root / "posts", root / "nefelibata.yaml"], interval=5)
+    assert set(watcher.snapshot) == {
+        root / "posts/first/index.mkd",
+        root / "posts/second/index.mkd",
+        root / "nefelibata.yaml",
+    }
+
+    # nothing changes on the first check
+    calls = []
+
+    async def sleep(interval: float) -> None:
+        calls.append(interval)
+        if len(calls) == 2:
+            with open(root / "posts/first/index.mkd", "w", encoding="utf-8") as output:
+                output.write("Hello, world!")
+            (root / "posts/second/index.mkd").unlink()
+            fs.create_file(root / "posts/third/index.mkd")
+
+    mocker.patch("nefelibata.watcher.asyncio.sleep", sleep)
+
+    assert await watcher.wait() == {
+        root / "posts/first/index.mkd",
+        root / "posts/second/index.mkd",
+        root / "posts/third/index.mkd",
+    }
+    assert calls == [5, 5]
+
+
+@pytest.mark.asyncio
+async def test_inotify_watcher(tmp_path: Path) -> None:
+    """
+    Test ``InotifyWatcher``.
+    """
+    (tmp_path / "posts/first").mkdir(parents=True)
+    (tmp_path / "posts/second").mkdir()
+    (tmp_path / "nefelibata.yaml").write_text("title: Blog")
+
+    watcher = InotifyWatcher([tmp_path / "posts", tmp_path / "nefelibata.yaml"])
+    assert set(watcher.directories.values()) == {
+        tmp_path,
+        tmp_path / "posts",
+        tmp_path / "posts/first",
+        tmp_path / "posts/second",
+    }
+
+    # files in the root other than the configuration are ignored
+    (tmp_path / "notes.txt").write_text("Ignore me")
+    (tmp_path / "posts/first/index.mkd").write_text("Hello")
+    assert await watcher.wait() == {tmp_path / "posts/first/index.mkd"}
+
+    # new directories are watched
+    (tmp_path / "posts/second").rmdir()
+    (tmp_path / "posts/third").mkdir()
+    assert await watcher.wait() == {
+        tmp_path / "posts/second",
+        tmp_path / "posts/third",
+    }
+    (tmp_path / "posts/third/index.mkd").write_text("Hi")
+    (tmp_path / "nefelibata.yaml").write_text("title: My blog")
+    assert await watcher.wait() == {
+        tmp_path / "posts/third/index.mkd",
+        tmp_path / "nefelibata.yaml",
+    }
+
+    # files in directories moved into a watched tree are reported
+    (tmp_path / "drafts/fourth/img").mkdir(parents=True)
+    (tmp_path / "drafts/fourth/index.mkd").write_text("Draft")
+    (tmp_path / "drafts/fourth/img/photo.jpg").write_text("JPEG")
+    (tmp_path / "drafts/fourth").rename(tmp_path / "posts/fourth")
+    assert await watcher.wait() == {
+        tmp_path / "posts/fourth",
+        tmp_path / "posts/fourth/index.mkd",
+        tmp_path / "posts/fourth/img/photo.jpg",
+    }
+    assert tmp_path / "posts/fourth/img" in watcher.directories.values()
+
+    # the watcher keeps waiting until a watched path changes
+    (tmp_path / "notes.txt").write_text("Ignore me again")
+    task = asyncio.create_task(watcher.wait())
+    await asyncio.sleep(0.5)
+    assert not task.done()
+    (tmp_path / "posts/first/index.mkd").write_text("Hello, world!")
+    assert await task == {tmp_path / "posts/first/index.mkd"}
+
+    watcher.close()
+
+
+def test_inotify_watcher_errors(
+    mocker: MockerFixture,
+    tmp_path: Path,
+) -> None:
+    """
+    Test errors in ``InotifyWatcher``.
+    """
+    _logger = mocker.patch("nefelibata.watcher._logger")
+
+    watcher = InotifyWatcher([tmp_path])
+    watcher.add_watch(tmp_path / "missing")
+    _logger.warning.assert_called_with("Unable to watch %s", tmp_path / "missing")
+    watcher.close()
+
+    CDLL = mocker.patch("nefelibata.watcher.ctypes.CDLL")
+    CDLL.return_value.inotify_init1.return_value = -1
+    mocker.patch("nefelibata.watcher.ctypes.get_errno", return_value=24)
+    with pytest.raises(OSError) as excinfo:
+        InotifyWatcher([tmp_path])
+    assert excinfo.value.errno == 24
+
+
+def test_get_watcher(mocker: MockerFixture, tmp_path: Path) -> None:
+    """
+    Test ``get_watcher``.
+    """
+    watcher = get_watcher([tmp_path])
+    assert isinstance(watcher, InotifyWatcher)
+    watcher.close()
+
+    watcher = get_watcher([tmp_path], interval=2)
+    assert isinstance(watcher, PollingWatcher)
+    assert watcher.interval == 2
+
+    mocker.patch("nefelibata.watcher.InotifyWatcher", side_effect=AttributeError)
+    watcher = get_watcher([tmp_path])
+    assert isinstance(watcher, PollingWatcher)
+    assert watcher.interval == 1.0